@@ -0,0 +1,141 @@
+'''
+Accounting of actuator effort and estimated energy use.
+
+For every actuator of every zone the accounts keep number of actuations, number of ramp steps,
+total change of the environment variable, on-time and estimated energy. Counters are kept in flat
+arrays indexed by zone and actuator, so recording an actuation is O(1) and aggregate queries are
+single passes over the arrays.
+
+Actuators record one entry per actuation, after their ramp has finished, so accounting adds no work
+to the ramp steps themselves.
+'''
+
+from array import array
+
+actuator_names = ("heater", "humidifier", "lights")
+
+# default estimates per actuator
+#   energy -- kWh per unit of change of the environment variable
+#   step_time -- seconds the actuator is on for one ramp step
+estimates = {
+    "heater": {"energy": 0.5, "step_time": 10.0},
+    "humidifier": {"energy": 0.05, "step_time": 5.0},
+    "lights": {"energy": 0.01, "step_time": 1.0}
+}
+
+class EffortAccounts:
+    ''' Per zone and per actuator effort and energy accumulators
+
+    Attributes:
+    zones -- number of zones
+    energy -- tuple of kWh per unit of change of each actuator
+    step_time -- tuple of on-time seconds per ramp step of each actuator
+    '''
+    def __init__(self, zones: int = 1, **overrides):
+        ''' Initialize all counters to zero
+
+        zones -- number of zones
+        overrides -- dictionaries replacing default estimates of actuators, e.g. heater={"energy": 0.8}
+        '''
+        if type(zones) != int:
+            raise TypeError("Number of zones must be passed in as an integer.")
+
+        if zones < 1:
+            raise ValueError("Number of zones must be at least 1.")
+
+        for name in overrides:
+            if name not in estimates:
+                raise ValueError("Invalid actuator: %s" % name)
+
+        settings = {name: dict(estimates[name], **overrides.get(name, {})) for name in actuator_names}
+        self.zones = zones
+        self.energy = tuple(settings[name]["energy"] for name in actuator_names)
+        self.step_time = tuple(settings[name]["step_time"] for name in actuator_names)
+
+        size = zones * len(actuator_names)
+        self._actuations = array("q", [0]) * size
+        self._steps = array("q", [0]) * size
+        self._change = array("d", [0.0]) * size
+        self._on_time = array("d", [0.0]) * size
+        self._energy = array("d", [0.0]) * size
+
+    def record(self, actuator: str, zone: int, steps: int, change: float):
+        ''' Record one actuation
+
+        actuator -- name of the actuator
+        zone -- zone of the actuator
+        steps -- number of ramp steps of the actuation
+        change -- absolute change of the environment variable
+        '''
+        kind = actuator_names.index(actuator)
+        index = zone * len(actuator_names) + kind
+
+        self._actuations[index] += 1
+        self._steps[index] += steps
+        self._change[index] += change
+        self._on_time[index] += steps * self.step_time[kind]
+        self._energy[index] += change * self.energy[kind]
+
+    def get_zone(self, zone: int):
+        ''' Return dictionary of counters of each actuator of a zone
+
+        zone -- zone of the actuators
+        '''
+        return {name: self._counters(zone * len(actuator_names) + kind) for kind, name in enumerate(actuator_names)}
+
+    def get_totals(self):
+        ''' Return dictionary of counters of each actuator summed over all zones
+        '''
+        count = len(actuator_names)
+        totals = {}
+        for kind, name in enumerate(actuator_names):
+            totals[name] = {
+                "actuations": sum(self._actuations[kind::count]),
+                "steps": sum(self._steps[kind::count]),
+                "change": sum(self._change[kind::count]),
+                "on_time": sum(self._on_time[kind::count]),
+                "energy": sum(self._energy[kind::count])
+            }
+        return totals
+
+    def get_total_energy(self):
+        ''' Return estimated energy in kWh used by all actuators of all zones
+        '''
+        return sum(self._energy)
+
+    def get_top_zones(self, count: int = 10, actuator: str = None):
+        ''' Return list of (zone, kWh) tuples of zones using the most energy
+
+        count -- number of zones to return
+        actuator -- only count energy of this actuator, default: all actuators
+        '''
+        width = len(actuator_names)
+        if actuator is None:
+            energy = [sum(self._energy[zone * width:(zone + 1) * width]) for zone in range(self.zones)]
+        else:
+            energy = self._energy[actuator_names.index(actuator)::width]
+
+        return sorted(enumerate(energy), key=lambda item: item[1], reverse=True)[:count]
+
+    def reset(self):
+        ''' Set all counters back to zero, e.g. at the start of a billing period
+        '''
+        size = self.zones * len(actuator_names)
+        self._actuations = array("q", [0]) * size
+        self._steps = array("q", [0]) * size
+        self._change = array("d", [0.0]) * size
+        self._on_time = array("d", [0.0]) * size
+        self._energy = array("d", [0.0]) * size
+
+    def _counters(self, index: int):
+        ''' Return dictionary of counters at an index of the arrays
+
+        index -- index of zone and actuator in the arrays
+        '''
+        return {
+            "actuations": self._actuations[index],
+            "steps": self._steps[index],
+            "change": self._change[index],
+            "on_time": self._on_time[index],
+            "energy": self._energy[index]
+        }
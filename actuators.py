@@ -25,13 +25,19 @@ class Heater:
     max -- maximum allowed temperature
     min -- minimum allowed temperature
     change -- maximum change in temperature in one step
+    accounts -- optional EffortAccounts recording every actuation
+    zone -- zone of the heater in the accounts
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, accounts=None, zone: int = 0):
         ''' Initialize heater and set boundaries
         
         environment -- environment instance
+        accounts -- optional EffortAccounts recording every actuation
+        zone -- zone of the heater in the accounts
         '''
         self.env = environment
+        self.accounts = accounts
+        self.zone = zone
         self.max = 40.0
         self.min = 15.0
         self.change = 0.3
@@ -55,8 +61,12 @@ class Heater:
         elif target_temperature < self.min:
             target_temperature = self.min
 
+        start = current_temp
+        steps = 0
+
         # gradually change the temperature
         while current_temp != target_temperature:
+            steps += 1
             if current_temp > target_temperature:
                 new_temp = random.uniform(current_temp-self.change, current_temp)
 
@@ -75,6 +85,10 @@ class Heater:
             
             self.env.set_environment("temperature", current_temp)
 
+        # record the actuation once the ramp has finished
+        if self.accounts is not None and steps:
+            self.accounts.record("heater", self.zone, steps, abs(current_temp - start))
+
 class Humidifier:
     ''' Actuator class for controlling humidity of environment
 
@@ -83,13 +97,19 @@ class Humidifier:
     max -- maximum allowed humidity
     min -- minimum allowed humidity
     change -- maximum change in humidity in one step
+    accounts -- optional EffortAccounts recording every actuation
+    zone -- zone of the humidifier in the accounts
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, accounts=None, zone: int = 0):
         ''' Initialize humidifier and set boundaries
         
         environment -- environment instance
+        accounts -- optional EffortAccounts recording every actuation
+        zone -- zone of the humidifier in the accounts
         '''
         self.env = environment
+        self.accounts = accounts
+        self.zone = zone
         self.max = 100
         self.min = 40
         self.change = 2
@@ -110,8 +130,12 @@ class Humidifier:
         elif target_humidity < self.min:
             target_humidity = self.min
 
+        start = current_humidity
+        steps = 0
+
         # gradually change the humidity
         while current_humidity != target_humidity:
+            steps += 1
             if current_humidity > target_humidity:
                 new_humidity = random.uniform(current_humidity-self.change, current_humidity)
 
@@ -130,6 +154,10 @@ class Humidifier:
             
             self.env.set_environment("humidity", current_humidity)
 
+        # record the actuation once the ramp has finished
+        if self.accounts is not None and steps:
+            self.accounts.record("humidifier", self.zone, steps, abs(current_humidity - start))
+
 class Lights:
     ''' Actuator class for controlling light spectrum of environment
 
@@ -138,13 +166,19 @@ class Lights:
     max -- maximum allowed light spectrum value
     min -- minimum allowed light spectrum value
     change -- maximum change in light spectrum value in one step
+    accounts -- optional EffortAccounts recording every actuation
+    zone -- zone of the lights in the accounts
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, accounts=None, zone: int = 0):
         ''' Initialize lights and set boundaries
         
         environment -- environment instance
+        accounts -- optional EffortAccounts recording every actuation
+        zone -- zone of the lights in the accounts
         '''
         self.env = environment
+        self.accounts = accounts
+        self.zone = zone
         self.max = 850
         self.min = 150
         self.change = 10
@@ -165,8 +199,12 @@ class Lights:
         elif target_light < self.min:
             target_light = self.min
 
+        start = current_light
+        steps = 0
+
         # gradually change the light
         while current_light != target_light:
+            steps += 1
             if current_light > target_light:
                 new_light = random.uniform(current_light-self.change, current_light)
 
@@ -183,4 +221,8 @@ class Lights:
                 else:
                     current_light = new_light
 
-            self.env.set_environment("light", current_light)
\ No newline at end of file
+            self.env.set_environment("light", current_light)
+
+        # record the actuation once the ramp has finished
+        if self.accounts is not None and steps:
+            self.accounts.record("lights", self.zone, steps, abs(current_light - start))
\ No newline at end of file
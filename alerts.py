@@ -0,0 +1,382 @@
+'''
+Alert engine turning warnings of the control logic into alerts for pluggable sinks.
+
+For every zone and environment variable the engine remembers the active condition, so a condition
+repeated tick after tick raises a single alert:
+    raised -- the variable left the ideal state or its condition changed
+    repeated -- reminder of a condition still active after the suppression window, with the
+        number of suppressed repeats
+    escalated -- the condition has lasted longer than the escalation window, severity critical
+    cleared -- the variable is back in the ideal state
+
+Changes of condition are rate limited as well: a zone and variable raises or clears at most once
+per suppression window, so a value hovering at a band edge or flipping between high and low does
+not send an alert every tick. Changes inside the window are counted as suppressed, and the
+condition in effect is sent once the window has passed.
+
+The engine only updates its state and queues new alerts, delivery runs in a worker thread per
+sink. Each sink has its own bounded queue and gets all pending alerts in one batch, so a slow
+sink never delays the control tick or the other sinks, and during an alert storm from many zones
+the oldest undelivered alerts of a slow sink are dropped and counted.
+'''
+
+import json
+import socket
+import threading
+import time
+from collections import deque
+
+# warnings of the control logic which are alert conditions, "good" clears the alert
+conditions = ("high", "low", "fault")
+
+class AlertEngine:
+    ''' Deduplicating alert engine with suppression and escalation windows per zone and variable
+
+    Attributes:
+    suppress -- number of seconds repeats of an active condition are suppressed
+    escalate -- number of seconds after which an active condition is escalated
+    raised -- number of alerts sent to the sinks
+    suppressed -- number of repeated conditions and changes of condition not sent
+    '''
+    def __init__(self, sinks: list = (), suppress: float = 300.0, escalate: float = 900.0,
+                 queue_size: int = 1000, clock=time.monotonic):
+        ''' Initialize engine, alerts are not delivered until start() is called
+
+        sinks -- list of sinks, objects with send(alerts) and close() methods
+        suppress -- number of seconds repeats of an active condition are suppressed
+        escalate -- number of seconds after which an active condition is escalated
+        queue_size -- maximum number of alerts waiting for a single sink
+        clock -- function returning current time in seconds
+        '''
+        if suppress < 0 or escalate < 0:
+            raise ValueError("Suppression and escalation windows must not be negative.")
+
+        self.suppress = suppress
+        self.escalate = escalate
+        self.raised = 0
+        self.suppressed = 0
+
+        self._clock = clock
+        self._workers = [_SinkWorker(sink, queue_size) for sink in sinks]
+        # (zone, variable) -> [condition or None, start time, last sent time, suppressed repeats, escalated,
+        #                      condition sent to the sinks or None, time the last change was sent]
+        self._active = {}
+
+    def start(self):
+        ''' Start delivery worker of every sink
+        '''
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self):
+        ''' Deliver pending alerts, stop workers and close the sinks
+        '''
+        for worker in self._workers:
+            worker.stop()
+
+    def update(self, warnings: dict, zone: int = 0, readings: dict = None):
+        ''' Update state of a zone with warnings of a tick and queue new alerts, return list of the alerts
+
+        warnings -- dictionary of current warning per environment variable
+        zone -- zone of the warnings
+        readings -- optional dictionary of current environment values added to the alerts
+        '''
+        alerts = []
+        self._check_zone(alerts, zone, warnings, readings, self._clock())
+        self._dispatch(alerts)
+        return alerts
+
+    def update_zones(self, warnings: list, readings: list = None):
+        ''' Update state of all zones with warnings of a tick, queueing their alerts as one batch
+
+        warnings -- list of dictionaries of current warning per environment variable, one per zone
+        readings -- optional list of dictionaries of current environment values, one per zone
+        '''
+        alerts = []
+        now = self._clock()
+        for zone, zone_warnings in enumerate(warnings):
+            self._check_zone(alerts, zone, zone_warnings, None if readings is None else readings[zone], now)
+        self._dispatch(alerts)
+        return alerts
+
+    def get_active(self):
+        ''' Return dictionary of active condition of each (zone, variable)
+        '''
+        return {key: state[0] for key, state in self._active.items() if state[0] is not None}
+
+    def get_metrics(self):
+        ''' Return dictionary with number of active conditions, sent, suppressed, dropped and failed alerts
+        '''
+        return {
+            "active": sum(state[0] is not None for state in self._active.values()),
+            "raised": self.raised,
+            "suppressed": self.suppressed,
+            "dropped": sum(worker.dropped for worker in self._workers),
+            "failed": sum(worker.failed for worker in self._workers)
+        }
+
+    def _check_zone(self, alerts: list, zone: int, warnings: dict, readings: dict, now: float):
+        ''' Compare warnings of a zone with its active conditions and append new alerts
+
+        alerts -- list the new alerts are appended to
+        zone -- zone of the warnings
+        warnings -- dictionary of current warning per environment variable
+        readings -- optional dictionary of current environment values
+        now -- current time in seconds
+        '''
+        for variable, warning in warnings.items():
+            key = (zone, variable)
+            state = self._active.get(key)
+            value = None if readings is None else readings.get(variable)
+            condition = warning if warning in conditions else None
+
+            if state is None:
+                if condition is None:
+                    continue
+                state = self._active[key] = [None, now, None, 0, False, None, None]
+
+            if state[0] != condition:
+                state[0], state[1], state[4] = condition, now, False
+
+            if state[5] != condition:
+                # changes are sent at most once per suppression window, the latest one wins
+                if state[6] is not None and now - state[6] < self.suppress:
+                    state[3] += 1
+                    self.suppressed += 1
+                    continue
+                if condition is None:
+                    alerts.append(_alert(zone, variable, state[5], "cleared", "info", value, state[3]))
+                else:
+                    alerts.append(_alert(zone, variable, condition, "raised", "warning", value, state[3]))
+                state[2] = state[6] = now
+                state[3] = 0
+                state[5] = condition
+            elif condition is None:
+                # cleared, the state is only kept while it limits the next change
+                if now - state[6] >= self.suppress:
+                    del self._active[key]
+            elif not state[4] and now - state[1] >= self.escalate:
+                state[2], state[4] = now, True
+                alerts.append(_alert(zone, variable, condition, "escalated", "critical", value, state[3]))
+                state[3] = 0
+            elif now - state[2] >= self.suppress:
+                state[2] = now
+                alerts.append(_alert(zone, variable, condition, "repeated", "critical" if state[4] else "warning",
+                                     value, state[3]))
+                state[3] = 0
+            else:
+                state[3] += 1
+                self.suppressed += 1
+
+    def _dispatch(self, alerts: list):
+        ''' Hand new alerts over to the worker of every sink
+
+        alerts -- list of new alerts
+        '''
+        if alerts:
+            self.raised += len(alerts)
+            for worker in self._workers:
+                worker.put(alerts)
+
+class _SinkWorker:
+    ''' Thread delivering alerts to a single sink in batches
+
+    Attributes:
+    sink -- sink the alerts are delivered to
+    dropped -- number of alerts dropped because the sink was too slow
+    failed -- number of alerts the sink failed to deliver
+    '''
+    def __init__(self, sink, queue_size: int):
+        ''' Initialize the worker
+
+        sink -- sink the alerts are delivered to
+        queue_size -- maximum number of alerts waiting for the sink
+        '''
+        self.sink = sink
+        self.dropped = 0
+        self.failed = 0
+        self._queue = deque(maxlen=queue_size)
+        self._ready = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        ''' Start the delivery thread
+        '''
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="alerts-%s" % type(self.sink).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        ''' Deliver pending alerts, stop the thread and close the sink
+        '''
+        if self._thread is not None:
+            with self._ready:
+                self._stopping = True
+                self._ready.notify()
+            self._thread.join()
+            self._thread = None
+        self.sink.close()
+
+    def put(self, alerts: list):
+        ''' Queue alerts, dropping the oldest ones if the queue is full
+
+        alerts -- list of alerts
+        '''
+        with self._ready:
+            overflow = len(self._queue) + len(alerts) - self._queue.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self._queue.extend(alerts)
+            self._ready.notify()
+
+    def _run(self):
+        ''' Deliver all pending alerts in one batch whenever there are any, until stopped
+        '''
+        while True:
+            with self._ready:
+                while not self._queue and not self._stopping:
+                    self._ready.wait()
+                if not self._queue:
+                    return
+                batch = list(self._queue)
+                self._queue.clear()
+
+            try:
+                self.sink.send(batch)
+            except Exception as e:
+                self.failed += len(batch)
+                print("Alert sink %s failed: %s" % (type(self.sink).__name__, e))
+
+class LogSink:
+    ''' Sink appending a line per alert to a log file
+
+    Attributes:
+    path -- path to the log file
+    '''
+    def __init__(self, path: str = "alerts.log"):
+        ''' Initialize the sink, the file is opened on the first alert
+
+        path -- path to the log file
+        '''
+        self.path = path
+        self._file = None
+
+    def send(self, alerts: list):
+        ''' Append alerts to the log file
+
+        alerts -- list of alerts
+        '''
+        if self._file is None:
+            self._file = open(self.path, "a")
+        self._file.write("".join("%s %s\n" % (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(alert["time"])),
+                                              format_alert(alert)) for alert in alerts))
+        self._file.flush()
+
+    def close(self):
+        ''' Close the log file
+        '''
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class SocketSink:
+    ''' Sink sending a line of JSON per alert to a local TCP socket, reconnecting after errors
+
+    Attributes:
+    host -- address of the alert receiver
+    port -- port of the alert receiver
+    timeout -- number of seconds to wait for connecting and sending
+    '''
+    def __init__(self, host: str = "127.0.0.1", port: int = 8766, timeout: float = 1.0):
+        ''' Initialize the sink, the connection is opened on the first alert
+
+        host -- address of the alert receiver
+        port -- port of the alert receiver
+        timeout -- number of seconds to wait for connecting and sending
+        '''
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._socket = None
+
+    def send(self, alerts: list):
+        ''' Send alerts to the receiver, the connection is dropped when sending fails
+
+        alerts -- list of alerts
+        '''
+        data = "".join(json.dumps(alert) + "\n" for alert in alerts).encode()
+        try:
+            if self._socket is None:
+                self._socket = socket.create_connection((self.host, self.port), self.timeout)
+            self._socket.sendall(data)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self):
+        ''' Close the connection
+        '''
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+class GuiSink:
+    ''' Sink keeping messages of the latest alerts for the GUI thread
+
+    Attributes:
+    size -- number of latest messages kept
+    '''
+    def __init__(self, size: int = 10):
+        ''' Initialize the sink
+
+        size -- number of latest messages kept
+        '''
+        self.size = size
+        self._messages = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def send(self, alerts: list):
+        ''' Keep messages of the alerts
+
+        alerts -- list of alerts
+        '''
+        with self._lock:
+            self._messages.extend(format_alert(alert) for alert in alerts)
+
+    def get_messages(self):
+        ''' Return list of messages of the latest alerts, oldest first
+        '''
+        with self._lock:
+            return list(self._messages)
+
+    def close(self):
+        ''' Nothing to close, messages stay readable
+        '''
+
+def format_alert(alert: dict):
+    ''' Return alert as a single line of text
+
+    alert -- alert dictionary
+    '''
+    message = "[%s] zone %d: %s %s %s" % (alert["severity"], alert["zone"], alert["variable"],
+                                         alert["condition"], alert["state"])
+    if alert["value"] is not None:
+        message += " (%s)" % alert["value"]
+    if alert["suppressed"]:
+        message += ", %d repeats suppressed" % alert["suppressed"]
+    return message
+
+def _alert(zone: int, variable: str, condition: str, state: str, severity: str, value, suppressed: int):
+    ''' Return new alert dictionary
+
+    zone -- zone of the alert
+    variable -- environment variable of the alert
+    condition -- warning of the control logic, "high", "low" or "fault"
+    state -- "raised", "repeated", "escalated" or "cleared"
+    severity -- "info", "warning" or "critical"
+    value -- current value of the variable or None
+    suppressed -- number of repeats and changes suppressed since the previous alert of the variable
+    '''
+    return {"time": time.time(), "zone": zone, "variable": variable, "condition": condition, "state": state,
+            "severity": severity, "value": value, "suppressed": suppressed}
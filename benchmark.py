@@ -0,0 +1,410 @@
+'''
+Benchmarks and load tests of the greenhouse environment controller.
+
+Run all benchmarks with:
+    python benchmark.py
+or a single one by its name:
+    python benchmark.py telemetry
+'''
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from telemetry import TelemetryServer
+from history import HistoryStore
+from faults import FaultDetector
+from fusion import fuse
+from simulator import GreenhouseModel
+from replay import TraceReplay, write_trace
+from devices import DeviceBackend, FakeDeviceServer
+from accounting import EffortAccounts
+from actuators import Heater, Lights
+from controller import Environment
+from gui import TrendHistory
+from alerts import AlertEngine, GuiSink
+from power import PowerAllocator
+from montecarlo import MonteCarloStudy
+
+def benchmark_telemetry(clients: int = 300, frames: int = 500):
+    ''' Load test of the telemetry server with many local subscribers
+
+    Publish frames at full speed while all subscribers read them and report the time spent
+    in publish() by the control loop, delivered frames and dropped frames.
+
+    clients -- number of local subscribers
+    frames -- number of frames to publish
+    '''
+    server = TelemetryServer(port=0)
+    server.start()
+
+    async def subscribe(received: list, connected: asyncio.Event):
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        connected.set()
+        count = 0
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            count += 1
+        received.append(count)
+        writer.close()
+
+    async def run():
+        received = []
+        events = [asyncio.Event() for _ in range(clients)]
+        tasks = [asyncio.ensure_future(subscribe(received, event)) for event in events]
+        for event in events:
+            await event.wait()
+        while server.get_metrics()["clients"] < clients:
+            await asyncio.sleep(0.01)
+
+        # publish from a separate thread as the control loop would
+        readings = {"temperature": 25.0, "humidity": 70, "light": 650}
+        warnings = {"temperature": "good", "humidity": "good", "light": "good"}
+        latencies = []
+
+        def publish_all():
+            for _ in range(frames):
+                start = time.perf_counter()
+                server.publish(readings, warnings)
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.get_running_loop().run_in_executor(None, publish_all)
+
+        # give subscribers time to receive the last frames, then disconnect them
+        await asyncio.sleep(1.0)
+        await asyncio.get_running_loop().run_in_executor(None, server.stop)
+        await asyncio.gather(*tasks)
+        return received, latencies
+
+    start = time.perf_counter()
+    received, latencies = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    print("telemetry: %d clients, %d frames in %.2fs" % (clients, frames, elapsed))
+    print("  publish latency: mean %.1fus, p99 %.1fus, max %.1fus" % (
+        sum(latencies) / len(latencies) * 1e6, latencies[int(len(latencies) * 0.99)] * 1e6, latencies[-1] * 1e6))
+    print("  delivered %d of %d frames, dropped %d" % (
+        sum(received), clients * frames, clients * frames - sum(received)))
+
+def benchmark_history(days: int = 90, zones: int = 1, queries: int = 20):
+    ''' Sustained insert rate and query latency of the history store over months of 2-second data
+
+    days -- number of days of readings to insert per zone
+    zones -- number of zones
+    queries -- number of queries of each kind to time
+    '''
+    directory = tempfile.TemporaryDirectory()
+    history = HistoryStore(os.path.join(directory.name, "history.db"), batch_size=10000)
+    history.start()
+
+    rows = days * 24 * 60 * 30
+    start = time.perf_counter()
+    for t in range(rows):
+        for zone in range(zones):
+            history.record_readings({"temperature": 25.0, "humidity": 70, "light": 650}, zone, t * 2.0)
+    queued = time.perf_counter() - start
+    history.flush()
+    elapsed = time.perf_counter() - start
+
+    print("history: %d rows in %.2fs, %.0f rows/s sustained, %.0f rows/s queued by the control loop" % (
+        rows * zones, elapsed, rows * zones / elapsed, rows * zones / queued))
+
+    end = rows * 2.0
+    for name, length, bucket in (("1 hour range", 3600, None), ("1 day range", 86400, None),
+                                 ("1 week in 10 min buckets", 7 * 86400, 600),
+                                 ("all in 1 hour buckets", end, 3600)):
+        latencies = []
+        for _ in range(queries):
+            zone = random.randrange(zones)
+            first = random.uniform(0, max(end - length, 0))
+            query_start = time.perf_counter()
+            if bucket is None:
+                history.query_range(zone, first, first + length)
+            else:
+                history.query_downsampled(zone, first, first + length, bucket)
+            latencies.append(time.perf_counter() - query_start)
+        latencies.sort()
+        print("  %s: median %.2fms, max %.2fms" % (
+            name, latencies[len(latencies) // 2] * 1e3, latencies[-1] * 1e3))
+
+    history.stop()
+    directory.cleanup()
+
+def benchmark_faults(sensors: int = 10000, ticks: int = 200):
+    ''' Time of fault detection of all sensors in one tick
+
+    sensors -- number of sensors checked every tick
+    ticks -- number of ticks to time
+    '''
+    detector = FaultDetector("temperature", sensors)
+    values = [random.uniform(20.0, 30.0) for _ in range(sensors)]
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        values = [value + random.uniform(-0.3, 0.3) for value in values]
+        detector.update(values)
+    elapsed = time.perf_counter() - start
+
+    # time of generating the readings alone, subtracted from the total
+    start = time.perf_counter()
+    for _ in range(ticks):
+        values = [value + random.uniform(-0.3, 0.3) for value in values]
+    elapsed -= time.perf_counter() - start
+
+    print("faults: %d sensors, %.2fms per tick, %.0f readings/s" % (
+        sensors, elapsed / ticks * 1e3, sensors * ticks / elapsed))
+
+def benchmark_fusion(zones: int = 10000, sensors: int = 5, ticks: int = 50):
+    ''' Time of fusing redundant sensor readings of all zones in one tick
+
+    zones -- number of zones
+    sensors -- number of redundant sensors per zone
+    ticks -- number of ticks to time
+    '''
+    readings = [[random.uniform(20.0, 30.0) for _ in range(sensors)] for _ in range(zones)]
+    confidence = [[random.uniform(0.5, 1.0) for _ in range(sensors)] for _ in range(zones)]
+
+    for method in ("median", "trimmed", "weighted"):
+        start = time.perf_counter()
+        for _ in range(ticks):
+            fuse(readings, method, confidence)
+        elapsed = time.perf_counter() - start
+        print("fusion %s: %d zones x %d sensors, %.2fms per tick" % (
+            method, zones, sensors, elapsed / ticks * 1e3))
+
+def benchmark_model(zones: int = 10000, steps: int = 20):
+    ''' Zone-steps per second of the coupled greenhouse model
+
+    zones -- number of zones stepped together
+    steps -- number of solver steps to time
+    '''
+    model = GreenhouseModel(zones, dt=2.0)
+    model.set_weather([random.uniform(0.0, 20.0) for _ in range(zones)], 80.0, 100.0)
+    heating = [random.uniform(0.0, 5000.0) for _ in range(zones)]
+    lamps = [random.uniform(150.0, 850.0) for _ in range(zones)]
+
+    start = time.perf_counter()
+    model.step(steps * 2.0, heating, 0.01, lamps)
+    elapsed = time.perf_counter() - start
+
+    print("model: %d zones, %.2fms per step, %.0f zone-steps/s" % (
+        zones, elapsed / steps * 1e3, zones * steps / elapsed))
+
+def benchmark_replay(records: int = 1000000):
+    ''' Throughput and memory use of replaying a large binary trace as fast as possible
+
+    records -- number of records in the trace
+    '''
+    directory = tempfile.TemporaryDirectory()
+    path = os.path.join(directory.name, "trace.bin")
+    write_trace(path, ({"timestamp": t * 2.0, "zone": t % 100, "temperature": 25.0, "humidity": 70.0,
+                        "light": 650.0} for t in range(records)), binary=True)
+
+    tracemalloc.start()
+    replay = TraceReplay(path, speed=None)
+    start = time.perf_counter()
+    while replay.advance():
+        replay.get_trace_variable("temperature")
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print("replay: %d records (%.0f MB) in %.2fs, %.0f records/s, peak memory %.2f MB" % (
+        replay.replayed, os.path.getsize(path) / 1e6, elapsed, replay.replayed / elapsed, peak / 1e6))
+    directory.cleanup()
+
+def benchmark_devices(devices: int = 500, ticks: int = 20, latency: float = 0.002, failure_rate: float = 0.001):
+    ''' Throughput, latency and failure handling of reading all devices over the device pool
+
+    Each tick reads every variable of all devices concurrently, first from a reliable gateway
+    and then from one that randomly drops connections.
+
+    devices -- number of devices
+    ticks -- number of ticks to time
+    latency -- response latency of the fake gateway in seconds
+    failure_rate -- probability of a dropped connection per request in the unreliable run
+    '''
+    for rate in (0.0, failure_rate):
+        server = FakeDeviceServer(devices, latency=latency, failure_rate=rate, seed=1)
+        server.start()
+        backend = DeviceBackend(server.host, server.port, size=8, timeout=1.0, retries=5, backoff=0.01)
+        backend.start()
+
+        durations = []
+        for _ in range(ticks):
+            start = time.perf_counter()
+            backend.read_all(list(range(devices)))
+            durations.append(time.perf_counter() - start)
+
+        metrics = backend.pool.get_metrics()
+        backend.stop()
+        server.stop()
+        durations.sort()
+
+        print("devices (failure rate %g): %d devices, tick median %.1fms, max %.1fms, %.0f requests/s" % (
+            rate, devices, durations[len(durations) // 2] * 1e3, durations[-1] * 1e3,
+            metrics["requests"] / sum(durations)))
+        print("  failed attempts %d, reconnects %d, dropped connections %d" % (
+            metrics["failures"], metrics["reconnects"], server.dropped))
+
+def benchmark_accounting(ramps: int = 20000, zones: int = 1000):
+    ''' Overhead of effort accounting on the heater ramp
+
+    ramps -- number of heater ramps to time
+    zones -- number of zones in the accounts
+    '''
+    accounts = EffortAccounts(zones)
+    results = {}
+
+    # best of alternating runs, so warm-up does not count against either variant
+    for _ in range(3):
+        for name, account in (("without accounting", None), ("with accounting", accounts)):
+            random.seed(1)
+            env = Environment(25.0, 70, 650)
+            heater = Heater(env, account, zones - 1)
+            start = time.perf_counter()
+            for i in range(ramps):
+                heater.change_temp(21.0 if i % 2 else 27.0)
+            results[name] = min(results.get(name, float("inf")), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    accounts.get_totals()
+    accounts.get_top_zones(10)
+    query = time.perf_counter() - start
+
+    for name, elapsed in results.items():
+        print("accounting: %d heater ramps %s in %.3fs" % (ramps, name, elapsed))
+    print("  overhead %.1f%%, totals and top zones of %d zones in %.2fms" % (
+        (results["with accounting"] / results["without accounting"] - 1) * 100, zones, query * 1e3))
+
+def benchmark_charts(width: int = 680, lengths: tuple = (1000, 100000, 1000000)):
+    ''' Append and redraw cost of a trend chart's history for growing history lengths
+
+    Redraw is timed without Tk, as the decimation producing the points of the line.
+
+    width -- width of the chart in pixels
+    lengths -- numbers of readings in the history
+    '''
+    for length in lengths:
+        history = TrendHistory(capacity=width)
+        start = time.perf_counter()
+        for x in range(length):
+            history.append(x * 2.0, 25.0 + random.uniform(-0.3, 0.3))
+        append = (time.perf_counter() - start) / length
+
+        start = time.perf_counter()
+        for _ in range(20):
+            points = history.decimate(width)
+        redraw = (time.perf_counter() - start) / 20
+
+        print("charts: %d readings, append %.2fus, redraw %.2fms with %d points" % (
+            length, append * 1e6, redraw * 1e3, len(points)))
+
+def benchmark_alerts(zones: int = 500, ticks: int = 200, delay: float = 0.05):
+    ''' Tick cost of the alert engine during an alert storm with a slow sink
+
+    Every zone flaps between conditions every tick. Suppression is turned off, so each tick raises an
+    alert for every zone, the worst case for delivery. With a suppression window the flapping of a
+    zone would only raise one alert per window.
+
+    zones -- number of zones
+    ticks -- number of ticks to time
+    delay -- number of seconds the slow sink takes per batch
+    '''
+    class SlowSink(GuiSink):
+        def send(self, alerts):
+            time.sleep(delay)
+            super().send(alerts)
+
+    engine = AlertEngine([GuiSink(), SlowSink()], suppress=0.0)
+    engine.start()
+    storm = [[{"temperature": condition, "humidity": "good", "light": "good"}] * zones for condition in ("high", "low")]
+
+    start = time.perf_counter()
+    worst = 0.0
+    for tick in range(ticks):
+        tick_start = time.perf_counter()
+        engine.update_zones(storm[tick % 2])
+        worst = max(worst, time.perf_counter() - tick_start)
+    elapsed = time.perf_counter() - start
+    engine.stop()
+
+    metrics = engine.get_metrics()
+    print("alerts: %d zones, %d alerts in %.3fs, %.2fms per tick, worst %.2fms" % (
+        zones, metrics["raised"], elapsed, elapsed / ticks * 1e3, worst * 1e3))
+    print("  sinks dropped %d of %d alert deliveries" % (metrics["dropped"], metrics["raised"] * 2))
+
+def benchmark_power(zones: tuple = (1000, 5000, 20000), rounds: int = 20):
+    ''' Allocation time of the site power allocator for growing numbers of zones
+
+    Every zone requests both a heater and a lights rise, and the cap covers a third of the requested power.
+
+    zones -- numbers of zones
+    rounds -- number of allocations to time for each number of zones
+    '''
+    env = Environment(20.0, 70, 500)
+    heater = Heater(env)
+    lights = Lights(env)
+
+    for count in zones:
+        priorities = [random.uniform(0.5, 2.0) for _ in range(count)]
+        elapsed = 0.0
+        for _ in range(rounds):
+            # every round starts from a fresh allocator without requests
+            site = PowerAllocator(0.0, priorities=priorities)
+            for zone in range(count):
+                site.request(zone, "heater", heater, random.uniform(15.0, 20.9), 21.0)
+                site.request(zone, "lights", lights, random.randint(150, 599), 600)
+            site.cap = sum(site.pending_power()) / 3
+            start = time.perf_counter()
+            site.allocate()
+            elapsed += time.perf_counter() - start
+
+        print("power: %d zones, %d requests allocated in %.2fms, %d throttled" % (
+            count, count * 2, elapsed / rounds * 1e3, site.throttled))
+
+def benchmark_montecarlo(runs: int = 400, ticks: int = 1000):
+    ''' Throughput of a Monte Carlo study with one worker process and with one per CPU
+
+    runs -- number of runs of the study
+    ticks -- number of control loop iterations of each run
+    '''
+    for processes in (1, os.cpu_count()):
+        with tempfile.TemporaryDirectory() as directory:
+            study = MonteCarloStudy(os.path.join(directory, "study.jsonl"), runs, ticks, processes=processes)
+            start = time.perf_counter()
+            result = study.run()
+            elapsed = time.perf_counter() - start
+
+        print("montecarlo: %d runs of %d ticks with %d processes in %.2fs, %.0f runs/s" % (
+            runs, ticks, processes, elapsed, runs / elapsed))
+
+    for variable, interval in result.items():
+        print("  %s in band %.2f%% (95%% CI %.2f - %.2f%%)" % (
+            variable, interval["mean"] * 100, interval["low"] * 100, interval["high"] * 100))
+
+benchmarks = {
+    "telemetry": benchmark_telemetry,
+    "history": benchmark_history,
+    "faults": benchmark_faults,
+    "fusion": benchmark_fusion,
+    "model": benchmark_model,
+    "replay": benchmark_replay,
+    "devices": benchmark_devices,
+    "accounting": benchmark_accounting,
+    "charts": benchmark_charts,
+    "alerts": benchmark_alerts,
+    "power": benchmark_power,
+    "montecarlo": benchmark_montecarlo
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(benchmarks)
+    for name in names:
+        benchmarks[name]()
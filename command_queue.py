@@ -0,0 +1,128 @@
+'''
+Command queues coalescing targets sent to actuators by different parts of the controller.
+
+Control logic, manual overrides or schedules can all send targets to the same actuator.
+Instead of running every command to completion, they submit targets to the actuator's queue:
+    - a pending target is replaced by the latest one (the commands are coalesced)
+    - a target equal to the current environment value is dropped as no-op
+    - the actuator runs at most max_rate commands per second, the pending target waits for the next pump
+'''
+
+import threading
+import time
+from actuators import Heater, Humidifier, Lights
+
+# method changing the environment and the environment variable of each actuator type
+commands = {
+    Heater: ("change_temp", "temperature"),
+    Humidifier: ("change_humidity", "humidity"),
+    Lights: ("change_light", "light")
+}
+
+class CommandQueue:
+    ''' Queue of commands for a single actuator
+
+    Attributes:
+    actuator -- actuator executing the commands
+    variable -- environment variable changed by the actuator
+    min_interval -- minimum number of seconds between two executed commands
+    submitted -- number of submitted commands
+    coalesced -- number of pending commands replaced by a newer command
+    dropped -- number of commands dropped because the target was already reached
+    executed -- number of commands executed by the actuator
+    rate_limited -- number of pumps that had to wait because of the rate limit
+    '''
+    def __init__(self, actuator, max_rate: float = 1.0, clock=time.monotonic):
+        ''' Initialize queue of the actuator
+
+        actuator -- Heater, Humidifier or Lights instance
+        max_rate -- maximum number of executed commands per second
+        clock -- function returning current time in seconds
+        '''
+        if type(actuator) not in commands:
+            raise TypeError("Actuator must be Heater, Humidifier or Lights.")
+
+        if max_rate <= 0:
+            raise ValueError("Maximum command rate must be positive.")
+
+        self.actuator = actuator
+        method, self.variable = commands[type(actuator)]
+        self._change = getattr(actuator, method)
+        self.min_interval = 1.0 / max_rate
+        self.clock = clock
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.executed = 0
+        self.rate_limited = 0
+
+        self._pending = None
+        self._last_executed = None
+        self._lock = threading.Lock()
+
+    def submit(self, target):
+        ''' Submit a new target for the actuator, return True if the target is pending
+
+        target -- desired value of the environment variable
+        '''
+        # compare the target the actuator would actually reach
+        reachable = min(max(target, self.actuator.min), self.actuator.max)
+        current = self.actuator.env.get_environment_variable(self.variable)
+
+        with self._lock:
+            self.submitted += 1
+
+            if self._pending is not None:
+                self.coalesced += 1
+                self._pending = None
+
+            if reachable == current:
+                self.dropped += 1
+                return False
+
+            self._pending = target
+            return True
+
+    def pump(self):
+        ''' Execute the pending command if the rate limit allows it
+
+        Return the executed target, or None if nothing was executed.
+        '''
+        with self._lock:
+            if self._pending is None:
+                return None
+
+            now = self.clock()
+            if self._last_executed is not None and now - self._last_executed < self.min_interval:
+                self.rate_limited += 1
+                return None
+
+            target = self._pending
+            self._pending = None
+            self._last_executed = now
+            self.executed += 1
+
+        self._change(target)
+        return target
+
+    def get_metrics(self):
+        ''' Return dictionary with queue depth and command counters
+        '''
+        with self._lock:
+            return {
+                "depth": 0 if self._pending is None else 1,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "executed": self.executed,
+                "rate_limited": self.rate_limited
+            }
+
+def initialize_command_queues(actuators: dict, max_rate: float = 1.0):
+    ''' Create a command queue for each actuator and return dictionary of queues
+
+    actuators -- dictionary of actuators
+    max_rate -- maximum number of executed commands per second of each actuator
+    '''
+    return {name: CommandQueue(actuator, max_rate) for name, actuator in actuators.items()}
@@ -0,0 +1,251 @@
+'''
+Hot reload of ideal conditions and actuator limits from an external JSON configuration file.
+
+The file is checked only by its modification time and size, at most once per interval, and it is
+parsed only when it has changed. Example of a configuration file, every part is optional:
+    {
+        "ideal_condition": {"temp_upper": 27.0, "temp_lower": 21.0, "humidity_upper": 80,
+                            "humidity_lower": 65, "light_upper": 700, "light_lower": 600},
+        "actuators": {"heater": {"min": 15.0, "max": 40.0, "change": 0.3},
+                      "humidifier": {"min": 40, "max": 100, "change": 2},
+                      "lights": {"min": 150, "max": 850, "change": 10}},
+        "schedule": {"phases": [["06:00", {...ideal conditions of the day...}],
+                                ["20:00", {...ideal conditions of the night...}]], "ramp": 30}
+    }
+
+A changed configuration is checked against the current values of every zone first, and only
+when it is valid for all of them, it is applied to all zones at once. An invalid configuration
+is rejected and the previous one stays in effect.
+
+Environments with a schedule take their ideal conditions from the schedule. The schedule part
+replaces the schedule of every zone, and a schedule of null returns them to static ideal
+conditions. Ideal conditions of the file would have no effect on zones following a schedule, so
+a configuration with ideal conditions is rejected unless no zone follows a schedule after it is
+applied.
+'''
+
+import json
+import os
+import time
+from schedules import Schedule
+
+# environment boundaries of each variable and whether its values must be integers
+boundaries = {
+    "temp": (15.0, 40.0, False),
+    "humidity": (40, 100, True),
+    "light": (150, 850, True)
+}
+
+# prefix of ideal condition keys of the variable changed by each actuator
+actuator_conditions = {"heater": "temp", "humidifier": "humidity", "lights": "light"}
+
+class ConfigWatcher:
+    ''' Watcher applying changes of a configuration file to environments and actuators of all zones
+
+    Attributes:
+    path -- path to the configuration file
+    environments -- list of environments of all zones
+    actuators -- list of dictionaries of actuators of all zones
+    interval -- minimum number of seconds between two checks of the file
+    applied -- number of applied configurations
+    rejected -- number of rejected configurations
+    error -- reason the last configuration was rejected, None if it was applied
+    '''
+    def __init__(self, path: str, environments: list, actuators: list, interval: float = 5.0, clock=time.monotonic):
+        ''' Initialize watcher, the file is first checked by the first poll
+
+        path -- path to the configuration file
+        environments -- list of environments of all zones
+        actuators -- list of dictionaries of actuators of all zones
+        interval -- minimum number of seconds between two checks of the file
+        clock -- function returning current time in seconds
+        '''
+        self.path = path
+        self.environments = environments
+        self.actuators = actuators
+        self.interval = interval
+        self.applied = 0
+        self.rejected = 0
+        self.error = None
+
+        self._clock = clock
+        self._last_check = None
+        self._signature = None
+
+    def poll(self):
+        ''' Check the file if the interval has passed and apply it if it has changed
+
+        Return True when a new configuration was applied. Must be called between control ticks.
+        '''
+        now = self._clock()
+        if self._last_check is not None and now - self._last_check < self.interval:
+            return False
+        self._last_check = now
+
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+
+        # the same file is not parsed again, whether it was applied or rejected
+        self._signature = signature
+
+        try:
+            with open(self.path) as file:
+                config = json.load(file)
+            apply_config(config, self.environments, self.actuators)
+        except (OSError, ValueError, TypeError) as e:
+            self.rejected += 1
+            self.error = str(e)
+            print("Configuration %s rejected, keeping previous configuration: %s" % (self.path, e))
+            return False
+
+        self.applied += 1
+        self.error = None
+        return True
+
+def apply_config(config: dict, environments: list, actuators: list):
+    ''' Check configuration against every zone and apply it to all of them, or raise ValueError and apply nothing
+
+    config -- dictionary with optional ideal_condition, actuators and schedule parts
+    environments -- list of environments of all zones
+    actuators -- list of dictionaries of actuators of all zones
+    '''
+    if not isinstance(config, dict):
+        raise ValueError("Configuration must be a JSON object.")
+
+    for key in config:
+        if key not in ("ideal_condition", "actuators", "schedule"):
+            raise ValueError("Invalid configuration part: %s" % key)
+
+    ideal_changes = config.get("ideal_condition", {})
+    actuator_changes = config.get("actuators", {})
+    _check_ideal_condition(ideal_changes)
+    _check_actuators(actuator_changes)
+
+    if "schedule" in config:
+        schedules = [_build_schedule(config["schedule"])] * len(environments)
+    else:
+        schedules = [environment.schedule for environment in environments]
+
+    # ideal conditions of the file would be silently ignored by a zone following a schedule
+    if ideal_changes and any(schedule is not None for schedule in schedules):
+        raise ValueError("Ideal conditions have no effect on zones following a schedule, "
+                         "set schedule to null to use them.")
+
+    # build every new state first, so a problem in any zone leaves all zones unchanged
+    new_conditions = []
+    for environment in environments:
+        conditions = dict(environment.ideal_condition, **ideal_changes)
+        for prefix in boundaries:
+            if conditions[prefix + "_lower"] > conditions[prefix + "_upper"]:
+                raise ValueError("Lower %s bound is above the upper bound." % prefix)
+        new_conditions.append(conditions)
+
+    new_limits = []
+    for zone_actuators in actuators:
+        for name, changes in actuator_changes.items():
+            actuator = zone_actuators[name]
+            limits = {"min": actuator.min, "max": actuator.max, "change": actuator.change}
+            limits.update(changes)
+            if limits["min"] >= limits["max"]:
+                raise ValueError("Minimum of %s must be below its maximum." % name)
+            new_limits.append((actuator, limits))
+
+    # apply, the ideal condition dictionary of each environment is replaced as a whole
+    for environment, conditions, schedule in zip(environments, new_conditions, schedules):
+        environment.ideal_condition = conditions
+        environment.set_schedule(schedule)
+
+    for actuator, limits in new_limits:
+        actuator.min = limits["min"]
+        actuator.max = limits["max"]
+        actuator.change = limits["change"]
+
+def _build_schedule(schedule):
+    ''' Return Schedule compiled from the schedule part, None when the part is null
+
+    schedule -- dictionary with phases and optional ramp, or None
+    '''
+    if schedule is None:
+        return None
+
+    if not isinstance(schedule, dict):
+        raise ValueError("Schedule must be a JSON object or null.")
+
+    for key in schedule:
+        if key not in ("phases", "ramp"):
+            raise ValueError("Invalid schedule key: %s" % key)
+
+    phases = schedule.get("phases")
+    if not isinstance(phases, list):
+        raise ValueError("Phases of the schedule must be a JSON array.")
+
+    for phase in phases:
+        if not isinstance(phase, list) or len(phase) != 2 or not isinstance(phase[1], dict):
+            raise ValueError("Phase of the schedule must be an array of start and ideal conditions.")
+        _check_ideal_condition(phase[1])
+
+    try:
+        return Schedule([tuple(phase) for phase in phases], schedule.get("ramp", 30))
+    except TypeError as e:
+        raise ValueError(str(e))
+
+def _check_ideal_condition(conditions: dict):
+    ''' Check types and boundaries of ideal condition values
+
+    conditions -- dictionary of changed ideal condition values
+    '''
+    if not isinstance(conditions, dict):
+        raise ValueError("Ideal condition must be a JSON object.")
+
+    for key, value in conditions.items():
+        prefix, _, bound = key.rpartition("_")
+        if prefix not in boundaries or bound not in ("upper", "lower"):
+            raise ValueError("Invalid ideal condition: %s" % key)
+        _check_value(key, value, prefix)
+
+def _check_actuators(actuators: dict):
+    ''' Check types and boundaries of actuator limits
+
+    actuators -- dictionary of changed limits of each actuator
+    '''
+    if not isinstance(actuators, dict):
+        raise ValueError("Actuators must be a JSON object.")
+
+    for name, limits in actuators.items():
+        if name not in actuator_conditions:
+            raise ValueError("Invalid actuator: %s" % name)
+        if not isinstance(limits, dict):
+            raise ValueError("Limits of %s must be a JSON object." % name)
+
+        prefix = actuator_conditions[name]
+        for key, value in limits.items():
+            if key not in ("min", "max", "change"):
+                raise ValueError("Invalid limit of %s: %s" % (name, key))
+
+            if key == "change":
+                if type(value) not in (int, float) or value <= 0:
+                    raise ValueError("Change of %s must be a positive number." % name)
+            else:
+                _check_value("%s %s" % (name, key), value, prefix)
+
+def _check_value(name: str, value, prefix: str):
+    ''' Check that value has the right type and is within the environment boundaries of its variable
+
+    name -- name of the value for error messages
+    value -- value to check
+    prefix -- prefix of ideal condition keys of the variable
+    '''
+    low, high, integer = boundaries[prefix]
+
+    if integer and type(value) != int:
+        raise ValueError("%s must be an integer." % name)
+    if not integer and type(value) not in (int, float):
+        raise ValueError("%s must be a number." % name)
+    if value < low or value > high:
+        raise ValueError("%s must be between %s and %s." % (name, low, high))
@@ -6,8 +6,26 @@ and managing the main loop for controlling the system.
 
 from sensors import TemperatureSensor, LightSensor, HumiditySensor
 from actuators import Heater, Humidifier, Lights
-from gui import update_gui, initialize_gui, display_warning
-from time import sleep
+from gui import update_gui, initialize_gui, display_warning, GuiUpdateQueue, run_gui, update_charts
+from telemetry import TelemetryServer
+from history import HistoryStore
+from faults import FAULT_NONE, initialize_fault_detectors
+from fusion import fuse
+from command_queue import initialize_command_queues
+from schedules import default_schedule
+from accounting import EffortAccounts
+from config import ConfigWatcher
+from alerts import AlertEngine, LogSink, GuiSink
+from time import sleep, time
+import threading
+import simulator
+
+# environment variables with their actuator and prefix of their ideal condition keys
+controls = {
+    "temperature": ("heater", "temp"),
+    "humidity": ("humidifier", "humidity"),
+    "light": ("lights", "light")
+}
 
 class Environment():
     ''' Class representing the greenhouse environment
@@ -15,6 +33,7 @@ class Environment():
     Attributes:
     environment -- dictionary storing temperature, humidity and light values
     ideal_condition -- dictionary storing ideal environment conditions
+    schedule -- optional Schedule of ideal conditions replacing ideal_condition
     '''
     def __init__(self, temp: float, humidity: int, light: int):
         ''' Initialize environment with values given in from parameters
@@ -42,6 +61,8 @@ class Environment():
             "light_lower": 600
         }
 
+        self.schedule = None
+
     def set_environment(self, variable: str, value):
         ''' Update the value of a specific environmental variable
 
@@ -90,28 +111,85 @@ class Environment():
         else:
             raise ValueError("Invalid environment variable: %s" % variable)
         
-    def get_ideal_conditions(self):
+    def set_schedule(self, schedule):
+        ''' Set schedule of ideal conditions, None returns to the static ideal condition
+
+        schedule -- Schedule instance or None
+        '''
+        self.schedule = schedule
+
+    def get_ideal_conditions(self, now: float = None):
         ''' Return dictionary containing ideal condition of environment
+
+        When the environment has a schedule, the ideal condition of the current time is returned.
+
+        now -- time in seconds since epoch, default: current time
         '''
+        if self.schedule is not None:
+            return self.schedule.lookup(now)
         return self.ideal_condition
 
 def main():
     ''' Main function to create environment and initialize sensors, actuators, GUI and to start the main control loop
     '''
-    # create environment
+    # create environment following the default day and night schedule
     environment = Environment(25.0,67,650)
+    environment.set_schedule(default_schedule())
 
-    # initialize sensors and actuators
+    # initialize sensors and actuators, accounting effort and energy of the actuators
+    accounts = EffortAccounts()
     sensors = initialize_sensors(environment)
-    actuators = initialize_actuators(environment)
+    actuators = initialize_actuators(environment, accounts)
 
     # initialize gui and put gui data into dictionary
     gui = initialize_gui()
-        
-    # main control loop 
-    manage_environment(environment, sensors, actuators, gui)
 
-def manage_environment(env, sensors: dict, actuators: dict, gui: dict, i: int = -1):
+    # start telemetry server for local clients
+    telemetry = TelemetryServer()
+    telemetry.start()
+
+    # start history store recording readings and actions
+    history = HistoryStore()
+    history.start()
+
+    # initialize fault detection of sensor readings
+    faults = initialize_fault_detectors()
+
+    # initialize command queues coalescing targets of actuators
+    queues = initialize_command_queues(actuators)
+
+    # watch configuration file for changes of the schedule, ideal conditions and actuator limits,
+    # ideal conditions of the file are rejected until the file sets the schedule to null
+    config = ConfigWatcher("greenhouse.json", [environment], [actuators])
+
+    # start alert engine delivering alerts to the log file and the GUI
+    gui_alerts = GuiSink()
+    alerts = AlertEngine([LogSink(), gui_alerts])
+    alerts.start()
+        
+    # run main control loop in a worker thread, passing ticks to the GUI through a bounded queue
+    updates = GuiUpdateQueue()
+    stop = threading.Event()
+    worker = threading.Thread(target=manage_environment, args=(environment, sensors, actuators, None),
+                              kwargs={"telemetry": telemetry, "history": history, "faults": faults,
+                                      "queues": queues, "updates": updates, "stop": stop,
+                                      "config": config, "alerts": alerts},
+                              name="controller", daemon=True)
+    worker.start()
+
+    # run GUI on the main thread until the window is closed
+    try:
+        run_gui(gui, updates, stop, alerts=gui_alerts)
+    finally:
+        stop.set()
+        worker.join()
+        alerts.stop()
+        telemetry.stop()
+        history.stop()
+
+def manage_environment(env, sensors: dict, actuators: dict, gui: dict, i: int = -1, telemetry=None, history=None,
+                       faults=None, fusion: str = "median", queues=None, updates=None, stop=None, interval: float = 2,
+                       trace=None, source: str = "simulator", config=None, alerts=None):
     ''' Main control loop to simulate greenhouse environment controller managing the environment
 
     In the while loop, the controller continually fetches data about the environment
@@ -128,68 +206,357 @@ def manage_environment(env, sensors: dict, actuators: dict, gui: dict, i: int =
     gui -- dictionary containing root of gui and labels for environmental variables
     i -- determine the number of iterations for while loop
         default: -1 (infinite while loop)
+    telemetry -- optional TelemetryServer publishing readings and warnings of every tick
+    history -- optional HistoryStore recording readings and actuator actions of every tick
+    faults -- optional dictionary of FaultDetector for each environment variable
+    fusion -- fusion method of redundant sensor readings
+    queues -- optional dictionary of CommandQueue for each actuator
+    updates -- optional GuiUpdateQueue passing readings and warnings to the GUI running in another
+        thread, the gui dictionary is not touched and can be None
+    stop -- optional event ending the loop when set
+    interval -- number of seconds to wait between iterations
+    trace -- optional TraceReplay the sensors read from, one record per iteration paced by the replay
+        instead of the interval, the loop ends with the trace
+    source -- source of sensor data without a trace, "simulator" or "environment"
+    config -- optional ConfigWatcher applying changes of the configuration file between iterations
+    alerts -- optional AlertEngine raising alerts from the warnings of every tick
     '''
-    while (i+1) != True:
-        # fetch data from sensors
-        temperature_data = sensors["temperature"].get_simulator_data()
-        humidity_data = sensors["humidity"].get_simulator_data()
-        light_data = sensors["light"].get_simulator_data()
-        
-        # send environment data to GUI
-        gui["root"].after(0, update_gui, gui["temp_label"], gui["humidity_label"], gui["light_label"], 
-                   temperature_data, humidity_data, light_data)
-
-        # get ideal environment condition
-        ideal_conditions = env.get_ideal_conditions()
-
-        # send warning if environment status not ideal and activate actuators
-        if temperature_data > ideal_conditions["temp_upper"] or temperature_data < ideal_conditions["temp_lower"]:
-            if temperature_data > ideal_conditions["temp_upper"]:
-                display_warning(gui["warning_label_temperature"],"temperature", "high")
-                actuators["heater"].change_temp(ideal_conditions["temp_upper"])
-            else:
-                display_warning(gui["warning_label_temperature"], "temperature", "low")
-                actuators["heater"].change_temp(ideal_conditions["temp_lower"])
+    while (i+1) != True and not (stop is not None and stop.is_set()):
+        # apply changed configuration before the tick, so a tick never sees a partial change
+        if config is not None:
+            config.poll()
+
+        # move to the next record of the replayed trace
+        if trace is not None and not trace.advance():
+            break
+
+        # a replayed tick happens at the time of its record, so it is checked against the ideal
+        # conditions of that time and recorded with it
+        now = trace.current["timestamp"] if trace is not None else None
+
+        # fetch data from sensors, check them against ideal condition and activate actuators
+        readings, warnings = control_tick(env, sensors, actuators, history, faults, fusion, queues, trace, source,
+                                          now=now)
+
+        # record readings to history
+        if history is not None:
+            history.record_readings(readings, timestamp=now)
+
+        # raise alerts of changed conditions, delivered by the alert engine threads
+        if alerts is not None:
+            alerts.update(warnings, readings=readings)
+
+        if updates is not None:
+            # hand the tick over to the GUI thread, never waits for rendering
+            updates.put(readings, warnings, now)
+        elif gui is not None:
+            # send environment data to GUI
+            gui["root"].after(0, update_gui, gui["temp_label"], gui["humidity_label"], gui["light_label"], 
+                       readings["temperature"], readings["humidity"], readings["light"])
+
+            # send warnings to GUI
+            display_warning(gui["warning_label_temperature"], "temperature", warnings["temperature"])
+            display_warning(gui["warning_label_humidity"], "humidity", warnings["humidity"])
+            display_warning(gui["warning_label_light"], "light", warnings["light"])
+
+            # append readings to trend charts, stamped with the time of the tick
+            if "charts" in gui:
+                update_charts(gui["charts"], [(time() if now is None else now, readings)])
+
+        # publish the tick to telemetry subscribers
+        if telemetry is not None:
+            telemetry.publish(readings, warnings)
+
+        # update gui
+        if updates is None and gui is not None:
+            gui["root"].update()
 
+        # decrement i to continue while loop
+        i -= 1
+
+        # wait before next loop, waking up early when stopped
+        if trace is not None:
+            continue
+        elif stop is not None:
+            stop.wait(interval)
         else:
-            display_warning(gui["warning_label_temperature"], "temperature", "good")
+            sleep(interval)
 
-        if humidity_data > ideal_conditions["humidity_upper"] or humidity_data < ideal_conditions["humidity_lower"]:
-            if humidity_data > ideal_conditions["humidity_upper"]:
-                display_warning(gui["warning_label_humidity"], "humidity", "high")
-                actuators["humidifier"].change_humidity(ideal_conditions["humidity_upper"])
-            else:
-                display_warning(gui["warning_label_humidity"], "humidity", "low")
-                actuators["humidifier"].change_humidity(ideal_conditions["humidity_lower"])
+def control_tick(env, sensors: dict, actuators: dict, history=None, faults=None, fusion: str = "median",
+                 queues=None, trace=None, source: str = "simulator", site=None, zone: int = 0, now: float = None):
+    ''' Run a single iteration of the control logic
+
+    Fetch data from the sensors, compare them with the ideal environment condition and activate
+    actuators for every variable that is not in ideal state. 
+    Return tuple of dictionaries (readings, warnings), where warnings hold "high", "low", "good"
+    or "fault" for every environment variable.
+
+    Readings that are missing or flagged by a fault detector are reported as "fault" and
+    the actuator of the variable is left alone.
 
-        else: 
-            display_warning(gui["warning_label_humidity"], "humidity", "good")
+    A variable can be measured by a list of redundant sensors. The simulator advances the variable,
+    or the environment is read, once per tick and every redundant sensor measures that value with
+    its own noise. Their readings
+    that are not flagged as faulty are fused into a single reading, and the variable is reported
+    as "fault" only when none of the sensors gives a valid reading.
 
-        if light_data > ideal_conditions["light_upper"] or light_data < ideal_conditions["light_lower"]:
-            if light_data > ideal_conditions["light_upper"]:
-                display_warning(gui["warning_label_light"], "light", "high")
-                actuators["lights"].change_light(ideal_conditions["light_upper"])
+    env -- greenhouse environment instance
+    sensors -- dictionary of sensors, or lists of redundant sensors
+    actuators -- dictionary of actuators
+    history -- optional HistoryStore recording actuator actions
+    faults -- optional dictionary of FaultDetector for each environment variable
+    fusion -- fusion method of redundant sensor readings, one of median, trimmed and weighted
+    queues -- optional dictionary of CommandQueue for each actuator, pending commands are executed
+        at the end of the tick as the rate limit allows
+    trace -- optional TraceReplay the sensors read from instead of the simulator
+    source -- source of sensor data without a trace, "simulator" or "environment"
+    site -- optional PowerAllocator of the site, rises of temperature and light are requested from it
+        instead of activating the actuators, they are executed by its dispatch() after all zones ticked,
+        or submitted to the command queues by it and executed by the next tick
+    zone -- zone of the environment
+    now -- time of the tick in seconds since epoch, scheduled ideal conditions are looked up and actions
+        recorded at this time, default: current time
+    '''
+    readings = {}
+    warnings = {}
+
+    # get ideal environment condition
+    ideal_conditions = env.get_ideal_conditions(now)
+
+    # set warning if environment status not ideal and activate actuators
+    for variable in controls:
+        sensor = sensors[variable]
+
+        # fetch data from sensors
+        if isinstance(sensor, list):
+            values = read_redundant(sensor, variable, trace, source)
+            if faults is not None:
+                flags = faults[variable].update(values)
+                values = [None if flag != FAULT_NONE else value for value, flag in zip(values, flags)]
+
+            value = fuse([values], fusion, [[redundant_sensor.confidence for redundant_sensor in sensor]])[0]
+            faulty = value is None
+        else:
+            value = read_sensor(sensor, trace, source)
+            if faults is not None:
+                faulty = faults[variable].update([value])[0] != FAULT_NONE
             else:
-                display_warning(gui["warning_label_light"], "light", "low")
-                actuators["lights"].change_light(ideal_conditions["light_lower"])
+                faulty = value is None
+
+        readings[variable] = value
+        warnings[variable], actuated = respond(variable, None if faulty else value, ideal_conditions, actuators,
+                                               history, queues, site, zone, now)
+
+        # the actuator moves the variable faster than the fault detector's rate limit,
+        # queued commands are expected once they are executed
+        if faults is not None and queues is None and actuated:
+            faults[variable].expect()
+
+    # execute pending commands of all actuator queues
+    if queues is not None:
+        for variable in pump_queues(queues, history, now):
+            if faults is not None:
+                faults[variable].expect()
+
+    return readings, warnings
+
+def control_site(environments: list, sensors: list, actuators: list, history=None, faults=None,
+                 fusion: str = "median", queues: list = None, source: str = "simulator", site=None, now: float = None):
+    ''' Run a single iteration of the control logic of every zone of a site, return list of (readings, warnings) per zone
+
+    Works like control_tick for every zone, but the readings of a variable of all zones are checked
+    by a single fault detector update and fused by a single fuse() call, so each variable takes one
+    batched operation per tick however many zones the site has.
+
+    environments -- list of environments of all zones
+    sensors -- list of dictionaries of sensors, or lists of redundant sensors, one per zone
+    actuators -- list of dictionaries of actuators, one per zone
+    history -- optional HistoryStore recording actuator actions
+    faults -- optional dictionary of FaultDetector for each environment variable watching the sensors
+        of all zones in zone order, e.g. initialize_fault_detectors(zones * redundancy)
+    fusion -- fusion method of redundant sensor readings, one of median, trimmed and weighted
+    queues -- optional list of dictionaries of CommandQueue for each actuator, one per zone
+    source -- source of sensor data, "simulator" or "environment"
+    site -- optional PowerAllocator of the site, as in control_tick
+    now -- time of the tick in seconds since epoch, default: current time
+    '''
+    ideal_conditions = [env.get_ideal_conditions(now) for env in environments]
+    results = [({}, {}) for _ in environments]
+
+    for variable in controls:
+        groups = [zone_sensors[variable] if isinstance(zone_sensors[variable], list) else [zone_sensors[variable]]
+                  for zone_sensors in sensors]
+        rows = [read_redundant(group, variable, source=source) for group in groups]
+
+        # first sensor of every zone in the fault detector watching all zones
+        offsets = [0]
+        for group in groups:
+            offsets.append(offsets[-1] + len(group))
+
+        if faults is not None:
+            flags = faults[variable].update([value for row in rows for value in row])
+            rows = [[None if flags[offset + index] != FAULT_NONE else value for index, value in enumerate(row)]
+                    for offset, row in zip(offsets, rows)]
+
+        fused = fuse(rows, fusion, [[sensor.confidence for sensor in group] for group in groups])
+
+        for zone, value in enumerate(fused):
+            readings, warnings = results[zone]
+            readings[variable] = value
+            warnings[variable], actuated = respond(variable, value, ideal_conditions[zone], actuators[zone], history,
+                                                   None if queues is None else queues[zone], site, zone, now)
+            if faults is not None and queues is None and actuated:
+                faults[variable].expect(range(offsets[zone], offsets[zone + 1]))
+
+    if queues is not None:
+        for zone, zone_queues in enumerate(queues):
+            for variable in pump_queues(zone_queues, history, now):
+                if faults is not None:
+                    faults[variable].expect(range(offsets[zone], offsets[zone + 1]))
+
+    return results
+
+def respond(variable: str, value, ideal_conditions: dict, actuators: dict, history=None, queues=None, site=None,
+            zone: int = 0, now: float = None):
+    ''' Compare a reading with the ideal condition and activate the actuator of the variable if needed
+
+    Return tuple of the warning of the variable and whether its actuator was activated.
+
+    variable -- environment variable
+    value -- valid reading of the variable, None for a missing or faulty reading
+    ideal_conditions -- dictionary of ideal conditions
+    actuators -- dictionary of actuators
+    history -- optional HistoryStore recording actuator actions
+    queues -- optional dictionary of CommandQueue for each actuator
+    site -- optional PowerAllocator of the site
+    zone -- zone of the reading
+    now -- time of the tick in seconds since epoch, default: current time
+    '''
+    actuator, condition = controls[variable]
+
+    if value is None:
+        return "fault", False
+    elif value > ideal_conditions[condition + "_upper"]:
+        return "high", activate_actuator(actuators, actuator, ideal_conditions[condition + "_upper"], history,
+                                         queues, now)
+    elif value < ideal_conditions[condition + "_lower"]:
+        if site is not None and actuator in site.unit_power:
+            site.request(zone, actuator, actuators[actuator], value, ideal_conditions[condition + "_lower"],
+                         None if queues is None else queues[actuator])
+            return "low", True
+        return "low", activate_actuator(actuators, actuator, ideal_conditions[condition + "_lower"], history,
+                                        queues, now)
+    return "good", False
+
+def pump_queues(queues: dict, history=None, now: float = None):
+    ''' Execute pending commands of all actuator queues of a zone, return list of variables whose command was executed
+
+    queues -- dictionary of CommandQueue for each actuator
+    history -- optional HistoryStore recording actuator actions
+    now -- time the actions are recorded at in seconds since epoch, default: current time
+    '''
+    executed = []
+    for variable, (actuator, _) in controls.items():
+        try:
+            target = queues[actuator].pump()
+        except OSError as e:
+            print("Error activating %s: %s" % (actuator, e))
+            continue
+        if target is not None:
+            executed.append(variable)
+            if history is not None:
+                history.record_action(actuator, target, timestamp=now)
+    return executed
+
+def read_redundant(sensors: list, variable: str, trace=None, source: str = "simulator"):
+    ''' Fetch readings of a variable from a list of redundant sensors of the same environment
+
+    The simulator advances the variable, or the environment is read, once and every sensor measures
+    that value with its own noise. Sensors of a replayed trace read the trace each.
+
+    sensors -- list of redundant sensors
+    variable -- environment variable measured by the sensors
+    trace -- optional TraceReplay to read from
+    source -- source of sensor data without a trace, "simulator" or "environment"
+    '''
+    if trace is None and source in ("simulator", "environment"):
+        if source == "simulator":
+            shared = simulator.get_simulator_data(variable, sensors[0].env)
+        else:
+            shared = sensors[0].get_environment_data(sensors[0].env)
+        return [sensor.get_measured_data(shared) for sensor in sensors]
+    return [read_sensor(sensor, trace, source) for sensor in sensors]
 
-        else: 
-            display_warning(gui["warning_label_light"], "light", "good")
+def read_sensor(sensor, trace=None, source: str = "simulator"):
+    ''' Fetch data from the sensor, from the current record of a replayed trace if given, otherwise from the source
 
-        # update gui
-        gui["root"].update()
+    sensor -- sensor instance
+    trace -- optional TraceReplay to read from
+    source -- "simulator" to read simulated data, "environment" to read the sensor's environment directly,
+        e.g. a DeviceEnvironment of a real device
+    '''
+    if trace is not None:
+        return sensor.get_trace_data(trace)
+    elif source == "simulator":
+        return sensor.get_simulator_data()
+    elif source == "environment":
+        return sensor.get_environment_data(sensor.env)
+    else:
+        raise ValueError("Invalid sensor source: %s" % source)
+
+def activate_actuator(actuators: dict, actuator: str, target, history=None, queues=None, now: float = None):
+    ''' Change the environment towards the target value using the actuator
+
+    With command queues the target is only submitted to the actuator's queue, and it is
+    executed when the queue is pumped.
+    Return True if the actuator was activated, False if its environment failed to apply the change,
+    e.g. a device that cannot be reached, so a failed actuation does not stop the control loop.
 
-        # decrement i to continue while loop
-        i -= 1
+    actuators -- dictionary of actuators
+    actuator -- name of the actuator
+    target -- target value of the environment variable
+    history -- optional HistoryStore recording the action
+    queues -- optional dictionary of CommandQueue for each actuator
+    now -- time the action is recorded at in seconds since epoch, default: current time
+    '''
+    if actuator not in ("heater", "humidifier", "lights"):
+        raise ValueError("Invalid actuator: %s" % actuator)
+
+    try:
+        if queues is not None:
+            queues[actuator].submit(target)
+            return True
+
+        if actuator == "heater":
+            actuators["heater"].change_temp(target)
+        elif actuator == "humidifier":
+            actuators["humidifier"].change_humidity(target)
+        else:
+            actuators["lights"].change_light(target)
+    except OSError as e:
+        print("Error activating %s: %s" % (actuator, e))
+        return False
 
-        # wait for 2 seconds before next loop
-        sleep(2)
+    if history is not None:
+        history.record_action(actuator, target, timestamp=now)
+    return True
 
-def initialize_sensors(environment):
+def initialize_sensors(environment, redundancy: int = 1, noise: dict = None):
     ''' Create an instance of each sensor and return dictionary of sensor objects
+
+    With redundancy above 1 the dictionary holds a list of redundant sensors for each variable.
     
     environment -- environment instance
+    redundancy -- number of sensors of each variable
+    noise -- optional dictionary of maximum measurement error of redundant sensors of each variable
     '''
+    if redundancy > 1:
+        noise = noise or {}
+        return {"temperature": [TemperatureSensor(environment, noise=noise.get("temperature", 0.0))
+                                for _ in range(redundancy)],
+                "humidity": [HumiditySensor(environment, noise=noise.get("humidity", 0.0)) for _ in range(redundancy)],
+                "light": [LightSensor(environment, noise=noise.get("light", 0.0)) for _ in range(redundancy)]}
+
     temperature_sensor = TemperatureSensor(environment)
     humidity_sensor = HumiditySensor(environment)
     light_sensor = LightSensor(environment)
@@ -198,14 +565,16 @@ def initialize_sensors(environment):
 
     return sensors
 
-def initialize_actuators(environment):
+def initialize_actuators(environment, accounts=None, zone: int = 0):
     ''' Create an instance of each actuator and return dictionary of actuator objects
     
     environment -- environment instance
+    accounts -- optional EffortAccounts recording effort and energy of the actuators
+    zone -- zone of the actuators in the accounts
     '''
-    heater = Heater(environment)
-    humidifier = Humidifier(environment)
-    lights = Lights(environment)
+    heater = Heater(environment, accounts, zone)
+    humidifier = Humidifier(environment, accounts, zone)
+    lights = Lights(environment, accounts, zone)
     
     # put actuators into the output dictionary
     actuators = {"heater": heater, "humidifier": humidifier, "lights": lights}
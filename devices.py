@@ -0,0 +1,562 @@
+'''
+Device driver backend reading probes and driving actuators over TCP, and a fake device server.
+
+Devices speak a line based text protocol, one request per line answered by one line in order:
+    GET <device> <variable>          ->  OK <value>
+    SET <device> <variable> <value>  ->  OK
+    anything invalid                 ->  ERR <message>
+
+DevicePool keeps a pool of connections to a device gateway. Requests are pipelined: many requests
+are written to a connection without waiting for earlier responses, which are matched in order.
+Failed connections are reconnected with exponential backoff and failed requests retried.
+
+DeviceBackend runs a pool on its own event loop thread, and DeviceEnvironment uses it in place of
+an Environment, so the existing sensor and actuator classes can work with real devices.
+
+FakeDeviceServer simulates a gateway with any number of devices, with optional latency and
+dropped connections, so throughput and failure handling can be tested offline.
+'''
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from controller import Environment
+
+variables = ("temperature", "humidity", "light")
+
+class DeviceError(Exception):
+    ''' Error response of a device to a valid request
+    '''
+
+class _Connection:
+    ''' Pipelined connection to a device gateway
+
+    Attributes:
+    writer -- asyncio stream writer of the connection
+    pending -- queue of futures waiting for responses, in order of requests
+    closed -- True when the connection is lost
+    '''
+    def __init__(self, reader, writer):
+        ''' Initialize connection and start reading responses
+
+        reader -- asyncio stream reader of the connection
+        writer -- asyncio stream writer of the connection
+        '''
+        self.writer = writer
+        self.pending = deque()
+        self.closed = False
+        self._reader = asyncio.ensure_future(self._read(reader))
+
+    async def request(self, command: str):
+        ''' Send a command and return future of its response
+
+        command -- request line without the newline
+        '''
+        if self.closed or self.writer.transport.is_closing():
+            self.closed = True
+            raise ConnectionError("Connection to device gateway is closed.")
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append(future)
+        self.writer.write((command + "\n").encode())
+
+        try:
+            await self.writer.drain()
+        except (ConnectionError, OSError):
+            # the caller gets the error raised here instead of the future's one
+            if future.done():
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        return future
+
+    def close(self):
+        ''' Close the connection, failing all pending requests
+        '''
+        self.closed = True
+        self.writer.close()
+        self._reader.cancel()
+        self._fail_pending()
+
+    async def _read(self, reader):
+        ''' Read responses and resolve pending requests in order until the connection is lost
+
+        reader -- asyncio stream reader of the connection
+        '''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line or not self.pending:
+                    break
+
+                future = self.pending.popleft()
+                # requests that timed out are already cancelled but still take their response
+                if future.done():
+                    continue
+
+                status, _, value = line.decode().strip().partition(" ")
+                if status == "OK":
+                    future.set_result(value)
+                else:
+                    future.set_exception(DeviceError(value))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            self._fail_pending()
+
+    def _fail_pending(self):
+        ''' Fail all requests still waiting for a response
+        '''
+        while self.pending:
+            future = self.pending.popleft()
+            if not future.done():
+                future.set_exception(ConnectionError("Connection to device gateway was lost."))
+
+class DevicePool:
+    ''' Pool of pipelined connections to a device gateway, must be used from a single event loop
+
+    Attributes:
+    host -- address of the gateway
+    port -- port of the gateway
+    size -- number of connections
+    timeout -- number of seconds to wait for a response
+    retries -- number of retries of a failed request
+    backoff -- number of seconds to wait before the first retry, doubled with every retry
+    max_backoff -- maximum number of seconds to wait before a retry
+    requests -- number of requests sent
+    failures -- number of failed attempts of requests
+    reconnects -- number of connections opened after the first one of each slot
+    '''
+    def __init__(self, host: str, port: int, size: int = 4, timeout: float = 2.0, retries: int = 3,
+                 backoff: float = 0.05, max_backoff: float = 2.0):
+        ''' Initialize the pool, connections are opened when first needed
+
+        host -- address of the gateway
+        port -- port of the gateway
+        size -- number of connections
+        timeout -- number of seconds to wait for a response
+        retries -- number of retries of a failed request
+        backoff -- number of seconds to wait before the first retry, doubled with every retry
+        max_backoff -- maximum number of seconds to wait before a retry
+        '''
+        if type(size) != int:
+            raise TypeError("Pool size must be passed in as an integer.")
+
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self.requests = 0
+        self.failures = 0
+        self.reconnects = 0
+
+        self._connections = [None] * size
+        self._opened = [False] * size
+        self._locks = [asyncio.Lock() for _ in range(size)]
+        self._next = 0
+
+    async def get(self, device: int, variable: str):
+        ''' Read value of a variable from a device
+
+        device -- device number
+        variable -- environment variable
+        '''
+        return float(await self.request("GET %d %s" % (device, variable)))
+
+    async def set(self, device: int, variable: str, value):
+        ''' Set value of a variable on a device
+
+        device -- device number
+        variable -- environment variable
+        value -- new value of the variable
+        '''
+        await self.request("SET %d %s %r" % (device, variable, value))
+
+    async def request(self, command: str):
+        ''' Send a command over the next connection of the pool and return the response value
+
+        Lost connections and timeouts are retried with exponential backoff, error responses are not.
+
+        command -- request line without the newline
+        '''
+        self.requests += 1
+        delay = self.backoff
+
+        for attempt in range(self.retries + 1):
+            slot = self._next
+            self._next = (self._next + 1) % self.size
+            connection = None
+
+            try:
+                connection = await self._connection(slot)
+                future = await connection.request(command)
+                return await asyncio.wait_for(future, self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                error = e
+                self.failures += 1
+
+                # a connection that stopped answering is not used again
+                if connection is not None and isinstance(e, asyncio.TimeoutError):
+                    connection.close()
+
+            if attempt < self.retries:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_backoff)
+
+        raise ConnectionError("Device request %r failed: %s" % (command, error))
+
+    async def close(self):
+        ''' Close all connections of the pool
+        '''
+        for connection in self._connections:
+            if connection is not None:
+                connection.close()
+        self._connections = [None] * self.size
+
+    def get_metrics(self):
+        ''' Return dictionary with numbers of requests, failed attempts, reconnects and open connections
+        '''
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "reconnects": self.reconnects,
+            "connections": sum(1 for c in self._connections if c is not None and not c.closed)
+        }
+
+    async def _connection(self, slot: int):
+        ''' Return open connection of a slot, opening a new one if needed
+
+        slot -- index of the connection in the pool
+        '''
+        async with self._locks[slot]:
+            connection = self._connections[slot]
+            if connection is None or connection.closed:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+                connection = _Connection(reader, writer)
+                self._connections[slot] = connection
+
+                if self._opened[slot]:
+                    self.reconnects += 1
+                self._opened[slot] = True
+            return connection
+
+class DeviceBackend:
+    ''' Device pool running on its own event loop thread, callable from synchronous code
+
+    Attributes:
+    pool -- DevicePool used by the backend, created when started
+    '''
+    def __init__(self, host: str, port: int, **pool_options):
+        ''' Initialize backend, the pool is not created until start() is called
+
+        host -- address of the gateway
+        port -- port of the gateway
+        pool_options -- options of the DevicePool
+        '''
+        self.pool = None
+        self._host = host
+        self._port = port
+        self._options = pool_options
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        ''' Start the event loop thread and create the pool
+        '''
+        if self._thread is not None:
+            raise RuntimeError("Device backend is already running.")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="devices", daemon=True)
+        self._thread.start()
+        self.pool = self.call(self._create_pool())
+
+    def stop(self):
+        ''' Close the pool and stop the event loop thread
+        '''
+        if self._thread is None:
+            return
+
+        self.call(self.pool.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        self._loop = None
+
+    def call(self, coroutine):
+        ''' Run a coroutine on the backend's event loop and wait for its result
+
+        coroutine -- coroutine to run
+        '''
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def get(self, device: int, variable: str):
+        ''' Read value of a variable from a device
+
+        device -- device number
+        variable -- environment variable
+        '''
+        return self.call(self.pool.get(device, variable))
+
+    def set(self, device: int, variable: str, value):
+        ''' Set value of a variable on a device
+
+        device -- device number
+        variable -- environment variable
+        value -- new value of the variable
+        '''
+        self.call(self.pool.set(device, variable, value))
+
+    def read_all(self, devices: list):
+        ''' Read every variable of all devices concurrently, return list of dictionaries
+
+        devices -- list of device numbers
+        '''
+        async def read():
+            values = await asyncio.gather(*(self.pool.get(device, variable)
+                                            for device in devices for variable in variables))
+            return [dict(zip(variables, values[i:i + len(variables)])) for i in range(0, len(values), len(variables))]
+
+        return self.call(read())
+
+    async def _create_pool(self):
+        ''' Create the pool on the backend's event loop
+        '''
+        return DevicePool(self._host, self._port, **self._options)
+
+class DeviceEnvironment(Environment):
+    ''' Environment whose variables are read from and written to a device
+
+    Sensors created with a device environment read the device with get_environment_data, and
+    actuators change the device. Ideal conditions and schedules work like in Environment, and the
+    environment dictionary keeps the last known values.
+
+    A device that cannot be reached raises ConnectionError and an error response raises OSError,
+    so the controller handles every failure of the device as an I/O error.
+
+    Attributes:
+    backend -- DeviceBackend used to reach the device
+    device -- device number
+    '''
+    def __init__(self, backend: DeviceBackend, device: int):
+        ''' Initialize environment of a device
+
+        backend -- DeviceBackend used to reach the device
+        device -- device number
+        '''
+        super().__init__(None, None, None)
+        self.backend = backend
+        self.device = device
+
+    def set_environment(self, variable: str, value):
+        ''' Check the value against environment boundaries and write it to the device
+
+        variable -- environment variable
+        value -- value to update the variable
+        '''
+        super().set_environment(variable, value)
+        try:
+            self.backend.set(self.device, variable, value)
+        except DeviceError as e:
+            raise OSError("Device %d rejected %s %r: %s" % (self.device, variable, value, e))
+
+    def get_environment_variable(self, variable: str):
+        ''' Read the current value of a specific environmental variable from the device
+
+        variable -- name of the environment variable
+        '''
+        super().get_environment_variable(variable)
+        try:
+            value = self.backend.get(self.device, variable)
+        except DeviceError as e:
+            raise OSError("Device %d rejected reading %s: %s" % (self.device, variable, e))
+        self.environment[variable] = value
+        return value
+
+    def get_environment(self):
+        ''' Read the current state of the environment from the device
+        '''
+        for variable in variables:
+            self.get_environment_variable(variable)
+        return self.environment
+
+class FakeDeviceServer:
+    ''' Local device gateway simulating any number of devices
+
+    Attributes:
+    devices -- list of dictionaries with variable values of every device
+    host -- address the server listens on
+    port -- port the server listens on (actual port once started when 0 was given)
+    latency -- number of seconds before each response is sent
+    failure_rate -- probability of dropping the connection instead of answering a request
+    handled -- number of handled requests
+    dropped -- number of connections dropped on purpose
+    '''
+    def __init__(self, devices: int, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 failure_rate: float = 0.0, seed: int = None):
+        ''' Initialize devices to the controller's initial environment values
+
+        devices -- number of devices
+        host -- address to listen on
+        port -- port to listen on, 0 picks a free port
+        latency -- number of seconds before each response is sent
+        failure_rate -- probability of dropping the connection instead of answering a request
+        seed -- seed of the random failures
+        '''
+        self.devices = [{"temperature": 25.0, "humidity": 67, "light": 650} for _ in range(devices)]
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.handled = 0
+        self.dropped = 0
+
+        self._random = random.Random(seed)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._writers = set()
+
+    def start(self):
+        ''' Start the server in a background thread and wait until it is listening
+        '''
+        if self._thread is not None:
+            raise RuntimeError("Fake device server is already running.")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="fake-devices", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+    def stop(self):
+        ''' Close all connections and stop the server
+        '''
+        if self._thread is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+        self._loop = None
+        self._started.clear()
+
+    def drop_connections(self):
+        ''' Abort all open connections, as if the gateway restarted
+        '''
+        def abort():
+            for writer in list(self._writers):
+                writer.transport.abort()
+            self.dropped += len(self._writers)
+
+        self._loop.call_soon_threadsafe(abort)
+
+    def _run(self):
+        ''' Run the event loop of the server thread
+        '''
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        ''' Answer requests of a connection in order
+
+        reader -- asyncio stream reader of the connection
+        writer -- asyncio stream writer of the connection
+        '''
+        self._writers.add(writer)
+        responses = asyncio.Queue()
+        sender = asyncio.ensure_future(self._send(writer, responses))
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                if self.failure_rate and self._random.random() < self.failure_rate:
+                    self.dropped += 1
+                    writer.transport.abort()
+                    break
+
+                self.handled += 1
+                response = self._execute(line.decode().split())
+                await responses.put((time.monotonic() + self.latency, response))
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            sender.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _send(self, writer, responses: asyncio.Queue):
+        ''' Send responses in order once their latency has passed
+
+        writer -- asyncio stream writer of the connection
+        responses -- queue of (due time, response) tuples
+        '''
+        try:
+            while True:
+                due, response = await responses.get()
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if writer.transport.is_closing():
+                    return
+                writer.write(response.encode())
+                if responses.empty():
+                    await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+
+    def _execute(self, parts: list):
+        ''' Execute a request and return the response line
+
+        parts -- words of the request line
+        '''
+        try:
+            if len(parts) == 3 and parts[0] == "GET":
+                return "OK %s\n" % self._device(parts[1], parts[2])[parts[2]]
+
+            if len(parts) == 4 and parts[0] == "SET":
+                self._device(parts[1], parts[2])[parts[2]] = float(parts[3])
+                return "OK\n"
+        except (ValueError, IndexError) as e:
+            return "ERR %s\n" % e
+
+        return "ERR invalid request\n"
+
+    def _device(self, device: str, variable: str):
+        ''' Return variables of a device after checking the request
+
+        device -- device number from the request
+        variable -- variable from the request
+        '''
+        if variable not in variables:
+            raise ValueError("invalid variable %s" % variable)
+        return self.devices[int(device)]
+
+    async def _shutdown(self):
+        ''' Stop accepting connections and close all open connections
+        '''
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.sleep(0)
@@ -0,0 +1,160 @@
+'''
+Streaming fault detection of sensor readings.
+
+A fault detector watches all sensors of one environment variable (e.g. the temperature sensors
+of every zone) and checks each new reading for:
+    - missing reading -- sensor returned None
+    - out of range -- reading outside of physically possible values
+    - rate of change -- reading jumped more than possible since the last valid reading
+    - stuck value -- reading did not change for too many readings in a row
+
+State of every sensor is a fixed number of values kept in column arrays, so memory is O(1) per
+sensor and one update processes the readings of all sensors in a single pass.
+
+A well controlled zone read from a source reporting whole numbers, e.g. an Environment or the
+probe of a device, legitimately gives the same reading for a long time. The default stuck window
+is therefore an hour of readings every 2 seconds, not the length of a short control transient.
+
+Flagged readings should be ignored by the decision logic. An actuator moves its variable further
+within a tick than the rate limit allows, so the controller tells the detector about every
+actuation with expect() and the next reading is not checked for its rate of change.
+'''
+
+from array import array
+
+# fault flags, a reading can have more than one fault
+FAULT_NONE = 0
+FAULT_MISSING = 1
+FAULT_RANGE = 2
+FAULT_RATE = 4
+FAULT_STUCK = 8
+
+# default limits for each sensor type
+#   min, max -- physically possible readings
+#   rate -- maximum change between two readings without an actuation in between
+#   stuck -- number of equal readings in a row after which the sensor is considered stuck
+limits = {
+    "temperature": {"min": -20.0, "max": 60.0, "rate": 5.0, "stuck": 1800},
+    "humidity": {"min": 0, "max": 100, "rate": 25, "stuck": 1800},
+    "light": {"min": 0, "max": 1000, "rate": 100, "stuck": 1800}
+}
+
+class FaultDetector:
+    ''' Fault detector for a number of sensors of the same environment variable
+
+    Attributes:
+    sensors -- number of sensors watched by the detector
+    min -- minimum physically possible reading
+    max -- maximum physically possible reading
+    rate -- maximum possible change between two readings
+    stuck -- number of equal readings in a row after which the sensor is stuck
+    tolerance -- maximum change between two readings still considered equal
+    '''
+    def __init__(self, variable: str, sensors: int = 1, tolerance: float = 0.0, **overrides):
+        ''' Initialize detector with default limits of the variable
+
+        variable -- environment variable measured by the sensors
+        sensors -- number of sensors watched by the detector
+        tolerance -- maximum change between two readings still considered equal
+        overrides -- limits replacing the defaults (min, max, rate, stuck)
+        '''
+        if variable not in limits:
+            raise ValueError("Sensor type %s is not valid." % variable)
+
+        if type(sensors) != int:
+            raise TypeError("Number of sensors must be passed in as an integer.")
+
+        if sensors < 1:
+            raise ValueError("Number of sensors must be at least 1.")
+
+        for name in overrides:
+            if name not in limits[variable]:
+                raise ValueError("Invalid fault detector limit: %s" % name)
+
+        settings = dict(limits[variable], **overrides)
+        self.sensors = sensors
+        self.min = settings["min"]
+        self.max = settings["max"]
+        self.rate = settings["rate"]
+        self.stuck = settings["stuck"]
+        self.tolerance = tolerance
+
+        # per sensor state: last valid reading, whether there is one, length of the equal run
+        # and whether an actuation was commanded since the last valid reading
+        self._last = array("d", [0.0]) * sensors
+        self._seen = array("b", [0]) * sensors
+        self._run = array("l", [0]) * sensors
+        self._expected = array("b", [0]) * sensors
+
+    def update(self, readings: list):
+        ''' Check new readings of all sensors and return list of fault flags, one per sensor
+
+        readings -- list of new readings, one per sensor, None for a missing reading
+        '''
+        if len(readings) != self.sensors:
+            raise ValueError("Expected %d readings, got %d." % (self.sensors, len(readings)))
+
+        low, high, rate, stuck, tolerance = self.min, self.max, self.rate, self.stuck, self.tolerance
+        last, seen, run, expected = self._last, self._seen, self._run, self._expected
+        flags = [FAULT_NONE] * self.sensors
+
+        for index, value in enumerate(readings):
+            if value is None:
+                flags[index] = FAULT_MISSING
+                continue
+
+            if value < low or value > high:
+                # impossible readings do not become the reference for next readings
+                flags[index] = FAULT_RANGE
+                continue
+
+            if seen[index]:
+                change = abs(value - last[index])
+                flag = FAULT_NONE
+
+                if change > rate and not expected[index]:
+                    flag = FAULT_RATE
+
+                if change <= tolerance:
+                    run[index] += 1
+                    if run[index] >= stuck:
+                        flag |= FAULT_STUCK
+                else:
+                    run[index] = 1
+
+                flags[index] = flag
+            else:
+                seen[index] = 1
+                run[index] = 1
+
+            last[index] = value
+            expected[index] = 0
+
+        return flags
+
+    def expect(self, sensors=None):
+        ''' Skip the rate of change check of the next valid reading of sensors, call after an actuation
+
+        sensors -- optional iterable of indices of the sensors of the actuated zone, default: every sensor
+        '''
+        if sensors is None:
+            self._expected = array("b", [1]) * self.sensors
+            return
+
+        for sensor in sensors:
+            self._expected[sensor] = 1
+
+    def reset(self, sensor: int):
+        ''' Forget the state of a sensor, e.g. after it was replaced
+
+        sensor -- index of the sensor
+        '''
+        self._seen[sensor] = 0
+        self._run[sensor] = 0
+
+def initialize_fault_detectors(sensors: int = 1):
+    ''' Create a fault detector for every environment variable and return dictionary of detectors
+
+    sensors -- number of sensors of each variable
+    '''
+    return {variable: FaultDetector(variable, sensors) for variable in limits}
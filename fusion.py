@@ -0,0 +1,87 @@
+'''
+Fusion of readings from redundant sensors measuring the same environment variable.
+
+Readings of all zones are fused together in one call, so control_site of the controller does a
+single batch operation per variable each tick. Readings are passed in as a matrix with one row per zone
+and one column per sensor, missing or faulty readings are None and are left out of the fusion.
+
+Fusion methods:
+    median -- median of the readings
+    trimmed -- mean of the readings without the lowest and highest fraction given by trim
+    weighted -- mean of the readings weighted by confidence of each sensor
+'''
+
+methods = ("median", "trimmed", "weighted")
+
+def fuse(readings: list, method: str = "median", confidence: list = None, trim: float = 0.2):
+    ''' Fuse readings of redundant sensors of every zone into a single value per zone
+
+    Return list with one fused value per zone, None for zones without any valid reading.
+
+    readings -- matrix of readings, one row per zone and one column per sensor
+    method -- fusion method, one of median, trimmed and weighted
+    confidence -- matrix of sensor confidences with the same shape as readings, required by weighted method
+    trim -- fraction of readings cut off at each end by trimmed method, from 0 up to 0.5
+    '''
+    if method not in methods:
+        raise ValueError("Fusion method %s is not valid." % method)
+
+    if method == "median":
+        return [_median(sorted([value for value in row if value is not None])) for row in readings]
+
+    if method == "trimmed":
+        if trim < 0 or trim >= 0.5:
+            raise ValueError("Trim must be between 0 and 0.5.")
+        return [_trimmed_mean(sorted([value for value in row if value is not None]), trim) for row in readings]
+
+    if confidence is None:
+        raise ValueError("Weighted fusion requires sensor confidence.")
+    if len(confidence) != len(readings):
+        raise ValueError("Confidence must have the same shape as readings.")
+
+    return [_weighted_mean(row, weights) for row, weights in zip(readings, confidence)]
+
+def _median(values: list):
+    ''' Return median of sorted values, None for no values
+
+    values -- sorted list of values
+    '''
+    count = len(values)
+    if count == 0:
+        return None
+
+    middle = count // 2
+    if count % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+def _trimmed_mean(values: list, trim: float):
+    ''' Return mean of sorted values without the lowest and highest fraction, None for no values
+
+    values -- sorted list of values
+    trim -- fraction of values cut off at each end
+    '''
+    count = len(values)
+    if count == 0:
+        return None
+
+    cut = int(count * trim)
+    kept = values[cut:count - cut]
+    return sum(kept) / len(kept)
+
+def _weighted_mean(values: list, weights: list):
+    ''' Return mean of values weighted by their weights, None when no value has a positive weight
+
+    values -- list of values, None values are left out
+    weights -- list of weights of the values
+    '''
+    total = 0.0
+    weight_sum = 0.0
+    for value, weight in zip(values, weights):
+        if value is not None and weight > 0:
+            total += value * weight
+            weight_sum += weight
+
+    if weight_sum == 0:
+        return None
+    return total / weight_sum
@@ -1,10 +1,17 @@
 '''
 Display real time data readings from greenhouse environment and show appropriate warnings
 if current conditions are not ideal.
+
+Trend charts show the history of each environment variable. The history is kept in min/max buckets
+merged as it grows, and decimated with LTTB to the chart width, so appending a reading is O(1)
+and redrawing a chart costs the same whatever the length of the history.
 '''
 from tkinter import *
 import tkinter as tk
 from tkinter import ttk
+import threading
+import time
+from collections import deque
 
 
 def initialize_gui():
@@ -15,7 +22,7 @@ def initialize_gui():
     # set the window's title
     root.title("Greenhouse Environment Controller")
     # set the size of the window
-    root.geometry("700x350")
+    root.geometry("700x750")
 
     # create and pack labels for environment variables
     current_temperature_label = ttk.Label(root, text="Temperature: --°C")
@@ -36,9 +43,18 @@ def initialize_gui():
     warning_label_light = ttk.Label(root, text="")
     warning_label_light.pack()
 
+    status_label = ttk.Label(root, text="")
+    status_label.pack(side=tk.BOTTOM)
+
+    # create trend charts of environment variables
+    charts = {"temperature": TrendChart(root, "Temperature (°C)"), 
+              "humidity": TrendChart(root, "Humidity (%)"), 
+              "light": TrendChart(root, "Light Spectrum (nm)")}
+
     gui = {"root": root, "temp_label": current_temperature_label, "humidity_label": current_humidity_label, 
            "light_label": current_light_label, "warning_label_temperature": warning_label_temperature, 
-           "warning_label_humidity": warning_label_humidity, "warning_label_light": warning_label_light}
+           "warning_label_humidity": warning_label_humidity, "warning_label_light": warning_label_light,
+           "status_label": status_label, "charts": charts}
 
     return gui
 
@@ -58,6 +74,16 @@ def update_gui(current_temperature_label, current_humidity_label, current_light_
    current_light_label.config(text=f"Light Spectrum: {light} nm")
 
 
+# warning messages of each environment variable, any other warning clears the label
+warning_messages = {
+    "temperature": {"high": "Warning: the temperature is too high\n", "low": "Warning: the temperature is too low\n",
+                    "fault": "Warning: the temperature sensor is faulty\n"},
+    "humidity": {"high": "Warning: the humidity is too high\n", "low": "Warning: the humidity is too low\n",
+                 "fault": "Warning: the humidity sensor is faulty\n"},
+    "light": {"high": "Warning: the light is too strong\n", "low": "Warning: the light is too weak\n",
+              "fault": "Warning: the light sensor is faulty\n"}
+}
+
 def display_warning(warning_label, variable: str, warning: str):
     ''' Display warning message when current environment state is not ideal
 
@@ -65,29 +91,359 @@ def display_warning(warning_label, variable: str, warning: str):
     variable -- name of the variable that is not in ideal state
     warning -- type of the warning that should be displayed
     '''
-    if variable == "temperature":
-        if warning == "high":
-            warning_label.config(text=f"Warning: the temperature is too high\n")
-        elif warning == "low": 
-            warning_label.config(text=f"Warning: the temperature is too low\n")
-        else:
-            warning_label.config(text=f"")
+    if variable not in warning_messages:
+        raise ValueError("Invalid environment variable: %s" % variable)
 
-    elif variable == "humidity":
-        if warning == "high":
-            warning_label.config(text=f"Warning: the humidity is too high\n")
-        elif warning == "low":
-            warning_label.config(text=f"Warning: the humidity is too low\n")
-        else:
-            warning_label.config(text=f"")
+    warning_label.config(text=warning_messages[variable].get(warning, ""))
+
+
+class GuiUpdateQueue:
+    ''' Bounded queue passing frames of readings and warnings from the controller thread to the GUI
+
+    The controller never waits for the GUI: when the queue is full the oldest frame is dropped, 
+    and the GUI only renders the latest frame, dropping older ones as stale. Readings of every
+    frame are also kept stamped with the time of their tick until the GUI takes them for the trend
+    charts, so dropping stale frames leaves no gaps in the chart history.
+
+    Attributes:
+    maxsize -- maximum number of frames in the queue
+    history_size -- maximum number of stamped readings kept until the GUI takes them
+    put_count -- number of frames put into the queue
+    dropped -- number of frames dropped without being rendered
+    samples_dropped -- number of stamped readings dropped because the GUI did not take them in time
+    '''
+    def __init__(self, maxsize: int = 1, history_size: int = 100000):
+        ''' Initialize the queue
+
+        maxsize -- maximum number of frames in the queue
+        history_size -- maximum number of stamped readings kept until the GUI takes them
+        '''
+        if type(maxsize) != int:
+            raise TypeError("Queue size must be passed in as an integer.")
+
+        if maxsize < 1:
+            raise ValueError("Queue size must be at least 1.")
+
+        self.maxsize = maxsize
+        self.history_size = history_size
+        self.put_count = 0
+        self.dropped = 0
+        self.samples_dropped = 0
+        self._frames = deque(maxlen=maxsize)
+        self._samples = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    def put(self, readings: dict, warnings: dict, timestamp: float = None):
+        ''' Put frame of a tick into the queue, dropping the oldest frame if the queue is full
+
+        readings -- dictionary of current environment values
+        warnings -- dictionary of current warning per environment variable
+        timestamp -- time of the tick in seconds since epoch, default: current time
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._lock:
+            if len(self._frames) == self.maxsize:
+                self.dropped += 1
+            self._frames.append((readings, warnings))
+            if len(self._samples) == self.history_size:
+                self.samples_dropped += 1
+            self._samples.append((timestamp, readings))
+            self.put_count += 1
+
+    def get_latest(self):
+        ''' Return the latest frame and drop older ones, or None if the queue is empty
+        '''
+        with self._lock:
+            if not self._frames:
+                return None
+            self.dropped += len(self._frames) - 1
+            frame = self._frames.pop()
+            self._frames.clear()
+            return frame
+
+    def get_samples(self):
+        ''' Return list of (timestamp, readings) of every tick since the last call, oldest first
+        '''
+        with self._lock:
+            samples = list(self._samples)
+            self._samples.clear()
+            return samples
 
-    elif variable == "light":
-        if warning == "high":
-            warning_label.config(text=f"Warning: the light is too strong\n")
-        elif warning == "low":
-            warning_label.config(text=f"Warning: the light is too weak\n")
+    def get_metrics(self):
+        ''' Return dictionary with queue depth, number of frames put and dropped frames
+        '''
+        with self._lock:
+            return {"depth": len(self._frames), "put": self.put_count, "dropped": self.dropped}
+
+
+def render_latest(gui: dict, updates: GuiUpdateQueue, alerts=None):
+    ''' Render the latest frame from the queue in the GUI, return True if a frame was rendered
+
+    Readings of every tick are appended to the trend charts, including ticks of stale frames.
+
+    gui -- dictionary containing root of gui and labels for environmental variables
+    updates -- queue of frames from the controller
+    alerts -- optional GuiSink of the alert engine, the latest alert is shown in the status line
+    '''
+    samples = updates.get_samples()
+    if samples and "charts" in gui:
+        update_charts(gui["charts"], samples)
+
+    frame = updates.get_latest()
+    if frame is None:
+        return False
+
+    readings, warnings = frame
+    update_gui(gui["temp_label"], gui["humidity_label"], gui["light_label"], 
+               readings["temperature"], readings["humidity"], readings["light"])
+    display_warning(gui["warning_label_temperature"], "temperature", warnings["temperature"])
+    display_warning(gui["warning_label_humidity"], "humidity", warnings["humidity"])
+    display_warning(gui["warning_label_light"], "light", warnings["light"])
+
+    metrics = updates.get_metrics()
+    status = f"Queue depth: {metrics['depth']}  Dropped frames: {metrics['dropped']}"
+    if alerts is not None:
+        messages = alerts.get_messages()
+        if messages:
+            status += f"\nLast alert: {messages[-1]}"
+    gui["status_label"].config(text=status)
+    return True
+
+
+def run_gui(gui: dict, updates: GuiUpdateQueue, stop: threading.Event, poll_interval: int = 100, alerts=None):
+    ''' Run the Tk main loop, rendering frames from the controller thread until the window is closed
+
+    Must be called from the thread that created the GUI. Closing the window sets the stop event,
+    and setting the stop event from elsewhere closes the window.
+
+    gui -- dictionary containing root of gui and labels for environmental variables
+    updates -- queue of frames from the controller
+    stop -- event signalling the controller and the GUI to stop
+    poll_interval -- number of milliseconds between checks of the queue
+    alerts -- optional GuiSink of the alert engine shown in the status line
+    '''
+    root = gui["root"]
+
+    def poll():
+        if stop.is_set():
+            root.destroy()
+            return
+        render_latest(gui, updates, alerts)
+        root.after(poll_interval, poll)
+
+    def close():
+        stop.set()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", close)
+    root.after(poll_interval, poll)
+    root.mainloop()
+
+
+def update_charts(charts: dict, samples: list):
+    ''' Append stamped readings to the trend charts and redraw them once
+
+    charts -- dictionary of TrendChart for each environment variable
+    samples -- list of (timestamp, readings) tuples in time order, timestamp in seconds since epoch
+    '''
+    for variable, chart in charts.items():
+        for timestamp, readings in samples:
+            value = readings.get(variable)
+            if value is not None:
+                chart.append(timestamp, value)
+        chart.redraw()
+
+
+def lttb(points: list, threshold: int):
+    ''' Decimate points with Largest-Triangle-Three-Buckets, keeping the visual shape of the line
+
+    points -- list of (x, y) tuples sorted by x
+    threshold -- number of points to keep, at least 3
+    '''
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    selected = 0
+
+    for i in range(threshold - 2):
+        # average point of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, count)
+        next_count = next_end - next_start
+        average_x = sum(point[0] for point in points[next_start:next_end]) / next_count
+        average_y = sum(point[1] for point in points[next_start:next_end]) / next_count
+
+        # point of the current bucket forming the largest triangle with the selected and average points
+        selected_x, selected_y = points[selected]
+        largest = -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j]
+            area = abs((selected_x - average_x) * (y - selected_y) - (selected_x - x) * (average_y - selected_y))
+            if area > largest:
+                largest = area
+                candidate = j
+
+        sampled.append(points[candidate])
+        selected = candidate
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class TrendHistory:
+    ''' History of a variable kept in a bounded number of min/max buckets
+
+    Every bucket holds span readings and keeps their lowest and highest point. When there are more
+    than capacity buckets, neighbouring buckets are merged and span doubles, so memory and the
+    number of points to draw stay bounded however long the history is.
+
+    Attributes:
+    capacity -- maximum number of buckets
+    window -- number of seconds of history kept, None keeps all history
+    span -- number of readings in a full bucket
+    buckets -- list of buckets [count, min x, min y, max x, max y, last x]
+    '''
+    def __init__(self, capacity: int = 1024, window: float = None):
+        ''' Initialize an empty history
+
+        capacity -- maximum number of buckets
+        window -- number of seconds of history kept, None keeps all history
+        '''
+        if type(capacity) != int:
+            raise TypeError("Capacity must be passed in as an integer.")
+
+        if capacity < 2:
+            raise ValueError("Capacity must be at least 2.")
+
+        self.capacity = capacity
+        self.window = window
+        self.span = 1
+        self.buckets = []
+
+    def append(self, x: float, y: float):
+        ''' Append a reading, x must not be lower than x of the previous reading
+
+        x -- time of the reading
+        y -- value of the reading
+        '''
+        buckets = self.buckets
+        if buckets and buckets[-1][0] < self.span:
+            bucket = buckets[-1]
+            bucket[0] += 1
+            if y < bucket[2]:
+                bucket[1], bucket[2] = x, y
+            if y > bucket[4]:
+                bucket[3], bucket[4] = x, y
+            bucket[5] = x
         else:
-            warning_label.config(text=f"")
+            buckets.append([1, x, y, x, y, x])
 
-    else:
-        raise ValueError("Invalid environment variable: %s" % variable)
+        if len(buckets) > self.capacity:
+            self._merge()
+
+        # drop buckets that are completely out of the window
+        if self.window is not None:
+            while len(buckets) > 1 and buckets[0][5] < x - self.window:
+                buckets.pop(0)
+
+    def get_points(self):
+        ''' Return list of (x, y) points of the lowest and highest reading of every bucket in x order
+        '''
+        points = []
+        for _, min_x, min_y, max_x, max_y, _ in self.buckets:
+            if min_x < max_x:
+                points.append((min_x, min_y))
+                points.append((max_x, max_y))
+            elif max_x < min_x:
+                points.append((max_x, max_y))
+                points.append((min_x, min_y))
+            else:
+                points.append((min_x, min_y))
+        return points
+
+    def decimate(self, width: int):
+        ''' Return list of at most width points representing the history
+
+        width -- number of points, e.g. width of the chart in pixels
+        '''
+        return lttb(self.get_points(), width)
+
+    def _merge(self):
+        ''' Merge neighbouring buckets and double the span of a bucket
+        '''
+        merged = []
+        buckets = self.buckets
+        for i in range(0, len(buckets) - 1, 2):
+            first, second = buckets[i], buckets[i + 1]
+            low = first if first[2] <= second[2] else second
+            high = first if first[4] >= second[4] else second
+            merged.append([first[0] + second[0], low[1], low[2], high[3], high[4], second[5]])
+
+        if len(buckets) % 2:
+            merged.append(buckets[-1])
+
+        self.buckets = merged
+        self.span *= 2
+
+
+class TrendChart:
+    ''' Scrolling line chart of an environment variable on a Tk canvas
+
+    Attributes:
+    canvas -- tkinter Canvas the chart is drawn on
+    history -- TrendHistory of the variable
+    width -- width of the chart in pixels
+    height -- height of the chart in pixels
+    '''
+    def __init__(self, parent, title: str, width: int = 680, height: int = 120, window: float = 7 * 24 * 3600):
+        ''' Create the canvas with an empty line
+
+        parent -- tkinter widget the chart is placed in
+        title -- title of the chart
+        width -- width of the chart in pixels
+        height -- height of the chart in pixels
+        window -- number of seconds of history shown
+        '''
+        self.width = width
+        self.height = height
+        self.history = TrendHistory(capacity=width, window=window)
+
+        self.canvas = tk.Canvas(parent, width=width, height=height, background="white")
+        self.canvas.pack(pady=5)
+        self.canvas.create_text(5, 5, anchor=tk.NW, text=title)
+        self._range = self.canvas.create_text(width - 5, 5, anchor=tk.NE, text="")
+        self._line = self.canvas.create_line(0, 0, 0, 0, fill="green")
+
+    def append(self, x: float, y: float):
+        ''' Append a reading to the history of the chart
+
+        x -- time of the reading
+        y -- value of the reading
+        '''
+        self.history.append(x, y)
+
+    def redraw(self):
+        ''' Redraw the line from the decimated history, at most one point per pixel
+        '''
+        points = self.history.decimate(self.width)
+        if len(points) < 2:
+            return
+
+        first_x, last_x = points[0][0], points[-1][0]
+        low = min(point[1] for point in points)
+        high = max(point[1] for point in points)
+        scale_x = (self.width - 10) / ((last_x - first_x) or 1)
+        scale_y = (self.height - 30) / ((high - low) or 1)
+
+        coordinates = []
+        for x, y in points:
+            coordinates.append(5 + (x - first_x) * scale_x)
+            coordinates.append(self.height - 5 - (y - low) * scale_y)
+
+        self.canvas.coords(self._line, *coordinates)
+        self.canvas.itemconfig(self._range, text=f"{low:g} - {high:g}")
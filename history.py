@@ -0,0 +1,233 @@
+'''
+History store keeping readings and actuator actions of the greenhouse environment in SQLite.
+
+The control loop only puts records into a queue. A background writer thread takes them out
+and writes them in batches, one transaction per batch, to a database in WAL mode, so the loop
+never waits on disk and queries can run while the writer is writing.
+
+Both tables are indexed on (zone, timestamp) to keep time range queries of a single zone fast
+however long the history grows.
+'''
+
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS readings (
+    zone INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    temperature REAL,
+    humidity REAL,
+    light REAL
+);
+CREATE INDEX IF NOT EXISTS readings_zone_timestamp ON readings (zone, timestamp);
+
+CREATE TABLE IF NOT EXISTS actions (
+    zone INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    actuator TEXT NOT NULL,
+    target REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS actions_zone_timestamp ON actions (zone, timestamp);
+'''
+
+class HistoryStore:
+    ''' SQLite backed history of environment readings and actuator actions
+
+    Attributes:
+    path -- path to the database file
+    batch_size -- maximum number of records written in one transaction
+    flush_interval -- maximum number of seconds a record waits in the queue before it is written
+    written -- number of records written to the database
+    dropped -- number of records lost because their batch failed to be written
+    '''
+    def __init__(self, path: str = "history.db", batch_size: int = 1000, flush_interval: float = 1.0):
+        ''' Initialize the store and create the database tables, records are not written until start() is called
+
+        path -- path to the database file
+        batch_size -- maximum number of records written in one transaction
+        flush_interval -- maximum number of seconds a record waits in the queue before it is written
+        '''
+        if type(batch_size) != int:
+            raise TypeError("Batch size must be passed in as an integer.")
+
+        if batch_size < 1:
+            raise ValueError("Batch size must be at least 1.")
+
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._local = threading.local()
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.commit()
+
+    def start(self):
+        ''' Start the background writer thread
+        '''
+        if self._thread is not None:
+            raise RuntimeError("History store is already running.")
+
+        self._thread = threading.Thread(target=self._write, name="history", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        ''' Write all queued records and stop the background writer thread
+        '''
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def flush(self):
+        ''' Block until all records queued so far are written to the database
+        '''
+        if self._thread is None:
+            return
+
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def record_readings(self, readings: dict, zone: int = 0, timestamp: float = None):
+        ''' Queue readings of one tick to be written, never waits on disk
+
+        readings -- dictionary of temperature, humidity and light values
+        zone -- zone the readings come from
+        timestamp -- time of the readings in seconds since epoch, default: current time
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+
+        self._queue.put(("readings", (zone, timestamp, readings["temperature"],
+                                      readings["humidity"], readings["light"])))
+
+    def record_action(self, actuator: str, target, zone: int = 0, timestamp: float = None):
+        ''' Queue an actuator action to be written, never waits on disk
+
+        actuator -- name of the actuator
+        target -- target value the actuator was set to
+        zone -- zone of the actuator
+        timestamp -- time of the action in seconds since epoch, default: current time
+        '''
+        if timestamp is None:
+            timestamp = time.time()
+
+        self._queue.put(("actions", (zone, timestamp, actuator, target)))
+
+    def query_range(self, zone: int, start: float, end: float):
+        ''' Return list of (timestamp, temperature, humidity, light) rows of a zone in time range [start, end)
+
+        zone -- zone of the readings
+        start -- start of the time range in seconds since epoch
+        end -- end of the time range in seconds since epoch
+        '''
+        return self._connect().execute(
+            "SELECT timestamp, temperature, humidity, light FROM readings "
+            "WHERE zone = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            (zone, start, end)).fetchall()
+
+    def query_downsampled(self, zone: int, start: float, end: float, bucket: float):
+        ''' Return readings of a zone in time range [start, end) averaged into buckets
+
+        Every row is (bucket start, mean temperature, mean humidity, mean light, number of readings).
+
+        zone -- zone of the readings
+        start -- start of the time range in seconds since epoch
+        end -- end of the time range in seconds since epoch
+        bucket -- length of a bucket in seconds
+        '''
+        if bucket <= 0:
+            raise ValueError("Bucket length must be positive.")
+
+        rows = self._connect().execute(
+            "SELECT CAST((timestamp - ?) / ? AS INTEGER) AS bucket, "
+            "AVG(temperature), AVG(humidity), AVG(light), COUNT(*) FROM readings "
+            "WHERE zone = ? AND timestamp >= ? AND timestamp < ? GROUP BY bucket ORDER BY bucket",
+            (start, bucket, zone, start, end)).fetchall()
+
+        return [(start + row[0] * bucket,) + row[1:] for row in rows]
+
+    def query_actions(self, zone: int, start: float, end: float):
+        ''' Return list of (timestamp, actuator, target) rows of a zone in time range [start, end)
+
+        zone -- zone of the actuators
+        start -- start of the time range in seconds since epoch
+        end -- end of the time range in seconds since epoch
+        '''
+        return self._connect().execute(
+            "SELECT timestamp, actuator, target FROM actions "
+            "WHERE zone = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp",
+            (zone, start, end)).fetchall()
+
+    def _connect(self):
+        ''' Return database connection of the calling thread
+        '''
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _write(self):
+        ''' Take records from the queue and write them in batches until stopped
+        '''
+        connection = self._connect()
+        running = True
+
+        while running:
+            readings = []
+            actions = []
+            waiting = []
+            deadline = None
+
+            # collect a batch until it is full or the oldest record waited long enough
+            while len(readings) + len(actions) < self.batch_size:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+                if item is None:
+                    running = False
+                    break
+                elif isinstance(item, threading.Event):
+                    waiting.append(item)
+                    break
+                elif item[0] == "readings":
+                    readings.append(item[1])
+                else:
+                    actions.append(item[1])
+
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            try:
+                if readings or actions:
+                    with connection:
+                        connection.executemany("INSERT INTO readings VALUES (?, ?, ?, ?, ?)", readings)
+                        connection.executemany("INSERT INTO actions VALUES (?, ?, ?, ?)", actions)
+                    self.written += len(readings) + len(actions)
+            except (sqlite3.Error, ValueError, TypeError) as e:
+                # a failed batch is rolled back and dropped, the writer keeps running for the next ones
+                self.dropped += len(readings) + len(actions)
+                print("Error writing %d records to history: %s" % (len(readings) + len(actions), e))
+            finally:
+                for event in waiting:
+                    event.set()
+
+        connection.close()
+        self._local.connection = None
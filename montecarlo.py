@@ -0,0 +1,242 @@
+'''
+Monte Carlo robustness study of a control configuration.
+
+Every run is an independent headless simulation of the control loop with its own seed, so the
+weather, the sensor noise and the random variation of the actuators are different in every run but
+the same when a seed is run again. Runs simulate the zone with the GreenhouseModel by default.
+Runs are executed on a process pool and their summaries are streamed back as they finish.
+
+Each summary is appended to a checkpoint file as a line of JSON as soon as it arrives:
+    {"study": {"ticks": 1000, "seed": 0, "config": {...}, "model": true, "interval": 60.0}}
+    {"seed": 0, "ticks": 1000, "in_band": {"temperature": 0.98, ...}, "faults": {...}}
+A study started again with the same checkpoint skips the seeds already completed, and a study can
+be extended by starting it again with more runs.
+
+The result of a study is the mean time-in-band of each environment variable over all runs
+with its confidence interval.
+'''
+
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from statistics import NormalDist
+from controller import Environment, controls, control_tick, initialize_actuators, initialize_sensors
+from config import apply_config
+from simulator import GreenhouseModel
+from plant import ModelPlant, daily_weather
+
+# runs start at local midnight of a fixed day, so a scheduled configuration sees the same times in every run
+start_time = time.mktime((2026, 1, 1, 0, 0, 0, 0, 0, -1))
+
+# maximum measurement error of the redundant sensors of runs with the model
+noise = {"temperature": 0.2, "humidity": 1.0, "light": 5.0}
+
+def run_simulation(seed: int, ticks: int = 1000, config: dict = None, initial: tuple = (25.0, 70, 650),
+                   model: bool = True, interval: float = 60.0):
+    ''' Run a headless seeded simulation of the control loop and return dictionary of its summary
+
+    With the model, the zone is a GreenhouseModel driven by the actuators through a ModelPlant and
+    advanced by interval seconds between ticks, under a daily weather cycle whose mean temperature
+    is drawn for every run, and three redundant sensors with noise measure every variable.
+    Without the model, the environment changes by the simulator's independent random steps.
+    Tick n happens interval * n seconds after start_time, scheduled ideal conditions of the
+    configuration are looked up at that simulated time.
+
+    The summary holds the fraction of ticks the state of each environment variable spent in the
+    ideal band, whatever the sensors read, and the number of ticks it was reported as faulty.
+
+    seed -- seed of the random numbers of the run
+    ticks -- number of control loop iterations
+    config -- optional configuration of ideal conditions and actuator limits, as read by ConfigWatcher
+    initial -- initial temperature, humidity and light of the environment
+    model -- simulate the zone with the GreenhouseModel instead of the random steps
+    interval -- number of simulated seconds between ticks
+    '''
+    random.seed(seed)
+    plant = None
+    if model:
+        greenhouse = GreenhouseModel(1, initial[0], initial[1], dt=10.0)
+        greenhouse.lamps = [float(initial[2])]
+        plant = ModelPlant(greenhouse)
+        env = plant.environments[0]
+        sensors = initialize_sensors(env, 3, noise)
+        source = "environment"
+        mean = random.uniform(2.0, 22.0)
+    else:
+        env = Environment(*initial)
+        sensors = initialize_sensors(env)
+        source = "simulator"
+
+    actuators = initialize_actuators(env)
+    if config is not None:
+        apply_config(config, [env], [actuators])
+
+    good = dict.fromkeys(controls, 0)
+    faults = dict.fromkeys(controls, 0)
+    for tick in range(ticks):
+        now = start_time + tick * interval
+        if plant is not None:
+            greenhouse.set_weather(*daily_weather(tick * interval, mean))
+            # state of the zone at the resolution of the readings
+            state = {variable: round(value, 2) if variable == "temperature" else round(value)
+                     for variable, value in greenhouse.get_zone(0).items()}
+
+        readings, warnings = control_tick(env, sensors, actuators, source=source, now=now)
+        if plant is None:
+            # the random step is read without noise, so the readings are the state of the zone
+            state = readings
+
+        # time in band is judged from the state of the zone, not from the noisy readings
+        ideal_conditions = env.get_ideal_conditions(now)
+        for variable, (_, condition) in controls.items():
+            if ideal_conditions[condition + "_lower"] <= state[variable] <= ideal_conditions[condition + "_upper"]:
+                good[variable] += 1
+            if warnings[variable] == "fault":
+                faults[variable] += 1
+
+        if plant is not None:
+            plant.step(interval)
+
+    return {"seed": seed, "ticks": ticks, "in_band": {variable: count / ticks for variable, count in good.items()},
+            "faults": faults}
+
+def summarize(summaries: list, confidence: float = 0.95):
+    ''' Return dictionary of mean time-in-band of each environment variable with its confidence interval
+
+    The interval is the normal approximation of the mean over runs, each variable has the
+    keys mean, low, high and std.
+
+    summaries -- list of run summaries
+    confidence -- confidence level of the intervals
+    '''
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence level must be between 0 and 1.")
+
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    count = len(summaries)
+    result = {}
+    for variable in controls:
+        values = [summary["in_band"][variable] for summary in summaries]
+        mean = sum(values) / count if count else math.nan
+        std = math.sqrt(sum((value - mean) ** 2 for value in values) / (count - 1)) if count > 1 else math.nan
+        margin = z * std / math.sqrt(count) if count > 1 else math.nan
+        result[variable] = {"mean": mean, "low": mean - margin, "high": mean + margin, "std": std}
+    return result
+
+class MonteCarloStudy:
+    ''' Study of many seeded simulation runs executed on a process pool with a resumable checkpoint
+
+    Attributes:
+    path -- path to the checkpoint file
+    runs -- number of runs of the study
+    ticks -- number of control loop iterations of each run
+    seed -- seed of the first run, runs have consecutive seeds
+    config -- optional configuration of ideal conditions and actuator limits
+    processes -- number of worker processes, default: number of CPUs
+    model -- simulate the zones with the GreenhouseModel instead of the random steps
+    interval -- number of simulated seconds between ticks with the model
+    summaries -- list of summaries of completed runs
+    '''
+    def __init__(self, path: str, runs: int, ticks: int = 1000, seed: int = 0, config: dict = None,
+                 processes: int = None, model: bool = True, interval: float = 60.0):
+        ''' Initialize study, no runs are executed until run() is called
+
+        path -- path to the checkpoint file
+        runs -- number of runs of the study
+        ticks -- number of control loop iterations of each run
+        seed -- seed of the first run, runs have consecutive seeds
+        config -- optional configuration of ideal conditions and actuator limits
+        processes -- number of worker processes, default: number of CPUs
+        model -- simulate the zones with the GreenhouseModel instead of the random steps
+        interval -- number of simulated seconds between ticks with the model
+        '''
+        if type(runs) != int or type(ticks) != int:
+            raise TypeError("Number of runs and ticks must be passed in as integers.")
+
+        if runs < 1 or ticks < 1:
+            raise ValueError("Number of runs and ticks must be at least 1.")
+
+        self.path = path
+        self.runs = runs
+        self.ticks = ticks
+        self.seed = seed
+        self.config = config
+        self.processes = processes
+        self.model = model
+        self.interval = interval
+        self.summaries = []
+
+    def run(self, callback=None, chunksize: int = 4):
+        ''' Execute runs not completed in the checkpoint, return summary of all runs as by summarize()
+
+        callback -- optional function called with the summary of every run as it finishes
+        chunksize -- number of runs handed to a worker process at once
+        '''
+        header = {"study": {"ticks": self.ticks, "seed": self.seed, "config": self.config, "model": self.model,
+                            "interval": self.interval}}
+        self.summaries = self._load_checkpoint(header)
+
+        completed = {summary["seed"] for summary in self.summaries}
+        seeds = [seed for seed in range(self.seed, self.seed + self.runs) if seed not in completed]
+
+        with open(self.path, "a") as checkpoint:
+            if checkpoint.tell() == 0:
+                checkpoint.write(json.dumps(header) + "\n")
+                checkpoint.flush()
+
+            if seeds:
+                with multiprocessing.Pool(self.processes) as pool:
+                    arguments = [(seed, self.ticks, self.config, self.model, self.interval) for seed in seeds]
+                    for summary in pool.imap_unordered(_run_seed, arguments, chunksize):
+                        checkpoint.write(json.dumps(summary) + "\n")
+                        checkpoint.flush()
+                        self.summaries.append(summary)
+                        if callback is not None:
+                            callback(summary)
+
+        return summarize(self.summaries)
+
+    def _load_checkpoint(self, header: dict):
+        ''' Return list of summaries of completed runs in the checkpoint
+
+        A checkpoint of a different study raises ValueError, a line cut short by an interrupted
+        study is ignored and left in the file.
+
+        header -- first line of the checkpoint of this study
+        '''
+        if not os.path.exists(self.path):
+            return []
+
+        summaries = {}
+        with open(self.path) as checkpoint:
+            content = checkpoint.read()
+        lines = content.splitlines()
+
+        if lines and json.loads(lines[0]) != header:
+            raise ValueError("Checkpoint %s belongs to a different study." % self.path)
+
+        for line in lines[1:]:
+            try:
+                summary = json.loads(line)
+            except ValueError:
+                continue
+            if self.seed <= summary["seed"] < self.seed + self.runs:
+                summaries[summary["seed"]] = summary
+
+        # the checkpoint is only appended to, new summaries start on a line after one cut short
+        if content and not content.endswith("\n"):
+            with open(self.path, "a") as checkpoint:
+                checkpoint.write("\n")
+
+        return list(summaries.values())
+
+def _run_seed(arguments: tuple):
+    ''' Run simulation in a worker process
+
+    arguments -- tuple of seed, number of ticks, configuration, model and interval
+    '''
+    seed, ticks, config, model, interval = arguments
+    return run_simulation(seed, ticks, config, model=model, interval=interval)
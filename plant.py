@@ -0,0 +1,158 @@
+'''
+Bridge between the control loop and the coupled GreenhouseModel of the simulator.
+
+ModelEnvironment is used in place of an Environment for a zone of the model, like DeviceEnvironment
+is for a device. Sensors read it with the "environment" source and get the state of the model.
+Actuators write it as usual, but a write does not change the zone: the target the actuator
+ramps to becomes the setpoint of the zone, and the plant turns setpoints into model inputs:
+    heater -- heating or cooling power holding the heat balance, plus power proportional to the
+        distance to the setpoint, within the heater power
+    humidifier -- vapor holding the vapor balance at the setpoint humidity, plus vapor proportional
+        to the distance, within the humidifier capacity
+    lights -- lamp level making up the difference between the setpoint and daylight
+
+ModelPlant.step() advances the model between ticks with those inputs, so control strategies are
+judged against the physics of the model instead of independent random changes.
+'''
+
+import math
+from controller import Environment
+from simulator import GreenhouseModel, saturation_vapor_density
+
+variables = ("temperature", "humidity", "light")
+
+class ModelEnvironment(Environment):
+    ''' Environment of a zone of a GreenhouseModel, actuator writes become setpoints of the zone
+
+    Attributes:
+    model -- GreenhouseModel simulating the zone
+    zone -- index of the zone in the model
+    setpoints -- dictionary of the last target written by each actuator, a variable without one is not driven
+    '''
+    def __init__(self, model: GreenhouseModel, zone: int = 0):
+        ''' Initialize environment of a zone of the model
+
+        model -- GreenhouseModel simulating the zone
+        zone -- index of the zone in the model
+        '''
+        super().__init__(None, None, None)
+        self.model = model
+        self.zone = zone
+        self.setpoints = {}
+
+    def set_environment(self, variable: str, value):
+        ''' Check the value against environment boundaries and make it the setpoint of the variable
+
+        variable -- environment variable
+        value -- value to update the variable
+        '''
+        super().set_environment(variable, value)
+        self.setpoints[variable] = value
+
+    def get_environment_variable(self, variable: str):
+        ''' Read the current value of a specific environmental variable from the model
+
+        Values are rounded like the simulator's readings and kept within the environment boundaries.
+
+        variable -- name of the environment variable
+        '''
+        super().get_environment_variable(variable)
+        state = self.model.get_zone(self.zone)
+        if variable == "temperature":
+            value = min(max(round(state["temperature"], 2), 15.0), 40.0)
+        elif variable == "humidity":
+            value = min(max(int(round(state["humidity"])), 40), 100)
+        else:
+            value = min(max(int(round(state["light"])), 150), 850)
+        self.environment[variable] = value
+        return value
+
+    def get_environment(self):
+        ''' Read the current state of the environment from the model
+        '''
+        for variable in variables:
+            self.get_environment_variable(variable)
+        return self.environment
+
+class ModelPlant:
+    ''' Actuators of all zones of a GreenhouseModel, driving the model towards the setpoints of the zones
+
+    Attributes:
+    model -- GreenhouseModel simulating the zones
+    environments -- list of ModelEnvironment of every zone
+    heater_power -- maximum heating or cooling power of a zone in W
+    humidifier_capacity -- maximum vapor added or removed in a zone in g/s
+    response -- number of seconds the actuators aim to close the distance to the setpoint in
+    '''
+    def __init__(self, model: GreenhouseModel, heater_power: float = 20000.0, humidifier_capacity: float = 5.0,
+                 response: float = 300.0):
+        ''' Create an environment for every zone of the model
+
+        model -- GreenhouseModel simulating the zones
+        heater_power -- maximum heating or cooling power of a zone in W
+        humidifier_capacity -- maximum vapor added or removed in a zone in g/s
+        response -- number of seconds the actuators aim to close the distance to the setpoint in
+        '''
+        if response <= 0:
+            raise ValueError("Response time must be positive.")
+
+        self.model = model
+        self.environments = [ModelEnvironment(model, zone) for zone in range(model.zones)]
+        self.heater_power = heater_power
+        self.humidifier_capacity = humidifier_capacity
+        self.response = response
+
+    def get_inputs(self):
+        ''' Return tuple of heating, humidification and lamp vectors from the setpoints of all zones
+        '''
+        model = self.model
+        heating = [0.0] * model.zones
+        humidification = [0.0] * model.zones
+        lamps = list(model.lamps)
+
+        for zone, environment in enumerate(self.environments):
+            setpoints = environment.setpoints
+            temperature = model.temperature[zone]
+            daylight = model.daylight[zone]
+
+            if "light" in setpoints:
+                lamps[zone] = max(setpoints["light"] - daylight, 0.0)
+
+            if "temperature" in setpoints:
+                # hold the heat balance and close the distance to the setpoint within the response time
+                balance = (model.ua * (temperature - model.outside_temperature[zone])
+                           - model.lamp_heat * lamps[zone] - model.solar_heat * daylight)
+                power = balance + model.heat_capacity * (setpoints["temperature"] - temperature) / self.response
+                heating[zone] = min(max(power, -self.heater_power), self.heater_power)
+
+            if "humidity" in setpoints:
+                vapor = model.vapor[zone]
+                target = setpoints["humidity"] / 100 * saturation_vapor_density(temperature)
+                balance = model.ventilation * model.volume * (vapor - model.outside_vapor[zone]) - model.transpiration
+                water = balance + model.volume * (target - vapor) / self.response
+                humidification[zone] = min(max(water, -self.humidifier_capacity), self.humidifier_capacity)
+
+        return heating, humidification, lamps
+
+    def step(self, duration: float):
+        ''' Advance the model by duration seconds with the inputs of the current setpoints
+
+        duration -- simulated time in seconds
+        '''
+        heating, humidification, lamps = self.get_inputs()
+        self.model.step(duration, heating, humidification, lamps)
+
+def daily_weather(time: float, temperature: float = 12.0, swing: float = 8.0, humidity: float = 75.0,
+                  daylight: float = 400.0):
+    ''' Return tuple of outside temperature, humidity and daylight at a time of a simple daily cycle
+
+    Temperature and daylight peak at noon, there is no daylight during the night.
+
+    time -- simulated time in seconds since midnight of the first day
+    temperature -- mean outside temperature in °C
+    swing -- difference between the mean and the warmest temperature of the day
+    humidity -- outside relative humidity in %
+    daylight -- daylight level at noon
+    '''
+    phase = math.sin(2 * math.pi * (time / 86400 - 0.25))
+    return temperature + swing * phase, humidity, max(phase, 0.0) * daylight
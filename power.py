@@ -0,0 +1,172 @@
+'''
+Site level allocation of heating and lighting power under a global power cap.
+
+Zones do not raise temperature or light on their own. During a tick every zone hands its
+request (current value and target) to the allocator, and once all zones have ticked the allocator
+solves one allocation for the whole site:
+    - the power of a request is the rise of the variable times the power per unit of its actuator
+    - requests are ranked by urgency, the zone priority times the rise relative to the actuator range
+    - the most urgent requests are granted in full while the cap allows, the next one gets the rest
+      of the cap as a partial rise, the others wait for a later tick
+
+Requests are kept in flat parallel lists and the allocation is a single sort and pass over them,
+so a site of thousands of zones is allocated within a few milliseconds. Lowering temperature or
+light takes no power, so those actuations are not limited.
+
+A request of a zone with command queues is granted by submitting its target to the actuator's
+queue, so it is coalesced and rate limited like any other command, and executed when the zone
+pumps its queues in its next tick.
+'''
+
+from array import array
+from actuators import Lights
+from command_queue import commands
+
+# default kW per unit rise of the environment variable during a tick
+unit_power = {"heater": 2.0, "lights": 0.01}
+
+class PowerAllocator:
+    ''' Priority-weighted greedy allocation of actuator power across zones
+
+    Attributes:
+    cap -- maximum power in kW granted in a single tick
+    priorities -- list of priority weight of each zone, zones without one have priority 1.0
+    unit_power -- dictionary of kW per unit rise of each actuator
+    requested -- power in kW requested in the last allocation
+    granted -- power in kW granted in the last allocation
+    throttled -- number of requests not granted in full in the last allocation
+    '''
+    def __init__(self, cap: float, priorities: list = None, **overrides):
+        ''' Initialize allocator without requests
+
+        cap -- maximum power in kW granted in a single tick
+        priorities -- list of priority weight of each zone
+        overrides -- kW per unit rise replacing defaults of actuators, e.g. heater=3.0
+        '''
+        if cap < 0:
+            raise ValueError("Power cap must not be negative.")
+
+        for name in overrides:
+            if name not in unit_power:
+                raise ValueError("Invalid actuator: %s" % name)
+
+        self.cap = cap
+        self.priorities = list(priorities) if priorities is not None else []
+        self.unit_power = dict(unit_power, **overrides)
+        self.requested = 0.0
+        self.granted = 0.0
+        self.throttled = 0
+        self._clear()
+
+    def request(self, zone: int, name: str, actuator, current: float, target: float, queue=None):
+        ''' Add request of a zone to raise its environment variable, executed by dispatch()
+
+        zone -- zone of the actuator
+        name -- name of the actuator, "heater" or "lights"
+        actuator -- actuator instance
+        current -- current value of the environment variable
+        target -- target value of the environment variable
+        queue -- optional CommandQueue of the actuator the granted target is submitted to
+        '''
+        if target <= current:
+            raise ValueError("Only rises of the environment variable need power.")
+
+        rise = target - current
+        priority = self.priorities[zone] if zone < len(self.priorities) else 1.0
+
+        self._zones.append(zone)
+        self._names.append(name)
+        self._actuators.append(actuator)
+        self._queues.append(queue)
+        self._current.append(current)
+        self._rise.append(rise)
+        self._power.append(rise * self.unit_power[name])
+        self._urgency.append(priority * rise / (actuator.max - actuator.min))
+
+    def allocate(self):
+        ''' Return list of granted fraction of each pending request, most urgent requests first within the cap
+        '''
+        fractions = [0.0] * len(self._power)
+        remaining = self.cap
+
+        for index in sorted(range(len(self._urgency)), key=self._urgency.__getitem__, reverse=True):
+            if remaining <= 0:
+                break
+            power = self._power[index]
+            if power <= remaining:
+                fractions[index] = 1.0
+                remaining -= power
+            else:
+                fractions[index] = remaining / power
+                remaining = 0
+
+        self.requested = sum(self._power)
+        self.granted = self.cap - remaining if self.requested > self.cap else self.requested
+        self.throttled = len(fractions) - fractions.count(1.0)
+        return fractions
+
+    def dispatch(self, history=None):
+        ''' Allocate pending requests, activate actuators with their granted targets and clear the requests
+
+        Granted targets of requests with a command queue are submitted to the queue instead, the
+        queue records the action when it executes it.
+        Return list of (zone, actuator name, granted target) tuples of the activated actuators, an
+        actuator whose environment fails to apply the change is left out.
+
+        history -- optional HistoryStore recording the actions
+        '''
+        fractions = self.allocate()
+        executed = []
+
+        for index, fraction in enumerate(fractions):
+            if fraction == 0:
+                continue
+
+            actuator = self._actuators[index]
+            target = self._current[index] + self._rise[index] * fraction
+            if isinstance(actuator, Lights):
+                # lights need integer targets, a partial rise is rounded down to stay within the cap
+                target = int(target)
+                if target <= self._current[index]:
+                    continue
+
+            queue = self._queues[index]
+            try:
+                if queue is not None:
+                    if queue.submit(target):
+                        executed.append((self._zones[index], self._names[index], target))
+                    continue
+                getattr(actuator, commands[type(actuator)][0])(target)
+            except OSError as e:
+                print("Error activating %s of zone %d: %s" % (self._names[index], self._zones[index], e))
+                continue
+
+            executed.append((self._zones[index], self._names[index], target))
+            if history is not None:
+                history.record_action(self._names[index], target, self._zones[index])
+
+        self._clear()
+        return executed
+
+    def pending_power(self):
+        ''' Return list of power in kW of each pending request, in the order of the fractions of allocate()
+        '''
+        return list(self._power)
+
+    def get_metrics(self):
+        ''' Return dictionary with pending requests and requested, granted power and throttled requests of the last allocation
+        '''
+        return {"pending": len(self._power), "requested": self.requested, "granted": self.granted,
+                "throttled": self.throttled}
+
+    def _clear(self):
+        ''' Remove all pending requests
+        '''
+        self._zones = []
+        self._names = []
+        self._actuators = []
+        self._queues = []
+        self._current = array("d")
+        self._rise = array("d")
+        self._power = array("d")
+        self._urgency = array("d")
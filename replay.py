@@ -0,0 +1,165 @@
+'''
+Replay of recorded sensor traces as a third source of sensor readings.
+
+Traces are read lazily record by record, so memory use stays flat however large the trace is.
+Two formats are supported:
+    CSV -- header "timestamp,zone,temperature,humidity,light", empty value for a missing reading
+    binary -- MAGIC followed by little-endian records of RECORD struct, NaN for a missing reading
+
+Records are replayed at real time, at a multiple of real time or as fast as possible.
+'''
+
+import csv
+import math
+import struct
+import time
+
+MAGIC = b"GHTRACE1"
+RECORD = struct.Struct("<dIddd")
+variables = ("temperature", "humidity", "light")
+
+def read_trace(path: str, chunk_size: int = 4096):
+    ''' Generate records of a trace file one by one as dictionaries
+
+    Format of the file is recognized by its first bytes, binary traces start with MAGIC.
+
+    path -- path to the trace file
+    chunk_size -- number of binary records read from the file at once
+    '''
+    with open(path, "rb") as file:
+        binary = file.read(len(MAGIC)) == MAGIC
+
+    if binary:
+        yield from _read_binary(path, chunk_size)
+    else:
+        yield from _read_csv(path)
+
+def write_trace(path: str, records, binary: bool = False):
+    ''' Write records to a trace file, records can be any iterable of dictionaries
+
+    path -- path to the trace file
+    records -- iterable of dictionaries with timestamp, zone, temperature, humidity and light
+    binary -- write binary format instead of CSV
+    '''
+    if binary:
+        with open(path, "wb") as file:
+            file.write(MAGIC)
+            for record in records:
+                file.write(RECORD.pack(record["timestamp"], record.get("zone", 0),
+                                       *(math.nan if record[v] is None else record[v] for v in variables)))
+    else:
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(("timestamp", "zone") + variables)
+            for record in records:
+                writer.writerow([record["timestamp"], record.get("zone", 0)] +
+                                ["" if record[v] is None else record[v] for v in variables])
+
+class TraceReplay:
+    ''' Replay of a trace file, paced by the timestamps of its records
+
+    Attributes:
+    path -- path to the trace file
+    speed -- replay speed as a multiple of real time, None replays as fast as possible
+    zone -- zone whose records are replayed, None replays all records
+    current -- the current record, None before the first advance
+    replayed -- number of records replayed
+    '''
+    def __init__(self, path: str, speed: float = 1.0, zone: int = None, clock=time.monotonic, sleep=time.sleep):
+        ''' Initialize replay, the file is opened on the first advance
+
+        path -- path to the trace file
+        speed -- replay speed as a multiple of real time, None replays as fast as possible
+        zone -- zone whose records are replayed, None replays all records
+        clock -- function returning current time in seconds
+        sleep -- function waiting for a number of seconds
+        '''
+        if speed is not None and speed <= 0:
+            raise ValueError("Replay speed must be positive.")
+
+        self.path = path
+        self.speed = speed
+        self.zone = zone
+        self.current = None
+        self.replayed = 0
+
+        self._clock = clock
+        self._sleep = sleep
+        self._records = None
+        self._start = None
+
+    def advance(self):
+        ''' Wait until the next record is due and make it the current record
+
+        Return False when the trace has ended.
+        '''
+        if self._records is None:
+            self._records = read_trace(self.path)
+
+        for record in self._records:
+            if self.zone is None or record["zone"] == self.zone:
+                break
+        else:
+            self.current = None
+            return False
+
+        # wait until the time of the record relative to the first one has passed
+        if self.speed is not None:
+            if self._start is None:
+                self._start = (record["timestamp"], self._clock())
+            else:
+                due = self._start[1] + (record["timestamp"] - self._start[0]) / self.speed
+                delay = due - self._clock()
+                if delay > 0:
+                    self._sleep(delay)
+
+        self.current = record
+        self.replayed += 1
+        return True
+
+    def get_trace_variable(self, variable: str):
+        ''' Get the value of an environment variable in the current record
+
+        variable -- name of the environment variable
+        '''
+        if variable not in variables:
+            raise ValueError("Invalid environment variable: %s" % variable)
+
+        if self.current is None:
+            raise RuntimeError("Trace replay has no current record.")
+
+        return self.current[variable]
+
+def _read_csv(path: str):
+    ''' Generate records of a CSV trace
+
+    path -- path to the trace file
+    '''
+    with open(path, newline="") as file:
+        for row in csv.DictReader(file):
+            record = {"timestamp": float(row["timestamp"]), "zone": int(row.get("zone") or 0)}
+            for variable in variables:
+                value = row.get(variable)
+                record[variable] = float(value) if value else None
+            yield record
+
+def _read_binary(path: str, chunk_size: int):
+    ''' Generate records of a binary trace
+
+    path -- path to the trace file
+    chunk_size -- number of records read from the file at once
+    '''
+    with open(path, "rb") as file:
+        file.seek(len(MAGIC))
+        while True:
+            chunk = file.read(RECORD.size * chunk_size)
+            if len(chunk) < RECORD.size:
+                return
+
+            # a truncated last record is ignored
+            chunk = chunk[:len(chunk) - len(chunk) % RECORD.size]
+            for timestamp, zone, temperature, humidity, light in RECORD.iter_unpack(chunk):
+                yield {"timestamp": timestamp, "zone": zone,
+                       "temperature": None if math.isnan(temperature) else temperature,
+                       "humidity": None if math.isnan(humidity) else humidity,
+                       "light": None if math.isnan(light) else light}
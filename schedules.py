@@ -0,0 +1,163 @@
+'''
+Time of day schedules of ideal environment conditions.
+
+A schedule is a list of phases, each starting at a time of day with its own ideal conditions.
+When a phase starts, the ideal conditions ramp linearly from the previous phase over ramp minutes.
+
+Schedules are compiled into a lookup table with the ideal conditions of every time bucket of
+the day, so finding the current ideal conditions is a single table lookup.
+'''
+
+import time
+
+# keys of ideal conditions, integer values are required by humidifier and lights
+condition_keys = ("temp_upper", "temp_lower", "humidity_upper", "humidity_lower", "light_upper", "light_lower")
+integer_keys = ("humidity_upper", "humidity_lower", "light_upper", "light_lower")
+
+class Schedule:
+    ''' Compiled daily schedule of ideal environment conditions
+
+    Attributes:
+    phases -- list of (start minute of the day, ideal conditions) tuples sorted by start
+    ramp -- number of minutes of the transition into a phase
+    bucket -- number of minutes in a time bucket of the lookup table
+    table -- list of ideal conditions for every time bucket of the day
+    '''
+    def __init__(self, phases: list, ramp: int = 30, bucket: int = 1):
+        ''' Compile the schedule into the lookup table
+
+        phases -- list of (start, ideal conditions) tuples, start is "HH:MM" or minute of the day
+        ramp -- number of minutes of the transition into a phase
+        bucket -- number of minutes in a time bucket of the lookup table
+        '''
+        if len(phases) == 0:
+            raise ValueError("Schedule must have at least one phase.")
+
+        if type(bucket) != int or type(ramp) != int:
+            raise TypeError("Ramp and bucket must be passed in as integers.")
+
+        if bucket < 1 or 1440 % bucket != 0:
+            raise ValueError("Bucket must be a whole divisor of 1440 minutes.")
+
+        if ramp < 0:
+            raise ValueError("Ramp must not be negative.")
+
+        self.phases = sorted(((_minute_of_day(start), _validate(conditions)) for start, conditions in phases),
+                             key=lambda phase: phase[0])
+        for (start, _), (following, _) in zip(self.phases, self.phases[1:]):
+            if start == following:
+                raise ValueError("Two phases start at minute %d of the day." % start)
+        self.ramp = ramp
+        self.bucket = bucket
+        self.table = [self._evaluate(minute) for minute in range(0, 1440, bucket)]
+
+    def lookup(self, now: float = None):
+        ''' Return ideal conditions at the given time
+
+        now -- time in seconds since epoch, default: current time
+        '''
+        if now is None:
+            now = time.time()
+
+        local = time.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        return self.table[minute // self.bucket]
+
+    def _evaluate(self, minute: int):
+        ''' Return ideal conditions at minute of the day, ramping between phases
+
+        minute -- minute of the day
+        '''
+        # the phase in effect is the last one started, which is the last phase of the day before the first one
+        index = len(self.phases) - 1
+        for i, (start, _) in enumerate(self.phases):
+            if start <= minute:
+                index = i
+
+        start, conditions = self.phases[index]
+        previous = self.phases[index - 1][1]
+        elapsed = (minute - start) % 1440
+
+        if elapsed >= self.ramp or previous is conditions:
+            return dict(conditions)
+
+        fraction = elapsed / self.ramp
+        ramped = {}
+        for key in condition_keys:
+            value = previous[key] + (conditions[key] - previous[key]) * fraction
+            ramped[key] = int(round(value)) if key in integer_keys else round(value, 2)
+        return ramped
+
+def current_conditions(schedules: list, now: float = None):
+    ''' Return list of current ideal conditions of every zone
+
+    schedules -- list of schedules, one per zone
+    now -- time in seconds since epoch, default: current time
+    '''
+    if now is None:
+        now = time.time()
+
+    # every zone shares the same time bucket, only the table differs
+    local = time.localtime(now)
+    minute = local.tm_hour * 60 + local.tm_min
+    return [schedule.table[minute // schedule.bucket] for schedule in schedules]
+
+def photoperiod_schedule(day_start: str, day_length: float, day: dict, night: dict, ramp: int = 30):
+    ''' Create a schedule with day and night phases
+
+    day_start -- time of the day the day phase starts, "HH:MM"
+    day_length -- length of the day phase in hours
+    day -- ideal conditions during the day
+    night -- ideal conditions during the night
+    ramp -- number of minutes of the transition between day and night
+    '''
+    start = _minute_of_day(day_start)
+    end = (start + int(day_length * 60)) % 1440
+    return Schedule([(start, day), (end, night)], ramp)
+
+def default_schedule():
+    ''' Create the default schedule, humidity 65 - 75% during the night and around 80% during the day
+    '''
+    day = {"temp_upper": 27.0, "temp_lower": 21.0, "humidity_upper": 85, "humidity_lower": 75,
+           "light_upper": 700, "light_lower": 600}
+    night = {"temp_upper": 27.0, "temp_lower": 21.0, "humidity_upper": 75, "humidity_lower": 65,
+             "light_upper": 700, "light_lower": 600}
+    return photoperiod_schedule("06:00", 14, day, night)
+
+def _minute_of_day(start):
+    ''' Return minute of the day from "HH:MM" string or minute number
+
+    start -- "HH:MM" string or minute of the day
+    '''
+    if isinstance(start, str):
+        try:
+            hours, minutes = start.split(":")
+            start = int(hours) * 60 + int(minutes)
+        except ValueError:
+            raise ValueError("Invalid time of day: %s" % start)
+
+    if type(start) != int or start < 0 or start >= 1440:
+        raise ValueError("Invalid time of day: %s" % start)
+
+    return start
+
+def _validate(conditions: dict):
+    ''' Return ideal conditions if they contain every key with the right type and lower bound not above the upper bound
+
+    conditions -- dictionary of ideal conditions
+    '''
+    for key in condition_keys:
+        if key not in conditions:
+            raise ValueError("Missing ideal condition: %s" % key)
+
+        # humidifier and lights only accept integer targets
+        if key in integer_keys and type(conditions[key]) != int:
+            raise ValueError("Ideal condition %s must be an integer." % key)
+        if key not in integer_keys and type(conditions[key]) not in (int, float):
+            raise ValueError("Ideal condition %s must be a number." % key)
+
+    for prefix in ("temp", "humidity", "light"):
+        if conditions[prefix + "_lower"] > conditions[prefix + "_upper"]:
+            raise ValueError("Lower %s bound is above the upper bound." % prefix)
+
+    return conditions
@@ -1,8 +1,8 @@
 '''
 Module containing sensors classes for temperature, humidity and light sensors.
 
-Each sensor class is able to fetch data from simulator or environment that can be then 
-used by controller to process further.
+Each sensor class is able to fetch data from simulator, environment or a replayed trace
+that can be then used by controller to process further.
 '''
 
 import simulator
@@ -14,13 +14,19 @@ class TemperatureSensor:
 
     Attributes:
     env -- environment instance representing current environment
+    confidence -- weight of the sensor readings when fused with redundant sensors
+    noise -- maximum measurement error of the sensor when measuring a shared simulated value
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, confidence: float = 1.0, noise: float = 0.0):
         ''' Initialize the sensor
         
         environment -- environment instance
+        confidence -- weight of the sensor readings when fused with redundant sensors
+        noise -- maximum measurement error of the sensor when measuring a shared simulated value
         '''
         self.env = environment
+        self.confidence = confidence
+        self.noise = noise
 
     def get_simulator_data(self):
         ''' Fetch current environment temperature data from simulator
@@ -30,6 +36,17 @@ class TemperatureSensor:
         except Exception as e:
             print("Error fetching temperature data from simulator: %s" % e)
             return None
+
+    def get_measured_data(self, value):
+        ''' Measure temperature of the simulated environment shared by redundant sensors, adding the noise of this sensor
+
+        value -- temperature of the environment advanced by the simulator in this tick
+        '''
+        try:
+            return simulator.measure("temperature", value, self.noise)
+        except Exception as e:
+            print("Error measuring temperature data: %s" % e)
+            return None
     
     # get environment data from environment class instance
     def get_environment_data(self, environment):
@@ -43,6 +60,17 @@ class TemperatureSensor:
             print("Error fetching temperature data from environment: %s" % e)
             return None
 
+    def get_trace_data(self, replay):
+        ''' Fetch current temperature data from the current record of a replayed trace
+
+        replay -- TraceReplay instance
+        '''
+        try:
+            return replay.get_trace_variable("temperature")
+        except Exception as e:
+            print("Error fetching temperature data from trace: %s" % e)
+            return None
+
 class HumiditySensor:
     ''' Sensor class for sensing the temperature in the environment 
 
@@ -50,13 +78,19 @@ class HumiditySensor:
 
     Attributes:
     env -- environment instance representing current environment
+    confidence -- weight of the sensor readings when fused with redundant sensors
+    noise -- maximum measurement error of the sensor when measuring a shared simulated value
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, confidence: float = 1.0, noise: float = 0.0):
         ''' Initialize the sensor
         
         environment -- environment instance
+        confidence -- weight of the sensor readings when fused with redundant sensors
+        noise -- maximum measurement error of the sensor when measuring a shared simulated value
         '''
         self.env = environment
+        self.confidence = confidence
+        self.noise = noise
 
     def get_simulator_data(self):
         ''' Fetch current environment humidity data from simulator
@@ -66,6 +100,17 @@ class HumiditySensor:
         except Exception as e:
             print("Error fetching humidity data from simulator: %s" % e)
             return None
+
+    def get_measured_data(self, value):
+        ''' Measure humidity of the simulated environment shared by redundant sensors, adding the noise of this sensor
+
+        value -- humidity of the environment advanced by the simulator in this tick
+        '''
+        try:
+            return simulator.measure("humidity", value, self.noise)
+        except Exception as e:
+            print("Error measuring humidity data: %s" % e)
+            return None
     
     def get_environment_data(self, environment):
        ''' Fetch current environment humidity data directly from environment
@@ -78,6 +123,17 @@ class HumiditySensor:
             print("Error fetching humidity data from environment: %s" % e)
             return None
 
+    def get_trace_data(self, replay):
+        ''' Fetch current humidity data from the current record of a replayed trace
+
+        replay -- TraceReplay instance
+        '''
+        try:
+            return replay.get_trace_variable("humidity")
+        except Exception as e:
+            print("Error fetching humidity data from trace: %s" % e)
+            return None
+
 class LightSensor:
     ''' Sensor class for sensing the temperature in the environment 
 
@@ -85,13 +141,19 @@ class LightSensor:
 
     Attributes:
     env -- environment instance representing current environment
+    confidence -- weight of the sensor readings when fused with redundant sensors
+    noise -- maximum measurement error of the sensor when measuring a shared simulated value
     '''
-    def __init__(self, environment):
+    def __init__(self, environment, confidence: float = 1.0, noise: float = 0.0):
         ''' Initialize the sensor
         
         environment -- environment instance
+        confidence -- weight of the sensor readings when fused with redundant sensors
+        noise -- maximum measurement error of the sensor when measuring a shared simulated value
         '''
         self.env = environment
+        self.confidence = confidence
+        self.noise = noise
 
     def get_simulator_data(self):
         ''' Fetch current light spectrum data from simulator
@@ -101,6 +163,17 @@ class LightSensor:
         except Exception as e:
             print("Error fetching light spectrum data from simulator: %s" % e)
             return None
+
+    def get_measured_data(self, value):
+        ''' Measure light spectrum of the simulated environment shared by redundant sensors, adding the noise of this sensor
+
+        value -- light spectrum of the environment advanced by the simulator in this tick
+        '''
+        try:
+            return simulator.measure("light", value, self.noise)
+        except Exception as e:
+            print("Error measuring light spectrum data: %s" % e)
+            return None
     
     def get_environment_data(self, environment):
        ''' Fetch current environment light spectrum data directly from environment
@@ -111,4 +184,15 @@ class LightSensor:
             return environment.get_environment_variable("light")
        except Exception as e:
             print("Error fetching light spectrum data from environment: %s" % e)
+            return None
+
+    def get_trace_data(self, replay):
+        ''' Fetch current light spectrum data from the current record of a replayed trace
+
+        replay -- TraceReplay instance
+        '''
+        try:
+            return replay.get_trace_variable("light")
+        except Exception as e:
+            print("Error fetching light spectrum data from trace: %s" % e)
             return None
\ No newline at end of file
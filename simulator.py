@@ -2,8 +2,13 @@
 Simulator generating sensor readings of environment variables.
 
 Simulator simulates realistic changes in the greenhouse environment.
+
+Sensor readings are independent random changes of each environment variable. GreenhouseModel
+simulates zones with coupled temperature, humidity and light instead, driven by actuator inputs
+and outside weather, for judging control strategies.
 '''
 
+import math
 import random
     
 # define range for possible changes for each sensor to simulate real world scenario
@@ -38,21 +43,234 @@ def get_simulator_data(sensor: str, environment):
     # apply boundaries to the environmental variable values
     if sensor == "temperature":
         if updated_value > 40.0:
-            environment.set_environment(sensor, 40.0)
+            updated_value = 40.0
         elif updated_value < 15.0:
-            environment.set_environment(sensor, 15.0)
+            updated_value = 15.0
     elif sensor == "humidity":
         if updated_value > 100:
-                environment.set_environment(sensor, 100)
+                updated_value = 100
         elif updated_value < 40:
-                environment.set_environment(sensor, 40)
+                updated_value = 40
     elif sensor == "light":
         if updated_value > 850:
-            environment.set_environment(sensor, 850)
-        elif updated_value < 0:
-            environment.set_environment(sensor, 0)
+            updated_value = 850
+        elif updated_value < 150:
+            updated_value = 150
 
     environment.set_environment(sensor, updated_value)     
 
     # return generated data
-    return updated_value
\ No newline at end of file
+    return updated_value
+
+def measure(sensor: str, value, noise: float):
+    ''' Return a measurement of a value by a sensor with a maximum error of noise
+
+    Redundant sensors measure the same value of the environment, each with its own error.
+
+    sensor -- type of sensor measuring the value
+    value -- value of the environment variable
+    noise -- maximum measurement error of the sensor
+    '''
+    if sensor not in changes:
+        raise ValueError("Sensor type %s is not valid." % sensor)
+
+    if noise == 0 or value is None:
+        return value
+
+    error = random.uniform(-noise, noise)
+    if sensor == "temperature":
+        return round(value + error, 2)
+    return int(round(value + error))
+
+def saturation_vapor_density(temperature: float):
+    ''' Return the maximum amount of water vapor in g/m³ air can hold at given temperature (Magnus formula)
+
+    temperature -- air temperature in °C
+    '''
+    pressure = 6.112 * math.exp(17.62 * temperature / (243.12 + temperature))
+    return 216.7 * pressure / (temperature + 273.15)
+
+class GreenhouseModel:
+    ''' Coupled physics based model of any number of greenhouse zones
+
+    State of every zone is air temperature and vapor density, kept as vectors with one value
+    per zone, so all zones are stepped together by one update. Relative humidity follows
+    from vapor density and temperature, so heating a zone lowers its relative humidity.
+    Light is the sum of lamp light and daylight, and lamps heat the zone.
+
+    Balances solved with a fixed-step fourth order Runge-Kutta solver:
+        heat_capacity * dT/dt = heating + lamp_heat * lamps + solar_heat * daylight - ua * (T - T_outside)
+        volume * dV/dt = humidification + transpiration - ventilation * volume * (V - V_outside)
+
+    Attributes:
+    zones -- number of zones
+    temperature -- vector of air temperatures in °C
+    vapor -- vector of vapor densities in g/m³
+    lamps -- vector of lamp light levels
+    dt -- length of a solver step in seconds
+    heat_capacity -- thermal mass of a zone in J/K
+    ua -- heat loss to outside in W/K
+    lamp_heat -- heat of lamps in W per unit of light
+    solar_heat -- heat of daylight in W per unit of light
+    volume -- air volume of a zone in m³
+    ventilation -- air exchange with outside in 1/s
+    transpiration -- water vapor given off by plants in g/s
+    outside_temperature -- vector of outside temperatures in °C
+    outside_vapor -- vector of outside vapor densities in g/m³
+    daylight -- vector of daylight levels reaching the zones
+    '''
+    def __init__(self, zones: int, temperature: float = 20.0, humidity: float = 70.0, dt: float = 1.0):
+        ''' Initialize all zones to the same state, with lamps off and outside weather equal to the zones
+
+        zones -- number of zones
+        temperature -- initial air temperature in °C
+        humidity -- initial relative humidity in %
+        dt -- length of a solver step in seconds
+        '''
+        if type(zones) != int:
+            raise TypeError("Number of zones must be passed in as an integer.")
+
+        if zones < 1:
+            raise ValueError("Number of zones must be at least 1.")
+
+        if dt <= 0:
+            raise ValueError("Solver step must be positive.")
+
+        vapor = humidity / 100 * saturation_vapor_density(temperature)
+
+        self.zones = zones
+        self.temperature = [float(temperature)] * zones
+        self.vapor = [vapor] * zones
+        self.lamps = [0.0] * zones
+        self.dt = dt
+
+        self.heat_capacity = 2.0e6
+        self.ua = 500.0
+        self.lamp_heat = 2.0
+        self.solar_heat = 1.0
+        self.volume = 300.0
+        self.ventilation = 0.5 / 3600
+        self.transpiration = 0.02
+
+        self.outside_temperature = [float(temperature)] * zones
+        self.outside_vapor = [vapor] * zones
+        self.daylight = [0.0] * zones
+
+    def set_weather(self, temperature, humidity, daylight=0.0):
+        ''' Set outside weather, each value is either one value for all zones or a list with a value per zone
+
+        temperature -- outside temperature in °C
+        humidity -- outside relative humidity in %
+        daylight -- daylight level reaching the zones
+        '''
+        temperature = self._vector(temperature)
+        humidity = self._vector(humidity)
+
+        self.outside_temperature = temperature
+        self.outside_vapor = [h / 100 * saturation_vapor_density(t) for t, h in zip(temperature, humidity)]
+        self.daylight = self._vector(daylight)
+
+    def step(self, duration: float, heating=0.0, humidification=0.0, lamps=None):
+        ''' Advance all zones by duration seconds with constant actuator inputs
+
+        Each input is either one value for all zones or a list with a value per zone.
+
+        duration -- simulated time in seconds, rounded to a whole number of solver steps
+        heating -- heater power in W, negative for cooling
+        humidification -- water vapor added by humidifiers in g/s, negative for dehumidifying
+        lamps -- lamp light levels, default: keep current levels
+        '''
+        heating = self._vector(heating)
+        humidification = self._vector(humidification)
+        if lamps is not None:
+            self.lamps = self._vector(lamps)
+
+        # heat and vapor sources that stay constant during the step
+        heat = [h + self.lamp_heat * l + self.solar_heat * d
+                for h, l, d in zip(heating, self.lamps, self.daylight)]
+        water = [m + self.transpiration for m in humidification]
+
+        steps = max(int(round(duration / self.dt)), 1)
+        dt = self.dt
+        half = dt / 2
+
+        temperature = self.temperature
+        vapor = self.vapor
+
+        for _ in range(steps):
+            k1t, k1v = self._derivatives(temperature, vapor, heat, water)
+            k2t, k2v = self._derivatives([t + half * k for t, k in zip(temperature, k1t)],
+                                         [v + half * k for v, k in zip(vapor, k1v)], heat, water)
+            k3t, k3v = self._derivatives([t + half * k for t, k in zip(temperature, k2t)],
+                                         [v + half * k for v, k in zip(vapor, k2v)], heat, water)
+            k4t, k4v = self._derivatives([t + dt * k for t, k in zip(temperature, k3t)],
+                                         [v + dt * k for v, k in zip(vapor, k3v)], heat, water)
+
+            temperature = [t + dt / 6 * (a + 2 * b + 2 * c + d)
+                           for t, a, b, c, d in zip(temperature, k1t, k2t, k3t, k4t)]
+            vapor = [max(v + dt / 6 * (a + 2 * b + 2 * c + d), 0.0)
+                     for v, a, b, c, d in zip(vapor, k1v, k2v, k3v, k4v)]
+
+        self.temperature = temperature
+        self.vapor = vapor
+
+    def get_humidity(self):
+        ''' Return vector of relative humidities in %, capped at 100 when the air is saturated
+        '''
+        return [min(v / saturation_vapor_density(t) * 100, 100.0) for t, v in zip(self.temperature, self.vapor)]
+
+    def get_light(self):
+        ''' Return vector of light levels, lamp light and daylight together
+        '''
+        return [l + d for l, d in zip(self.lamps, self.daylight)]
+
+    def get_zone(self, zone: int):
+        ''' Return dictionary with temperature, humidity and light of a zone
+
+        zone -- index of the zone
+        '''
+        temperature = self.temperature[zone]
+        humidity = min(self.vapor[zone] / saturation_vapor_density(temperature) * 100, 100.0)
+        return {"temperature": temperature, "humidity": humidity, "light": self.lamps[zone] + self.daylight[zone]}
+
+    def sync_environment(self, environment, zone: int = 0):
+        ''' Write state of a zone to an environment, so existing sensors read values of the model
+
+        Values are rounded like the simulator's readings and kept within the environment boundaries.
+
+        environment -- instance of Environment class
+        zone -- index of the zone
+        '''
+        state = self.get_zone(zone)
+        environment.set_environment("temperature", min(max(round(state["temperature"], 2), 15.0), 40.0))
+        environment.set_environment("humidity", min(max(int(round(state["humidity"])), 40), 100))
+        environment.set_environment("light", min(max(int(round(state["light"])), 150), 850))
+
+    def _derivatives(self, temperature: list, vapor: list, heat: list, water: list):
+        ''' Return vectors of temperature and vapor density rates of change of all zones
+
+        temperature -- vector of air temperatures
+        vapor -- vector of vapor densities
+        heat -- vector of heat sources in W
+        water -- vector of vapor sources in g/s
+        '''
+        ua, inverse_capacity = self.ua, 1.0 / self.heat_capacity
+        ventilation, inverse_volume = self.ventilation, 1.0 / self.volume
+
+        temperature_rate = [(q - ua * (t - outside)) * inverse_capacity
+                            for q, t, outside in zip(heat, temperature, self.outside_temperature)]
+        vapor_rate = [m * inverse_volume - ventilation * (v - outside)
+                      for m, v, outside in zip(water, vapor, self.outside_vapor)]
+        return temperature_rate, vapor_rate
+
+    def _vector(self, value):
+        ''' Return list with a value per zone from a single value or a list
+
+        value -- single value or list with a value per zone
+        '''
+        if isinstance(value, (int, float)):
+            return [float(value)] * self.zones
+
+        if len(value) != self.zones:
+            raise ValueError("Expected %d values, got %d." % (self.zones, len(value)))
+        return [float(v) for v in value]
@@ -0,0 +1,299 @@
+'''
+Stress harness pushing extreme generated scenarios through the full control path.
+
+Scenarios are generated from a seed, so any failure can be reproduced by running the same seed:
+    - thousands of zones, each with its own environment, sensors, actuators, fault detectors
+      and command queues, and one alert engine for the site
+    - rapid target changes, the ideal conditions of zones are replaced at random between ticks
+    - sensor failures, readings are None at random
+    - values at the bounds, initial values, ideal conditions and actuator steps are drawn at and
+      near the environment boundaries
+
+After every tick of every zone the harness checks the invariants:
+    - every environment value stays within the environment boundaries
+    - every actuator ramp terminates within max_steps changes of the environment
+    - a missing reading is always reported as "fault", a working sensor always gives a reading
+      and warnings are one of the known ones
+
+The tick rate where latency budgets are first missed is found by timing the ticks for real and
+pacing them on a virtual clock, so no time is spent waiting. Run with:
+    python stress.py [zones] [seed]
+'''
+
+import random
+import sys
+import time
+from controller import Environment, control_tick, initialize_actuators, initialize_sensors
+from faults import initialize_fault_detectors
+from command_queue import initialize_command_queues
+from alerts import AlertEngine
+
+# environment boundaries of each variable and prefix of its ideal condition keys
+bounds = {
+    "temperature": (15.0, 40.0, "temp"),
+    "humidity": (40, 100, "humidity"),
+    "light": (150, 850, "light")
+}
+
+warnings_known = ("high", "low", "good", "fault")
+
+class RampError(RuntimeError):
+    ''' Raised when an actuator ramp does not terminate within the allowed number of steps
+    '''
+
+class _GuardedEnvironment(Environment):
+    ''' Environment counting changes of its variables, a ramp longer than max_steps raises RampError
+
+    Attributes:
+    max_steps -- maximum number of changes during a single tick
+    steps -- number of changes since the last reset
+    '''
+    def __init__(self, temp: float, humidity: int, light: int, max_steps: int):
+        super().__init__(temp, humidity, light)
+        self.max_steps = max_steps
+        self.steps = 0
+
+    def set_environment(self, variable: str, value):
+        self.steps += 1
+        if self.steps > self.max_steps:
+            raise RampError("Ramp of %s did not terminate within %d steps." % (variable, self.max_steps))
+        super().set_environment(variable, value)
+
+class _FlakySensor:
+    ''' Sensor wrapper whose simulator readings fail at random
+
+    Attributes:
+    sensor -- wrapped sensor
+    env -- environment of the sensor
+    confidence -- weight of the sensor readings when fused with redundant sensors
+    failed -- True when the last reading failed
+    '''
+    def __init__(self, sensor, rng: random.Random, failure_rate: float):
+        self.sensor = sensor
+        self.env = sensor.env
+        self.confidence = sensor.confidence
+        self.failed = False
+        self._rng = rng
+        self._failure_rate = failure_rate
+
+    def get_simulator_data(self):
+        self.failed = self._rng.random() < self._failure_rate
+        return None if self.failed else self.sensor.get_simulator_data()
+
+class StressHarness:
+    ''' Generated site of zones driven through the control path, checking invariants after every tick
+
+    Attributes:
+    zones -- number of zones
+    seed -- seed of the scenario
+    violations -- list of messages of broken invariants
+    ticks -- number of site ticks run
+    '''
+    def __init__(self, zones: int = 1000, seed: int = 0, failure_rate: float = 0.05, change_rate: float = 0.1,
+                 bound_rate: float = 0.3, max_steps: int = 100000, max_rate: float = 1000.0):
+        ''' Generate the scenario
+
+        zones -- number of zones
+        seed -- seed of the scenario and of the simulator and actuator noise
+        failure_rate -- probability a sensor reading is missing
+        change_rate -- probability the ideal conditions of a zone change before a tick
+        bound_rate -- probability a generated value is at an environment boundary
+        max_steps -- maximum number of environment changes of a zone in a tick
+        max_rate -- maximum number of executed commands per second of each actuator queue
+        '''
+        if type(zones) != int:
+            raise TypeError("Number of zones must be passed in as an integer.")
+
+        if zones < 1:
+            raise ValueError("Number of zones must be at least 1.")
+
+        random.seed(seed)
+        self.zones = zones
+        self.seed = seed
+        self.violations = []
+        self.ticks = 0
+
+        self._rng = random.Random(seed)
+        self._change_rate = change_rate
+        self._bound_rate = bound_rate
+        self._alerts = AlertEngine()
+        self._sites = []
+
+        for _ in range(zones):
+            env = _GuardedEnvironment(self._value("temperature"), self._value("humidity"), self._value("light"),
+                                      max_steps)
+            env.ideal_condition = self._conditions()
+            sensors = {variable: _FlakySensor(sensor, self._rng, failure_rate)
+                       for variable, sensor in initialize_sensors(env).items()}
+            actuators = initialize_actuators(env)
+
+            # actuator steps from tiny to larger than the whole range
+            actuators["heater"].change = self._rng.choice((0.01, 0.3, 5.0, 50.0))
+            actuators["humidifier"].change = self._rng.choice((0.05, 2, 20, 100))
+            actuators["lights"].change = self._rng.choice((0.5, 10, 100, 1000))
+
+            self._sites.append((env, sensors, actuators, initialize_fault_detectors(),
+                                initialize_command_queues(actuators, max_rate)))
+
+    def tick(self):
+        ''' Run a tick of every zone, check the invariants and return latency of the site tick in seconds
+        '''
+        # targets change between ticks, outside the timed control path
+        for env, *_ in self._sites:
+            if self._rng.random() < self._change_rate:
+                env.ideal_condition = self._conditions()
+
+        results = []
+        start = time.perf_counter()
+        for env, sensors, actuators, faults, queues in self._sites:
+            env.steps = 0
+            try:
+                results.append(control_tick(env, sensors, actuators, faults=faults, queues=queues))
+            except RampError as e:
+                results.append(e)
+        self._alerts.update_zones([{} if isinstance(result, RampError) else result[1] for result in results])
+        latency = time.perf_counter() - start
+
+        # invariants are checked outside the timed control path
+        for zone, ((env, sensors, *_), result) in enumerate(zip(self._sites, results)):
+            if isinstance(result, RampError):
+                self.violations.append("tick %d zone %d: %s" % (self.ticks, zone, result))
+            else:
+                self._check(zone, env, sensors, *result)
+
+        self.ticks += 1
+        return latency
+
+    def run(self, ticks: int):
+        ''' Run ticks and return list of their latencies in seconds
+
+        ticks -- number of site ticks
+        '''
+        return [self.tick() for _ in range(ticks)]
+
+    def _check(self, zone: int, env, sensors: dict, readings: dict, warnings: dict):
+        ''' Record violations of the invariants of a zone after its tick
+
+        zone -- index of the zone
+        env -- environment of the zone
+        sensors -- dictionary of sensors of the zone
+        readings -- readings of the tick
+        warnings -- warnings of the tick
+        '''
+        for variable, (low, high, _) in bounds.items():
+            value = env.get_environment_variable(variable)
+            if not low <= value <= high:
+                self.violations.append("tick %d zone %d: %s %s out of bounds" % (self.ticks, zone, variable, value))
+
+            warning = warnings[variable]
+            if warning not in warnings_known:
+                self.violations.append("tick %d zone %d: unknown %s warning %s" % (self.ticks, zone, variable, warning))
+            if sensors[variable].failed and (readings[variable] is not None or warning != "fault"):
+                self.violations.append("tick %d zone %d: missing %s reading reported as %s" % (
+                    self.ticks, zone, variable, warning))
+            if not sensors[variable].failed and readings[variable] is None:
+                self.violations.append("tick %d zone %d: working %s sensor gave no reading" % (
+                    self.ticks, zone, variable))
+
+    def _value(self, variable: str):
+        ''' Return random value of a variable, at a boundary with probability bound_rate
+
+        variable -- environment variable
+        '''
+        low, high, _ = bounds[variable]
+        if self._rng.random() < self._bound_rate:
+            return self._rng.choice((low, high))
+        if type(low) == int:
+            return self._rng.randint(low, high)
+        return round(self._rng.uniform(low, high), 2)
+
+    def _conditions(self):
+        ''' Return random valid ideal conditions, often with bounds at the boundaries or equal to each other
+        '''
+        conditions = {}
+        for variable, (_, _, prefix) in bounds.items():
+            lower, upper = sorted((self._value(variable), self._value(variable)))
+            conditions[prefix + "_lower"] = lower
+            conditions[prefix + "_upper"] = upper
+        return conditions
+
+def deadline_misses(latencies: list, rate: float):
+    ''' Return fraction of ticks finishing after their deadline when started at a fixed tick rate
+
+    A tick is due every 1 / rate seconds and starts when it is due or when the previous tick
+    finished, whichever is later, so an overrun delays the following ticks.
+
+    latencies -- list of tick latencies in seconds
+    rate -- number of ticks per second
+    '''
+    period = 1.0 / rate
+    finish = 0.0
+    missed = 0
+    for tick, latency in enumerate(latencies):
+        due = tick * period
+        finish = max(due, finish) + latency
+        if finish > due + period:
+            missed += 1
+    return missed / len(latencies)
+
+def find_saturation(harness: StressHarness, ticks: int = 20, start_rate: float = 0.1, max_rate: float = 10000.0,
+                    tolerance: float = 0.01, steps: int = 6):
+    ''' Find the lowest tick rate where the latency budget of more than tolerance of the ticks is missed
+
+    The rate doubles until budgets are missed, then the rate is bisected between the last rate
+    meeting its budgets and the first one missing them. Every rate is measured with its own ticks.
+    Return tuple of saturation rate, None if not reached up to max_rate, and dictionary of the
+    fraction of missed deadlines at every measured rate.
+
+    harness -- stress harness running the ticks
+    ticks -- number of ticks measured at every rate
+    start_rate -- first tick rate measured in ticks per second
+    max_rate -- highest tick rate measured in ticks per second
+    tolerance -- fraction of ticks allowed to miss their deadline
+    steps -- number of bisection steps
+    '''
+    misses = {}
+
+    def saturated(rate):
+        misses[rate] = deadline_misses(harness.run(ticks), rate)
+        return misses[rate] > tolerance
+
+    passing = None
+    rate = start_rate
+    while not saturated(rate):
+        passing = rate
+        rate *= 2
+        if rate > max_rate:
+            return None, misses
+
+    failing = rate
+    if passing is not None:
+        for _ in range(steps):
+            middle = (passing + failing) / 2
+            if saturated(middle):
+                failing = middle
+            else:
+                passing = middle
+
+    return failing, misses
+
+if __name__ == "__main__":
+    zones = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+
+    harness = StressHarness(zones, seed)
+    rate, misses = find_saturation(harness)
+    latencies = sorted(harness.run(50))
+
+    print("stress: %d zones, seed %d, %d ticks" % (zones, seed, harness.ticks))
+    print("  tick latency median %.2fms, p99 %.2fms" % (latencies[len(latencies) // 2] * 1e3,
+                                                        latencies[int(len(latencies) * 0.99)] * 1e3))
+    if rate is None:
+        print("  latency budgets met up to %.0f ticks/s" % max(misses))
+    else:
+        print("  latency budgets first missed at %.2f ticks/s (%.1f%% of deadlines)" % (rate, misses[rate] * 100))
+
+    print("  %d invariant violations" % len(harness.violations))
+    for violation in harness.violations[:20]:
+        print("    " + violation)
+    sys.exit(1 if harness.violations else 0)
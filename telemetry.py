@@ -0,0 +1,244 @@
+'''
+Telemetry server streaming live readings and warnings of the greenhouse environment to local clients.
+
+The server runs an asyncio event loop in its own thread, so the control loop only hands over
+each tick's data and never waits for a client. Every frame is a single line of JSON:
+    {"seq": 1, "time": 1700000000.0, "readings": {...}, "warnings": {...}}
+
+Each client has its own bounded queue. When a client reads slower than frames are published,
+the oldest queued frames are dropped, and queued frames are sent to the client in batches.
+'''
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+class _Client:
+    ''' Connected telemetry subscriber
+
+    Attributes:
+    writer -- asyncio stream writer of the client connection
+    queue -- bounded queue of encoded frames waiting to be sent
+    ready -- event set when there are frames waiting in the queue
+    dropped -- number of frames dropped because the client was too slow
+    '''
+    def __init__(self, writer, queue_size: int):
+        ''' Initialize the client
+
+        writer -- asyncio stream writer of the client connection
+        queue_size -- maximum number of frames waiting for the client
+        '''
+        self.writer = writer
+        self.queue = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, frame: bytes):
+        ''' Queue an encoded frame, dropping the oldest one if the queue is full
+
+        frame -- encoded frame
+        '''
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(frame)
+        self.ready.set()
+
+class TelemetryServer:
+    ''' TCP server publishing each control loop tick to any number of subscribers
+
+    Attributes:
+    host -- address the server listens on
+    port -- port the server listens on (actual port once started when 0 was given)
+    queue_size -- maximum number of frames queued for a single client
+    batch_size -- maximum number of frames sent to a client in one write
+    published -- number of frames published
+    dropped -- number of frames dropped for slow clients that already disconnected
+    '''
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, queue_size: int = 100, batch_size: int = 32):
+        ''' Initialize the server, the server is not listening until start() is called
+
+        host -- address to listen on
+        port -- port to listen on, 0 picks a free port
+        queue_size -- maximum number of frames queued for a single client
+        batch_size -- maximum number of frames sent to a client in one write
+        '''
+        if type(queue_size) != int or type(batch_size) != int:
+            raise TypeError("Queue size and batch size must be passed in as integers.")
+
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("Queue size and batch size must be at least 1.")
+
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.published = 0
+        self.dropped = 0
+
+        self._clients = set()
+        self._handlers = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._error = None
+
+    def start(self):
+        ''' Start the server in a background thread and wait until it is listening
+        '''
+        if self._thread is not None:
+            raise RuntimeError("Telemetry server is already running.")
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self._thread.start()
+        self._started.wait()
+
+        # the server could not listen, e.g. the port is already in use
+        if self._error is not None:
+            error = self._error
+            self._thread.join()
+            self._loop.close()
+            self._thread = None
+            self._loop = None
+            self._error = None
+            self._started.clear()
+            raise error
+
+    def stop(self):
+        ''' Disconnect all clients, stop the server and wait for its thread to finish
+        '''
+        if self._thread is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+        self._thread = None
+        self._loop = None
+        self._started.clear()
+
+    def publish(self, readings: dict, warnings: dict):
+        ''' Publish readings and warnings of one tick to all subscribers without blocking
+
+        readings -- dictionary of current environment values
+        warnings -- dictionary of current warning per environment variable
+        '''
+        if self._loop is None:
+            return
+
+        self.published += 1
+        frame = {"seq": self.published, "time": time.time(), "readings": readings, "warnings": warnings}
+
+        # encode once, the same bytes are shared by every client
+        payload = (json.dumps(frame) + "\n").encode()
+        self._loop.call_soon_threadsafe(self._broadcast, payload)
+
+    def get_metrics(self):
+        ''' Return dictionary with number of clients, published frames and dropped frames
+        '''
+        # clients are added and removed by the loop thread, so they are counted there
+        if self._loop is not None:
+            return asyncio.run_coroutine_threadsafe(self._collect_metrics(), self._loop).result()
+
+        return {"clients": 0, "published": self.published, "dropped": self.dropped}
+
+    async def _collect_metrics(self):
+        ''' Return dictionary of metrics, run on the loop thread
+        '''
+        return {
+            "clients": len(self._clients),
+            "published": self.published,
+            "dropped": self.dropped + sum(client.dropped for client in self._clients)
+        }
+
+    def _run(self):
+        ''' Run the event loop of the server thread
+        '''
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle_client, self.host, self.port))
+        except Exception as e:
+            # start() waits for the server, hand the error over instead of dying silently
+            self._error = e
+            self._started.set()
+            return
+
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+
+    def _broadcast(self, payload: bytes):
+        ''' Queue encoded frame for every connected client
+
+        payload -- encoded frame
+        '''
+        for client in self._clients:
+            client.push(payload)
+
+    async def _handle_client(self, reader, writer):
+        ''' Serve a single subscriber until it disconnects
+
+        reader -- asyncio stream reader of the client connection
+        writer -- asyncio stream writer of the client connection
+        '''
+        client = _Client(writer, self.queue_size)
+        self._clients.add(client)
+        self._handlers.add(asyncio.current_task())
+
+        sender = asyncio.ensure_future(self._send_frames(client))
+        receiver = asyncio.ensure_future(self._discard_input(reader))
+
+        # clients only listen, so the connection ends when reading finishes or sending fails
+        await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+        sender.cancel()
+        receiver.cancel()
+
+        self._clients.discard(client)
+        self._handlers.discard(asyncio.current_task())
+        self.dropped += client.dropped
+        writer.close()
+
+    async def _discard_input(self, reader):
+        ''' Read and discard anything the client sends in small chunks until it disconnects
+
+        reader -- asyncio stream reader of the client connection
+        '''
+        while await reader.read(4096):
+            pass
+
+    async def _send_frames(self, client: _Client):
+        ''' Send queued frames to the client in batches
+
+        client -- client to send frames to
+        '''
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+
+                while client.queue:
+                    batch = []
+                    while client.queue and len(batch) < self.batch_size:
+                        batch.append(client.queue.popleft())
+
+                    client.writer.write(b"".join(batch))
+                    await client.writer.drain()
+        except (ConnectionError, OSError):
+            return
+
+    async def _shutdown(self):
+        ''' Stop accepting connections and disconnect all clients
+        '''
+        self._server.close()
+        for client in list(self._clients):
+            client.writer.close()
+
+        # let client handlers finish before the loop stops
+        if self._handlers:
+            await asyncio.wait(list(self._handlers), timeout=1.0)
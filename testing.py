@@ -1,9 +1,36 @@
 '''Test Suite'''
 import unittest
+import asyncio
 from unittest import mock
-from controller import Environment, initialize_actuators, initialize_sensors, manage_environment
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from controller import Environment, initialize_actuators, initialize_sensors, manage_environment, control_tick
+from controller import control_site
 from actuators import Heater, Humidifier, Lights
-from gui import initialize_gui, display_warning
+from gui import initialize_gui, display_warning, GuiUpdateQueue, render_latest, TrendHistory, lttb
+from telemetry import TelemetryServer
+from history import HistoryStore
+from faults import FaultDetector, FAULT_NONE, FAULT_MISSING, FAULT_RANGE, FAULT_RATE, FAULT_STUCK
+from faults import initialize_fault_detectors
+from fusion import fuse
+from command_queue import CommandQueue, initialize_command_queues
+from simulator import GreenhouseModel
+from schedules import Schedule, current_conditions, default_schedule, photoperiod_schedule
+from replay import TraceReplay, read_trace, write_trace
+from devices import DeviceBackend, DeviceEnvironment, DeviceError, FakeDeviceServer
+from sensors import TemperatureSensor
+from accounting import EffortAccounts
+from config import ConfigWatcher, apply_config
+from alerts import AlertEngine, GuiSink, LogSink, SocketSink
+from power import PowerAllocator
+from plant import ModelPlant
+from montecarlo import MonteCarloStudy, run_simulation, summarize
+from stress import StressHarness, deadline_misses, find_saturation
+import simulator
 
 class TestGettingEnvironment(unittest.TestCase):
     '''
@@ -393,5 +420,1658 @@ class TestManageEnvironment(unittest.TestCase):
         self.assertTrue(self.env.get_environment_variable("light") >= 600
                         and self.env.get_environment_variable("light") <= 700)
 
+class TestControlTick(unittest.TestCase):
+    '''
+    Class containing tests for the control_tick function of controller
+    '''
+    def setUp(self) -> None:
+        self.env = Environment(25.0, 70, 650)
+        self.sensors = initialize_sensors(self.env)
+        self.actuators = initialize_actuators(self.env)
+
+    def test_control_tick_good_conditions(self):
+        '''
+        Test if all warnings are good and readings are returned when the environment is in ideal state
+        '''
+        with mock.patch('random.uniform', return_value=0.0), mock.patch('random.randint', return_value=0):
+            readings, warnings = control_tick(self.env, self.sensors, self.actuators)
+
+        self.assertEqual(readings, {"temperature": 25.0, "humidity": 70, "light": 650})
+        self.assertEqual(warnings, {"temperature": "good", "humidity": "good", "light": "good"})
+
+    def test_control_tick_high_and_low_conditions(self):
+        '''
+        Test if warnings are set and actuators bring the environment back to the ideal state
+        '''
+        self.env.set_environment("temperature", 30.0)
+        self.env.set_environment("humidity", 50)
+        self.env.set_environment("light", 800)
+
+        readings, warnings = control_tick(self.env, self.sensors, self.actuators)
+
+        self.assertEqual(warnings, {"temperature": "high", "humidity": "low", "light": "high"})
+        self.assertEqual(self.env.get_environment_variable("temperature"), 27.0)
+        self.assertEqual(self.env.get_environment_variable("humidity"), 65)
+        self.assertEqual(self.env.get_environment_variable("light"), 700)
+
+    def test_control_tick_missing_reading(self):
+        '''
+        Test if a missing reading is reported as fault and its actuator is not activated
+        '''
+        self.env.set_environment("temperature", 30.0)
+
+        with mock.patch.object(self.sensors["temperature"], "get_simulator_data", return_value=None):
+            readings, warnings = control_tick(self.env, self.sensors, self.actuators)
+
+        self.assertIsNone(readings["temperature"])
+        self.assertEqual(warnings["temperature"], "fault")
+        self.assertEqual(self.env.get_environment_variable("temperature"), 30.0)
+
+class TestTelemetryServer(unittest.TestCase):
+    '''
+    Class containing tests for the TelemetryServer of telemetry
+    '''
+    def setUp(self) -> None:
+        self.server = TelemetryServer(port=0, queue_size=5, batch_size=2)
+        self.server.start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def connect(self):
+        client = socket.create_connection((self.server.host, self.server.port))
+        client.settimeout(5)
+
+        # wait until the server registers the client
+        while self.server.get_metrics()["clients"] == 0:
+            time.sleep(0.01)
+        return client
+
+    def test_telemetry_invalid_queue_size(self):
+        '''
+        Test if exception is raised when invalid queue size is passed in
+        '''
+        with self.assertRaises(ValueError):
+            TelemetryServer(queue_size=0)
+
+    def test_telemetry_port_in_use(self):
+        '''
+        Test if start raises instead of hanging when the port is already in use
+        '''
+        server = TelemetryServer(port=self.server.port)
+        with self.assertRaises(OSError):
+            server.start()
+
+        # a failed start leaves the server ready to start again
+        server.port = 0
+        server.start()
+        server.stop()
+
+    def test_telemetry_frames_received(self):
+        '''
+        Test if subscriber receives published readings and warnings as JSON lines
+        '''
+        client = self.connect()
+        self.server.publish({"temperature": 25.0}, {"temperature": "good"})
+        self.server.publish({"temperature": 28.0}, {"temperature": "high"})
+
+        stream = client.makefile("rb")
+        first = json.loads(stream.readline())
+        second = json.loads(stream.readline())
+        client.close()
+
+        self.assertEqual(first["readings"], {"temperature": 25.0})
+        self.assertEqual(second["warnings"], {"temperature": "high"})
+        self.assertEqual(second["seq"], first["seq"] + 1)
+
+    def test_telemetry_client_input_discarded(self):
+        '''
+        Test if data sent by a client is read in small chunks and discarded while it keeps receiving frames
+        '''
+        sizes = []
+        read = asyncio.StreamReader.read
+        async def read_chunk(reader, n=-1):
+            sizes.append(n)
+            return await read(reader, n)
+
+        with mock.patch.object(asyncio.StreamReader, "read", read_chunk):
+            client = self.connect()
+            client.sendall(b"x" * 1000000)
+            self.server.publish({"temperature": 25.0}, {"temperature": "good"})
+            frame = json.loads(client.makefile("rb").readline())
+            client.close()
+
+        self.assertEqual(frame["readings"], {"temperature": 25.0})
+        self.assertTrue(sizes)
+        self.assertEqual(set(sizes), {4096})
+
+    def test_telemetry_slow_client_drops_oldest(self):
+        '''
+        Test if frames for a client that does not keep up are dropped and publishing never blocks
+        '''
+        client = self.connect()
+        client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        readings = {"temperature": 25.0, "padding": "x" * 10000}
+
+        start = time.perf_counter()
+        for i in range(2000):
+            self.server.publish(readings, {})
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+        # wait until the server loop handles all published frames
+        deadline = time.time() + 5
+        while self.server.get_metrics()["dropped"] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        client.close()
+
+        self.assertGreater(self.server.get_metrics()["dropped"], 0)
+
+class TestHistoryStore(unittest.TestCase):
+    '''
+    Class containing tests for the HistoryStore of history
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.history = HistoryStore(os.path.join(self.directory.name, "history.db"), batch_size=10)
+        self.history.start()
+
+    def tearDown(self) -> None:
+        self.history.stop()
+        self.directory.cleanup()
+
+    def test_history_query_range(self):
+        '''
+        Test if readings recorded for a zone are returned in order for the requested time range only
+        '''
+        for t in range(25):
+            self.history.record_readings({"temperature": 20.0 + t, "humidity": 70, "light": 650}, 1, float(t))
+            self.history.record_readings({"temperature": 0.0, "humidity": 0, "light": 0}, 2, float(t))
+        self.history.flush()
+
+        rows = self.history.query_range(1, 5.0, 8.0)
+        self.assertEqual(rows, [(5.0, 25.0, 70, 650), (6.0, 26.0, 70, 650), (7.0, 27.0, 70, 650)])
+        self.assertEqual(self.history.written, 50)
+
+    def test_history_failed_batch(self):
+        '''
+        Test if a batch that fails to be written is dropped and the writer keeps running
+        '''
+        self.history.record_readings({"temperature": {"invalid": 1}, "humidity": 70, "light": 650}, 0, 1.0)
+        self.history.flush()
+        self.history.record_readings({"temperature": 25.0, "humidity": 70, "light": 650}, 0, 2.0)
+        self.history.flush()
+
+        self.assertEqual((self.history.dropped, self.history.written), (1, 1))
+        self.assertEqual(self.history.query_range(0, 0.0, 5.0), [(2.0, 25.0, 70, 650)])
+
+    def test_history_query_downsampled(self):
+        '''
+        Test if readings are averaged into buckets of the requested length
+        '''
+        for t in range(0, 20, 2):
+            self.history.record_readings({"temperature": float(t), "humidity": 70, "light": 650}, 0, float(t))
+        self.history.flush()
+
+        rows = self.history.query_downsampled(0, 0.0, 20.0, 10.0)
+        self.assertEqual(rows, [(0.0, 4.0, 70.0, 650.0, 5), (10.0, 14.0, 70.0, 650.0, 5)])
+
+    def test_history_records_actions_from_control_tick(self):
+        '''
+        Test if actuator actions of the control logic are recorded
+        '''
+        env = Environment(30.0, 70, 650)
+        with mock.patch('random.randint', return_value=0):
+            control_tick(env, initialize_sensors(env), initialize_actuators(env), self.history)
+        self.history.flush()
+
+        actions = self.history.query_actions(0, 0.0, time.time() + 1)
+        self.assertEqual([(actuator, target) for _, actuator, target in actions], [("heater", 27.0)])
+
+    def test_history_invalid_bucket(self):
+        '''
+        Test if exception is raised when invalid bucket length is passed in
+        '''
+        with self.assertRaises(ValueError):
+            self.history.query_downsampled(0, 0.0, 10.0, 0)
+
+class TestFaultDetector(unittest.TestCase):
+    '''
+    Class containing tests for the FaultDetector of faults
+    '''
+    def setUp(self) -> None:
+        self.detector = FaultDetector("temperature", 3, stuck=3)
+
+    def test_fault_detector_valid_readings(self):
+        '''
+        Test if no faults are flagged for changing readings within limits
+        '''
+        self.assertEqual(self.detector.update([25.0, 22.0, 30.0]), [FAULT_NONE] * 3)
+        self.assertEqual(self.detector.update([25.2, 21.9, 30.1]), [FAULT_NONE] * 3)
+
+    def test_fault_detector_missing_and_range(self):
+        '''
+        Test if missing and physically impossible readings are flagged
+        '''
+        self.assertEqual(self.detector.update([None, 85.0, -40.0]), [FAULT_MISSING, FAULT_RANGE, FAULT_RANGE])
+
+    def test_fault_detector_rate(self):
+        '''
+        Test if a jump larger than the rate limit is flagged
+        '''
+        self.detector.update([25.0, 25.0, 25.0])
+        self.assertEqual(self.detector.update([25.3, 35.0, 25.1]), [FAULT_NONE, FAULT_RATE, FAULT_NONE])
+
+    def test_fault_detector_expected_actuation(self):
+        '''
+        Test if the reading after an actuation is not checked for its rate, and later readings are again
+        '''
+        self.detector.update([15.0, 15.0, 15.0])
+        self.detector.expect()
+        self.assertEqual(self.detector.update([21.0, 21.0, 21.0]), [FAULT_NONE] * 3)
+        self.assertEqual(self.detector.update([28.0, 21.1, 21.0]), [FAULT_RATE, FAULT_NONE, FAULT_NONE])
+
+    def test_fault_detector_after_correction(self):
+        '''
+        Test if the first reading after a valid correction by an actuator is not flagged as fault
+        '''
+        for env in (Environment(25.0, 70, 850), Environment(15.0, 70, 650)):
+            for queues in (None, initialize_command_queues(initialize_actuators(env), 1000.0)):
+                actuators = initialize_actuators(env) if queues is None else {name: queue.actuator
+                                                                                for name, queue in queues.items()}
+                faults = initialize_fault_detectors()
+                control_tick(env, initialize_sensors(env), actuators, faults=faults, queues=queues,
+                             source="environment")
+                _, warnings = control_tick(env, initialize_sensors(env), actuators, faults=faults, queues=queues,
+                                           source="environment")
+
+                self.assertNotIn("fault", warnings.values())
+
+    def test_fault_detector_stable_zone(self):
+        '''
+        Test if a stable zone read from the environment is not flagged as stuck within an hour of ticks
+        '''
+        env = Environment(25.0, 70, 650)
+        sensors = initialize_sensors(env)
+        actuators = initialize_actuators(env)
+        faults = initialize_fault_detectors()
+
+        warnings = [control_tick(env, sensors, actuators, faults=faults, source="environment")[1]
+                    for _ in range(1799)]
+        self.assertEqual(warnings[-1], {"temperature": "good", "humidity": "good", "light": "good"})
+        self.assertNotIn("fault", [warning for tick in warnings for warning in tick.values()])
+
+        # the same reading for a whole hour is a stuck sensor
+        self.assertEqual(control_tick(env, sensors, actuators, faults=faults, source="environment")[1]["humidity"],
+                         "fault")
+
+    def test_fault_detector_stuck(self):
+        '''
+        Test if a sensor returning the same reading too many times in a row is flagged until it changes
+        '''
+        for _ in range(2):
+            self.assertEqual(self.detector.update([25.0, 25.0, 25.0])[0], FAULT_NONE)
+        self.assertEqual(self.detector.update([25.0, 25.0, 25.1])[0], FAULT_STUCK)
+        self.assertEqual(self.detector.update([25.2, 25.0, 25.2])[0], FAULT_NONE)
+
+    def test_fault_detector_invalid_input(self):
+        '''
+        Test if exception is raised when invalid variable or wrong number of readings is passed in
+        '''
+        with self.assertRaises(ValueError):
+            FaultDetector("moisture")
+        with self.assertRaises(ValueError):
+            self.detector.update([25.0])
+
+class TestFusion(unittest.TestCase):
+    '''
+    Class containing tests for the fuse function of fusion
+    '''
+    def setUp(self) -> None:
+        self.readings = [[24.0, 25.0, 40.0], [20.0, None, 22.0], [None, None, None]]
+
+    def test_fusion_median(self):
+        '''
+        Test if median of valid readings is returned for every zone
+        '''
+        self.assertEqual(fuse(self.readings, "median"), [25.0, 21.0, None])
+
+    def test_fusion_trimmed_mean(self):
+        '''
+        Test if the outlying readings are cut off before the mean is computed
+        '''
+        fused = fuse([[10.0, 24.0, 25.0, 26.0, 90.0]], "trimmed", trim=0.2)
+        self.assertAlmostEqual(fused[0], 25.0)
+
+    def test_fusion_weighted(self):
+        '''
+        Test if readings are weighted by sensor confidence
+        '''
+        confidence = [[1.0, 1.0, 0.0], [1.0, 1.0, 3.0], [1.0, 1.0, 1.0]]
+        self.assertEqual(fuse(self.readings, "weighted", confidence), [24.5, 21.5, None])
+
+    def test_fusion_invalid_input(self):
+        '''
+        Test if exception is raised when invalid method is passed in or confidence is missing
+        '''
+        with self.assertRaises(ValueError):
+            fuse(self.readings, "mode")
+        with self.assertRaises(ValueError):
+            fuse(self.readings, "weighted")
+
+    def test_fusion_redundant_sensors_control_tick(self):
+        '''
+        Test if a faulty redundant sensor is ignored by the control logic
+        '''
+        env = Environment(25.0, 70, 650)
+        sensors = initialize_sensors(env, 3)
+        actuators = initialize_actuators(env)
+        sensors["temperature"][1].get_measured_data = lambda value: 80.0
+
+        readings, warnings = control_tick(env, sensors, actuators, faults=initialize_fault_detectors(3))
+
+        self.assertLess(readings["temperature"], 27.0)
+        self.assertEqual(warnings["temperature"], "good")
+
+    def test_fusion_redundant_sensors_measure_same_value(self):
+        '''
+        Test if the environment moves once per tick with redundant sensors and every sensor measures that value
+        '''
+        env = Environment(25.0, 70, 650)
+        sensors = initialize_sensors(env, 5, noise={"temperature": 0.1})
+        actuators = initialize_actuators(env)
+
+        with mock.patch('simulator.get_simulator_data', wraps=simulator.get_simulator_data) as advance, \
+             mock.patch.object(sensors["temperature"][0], "get_measured_data",
+                               wraps=sensors["temperature"][0].get_measured_data) as measured:
+            readings, _ = control_tick(env, sensors, actuators)
+
+        self.assertEqual(advance.call_count, 3)
+        shared = measured.call_args[0][0]
+        self.assertEqual(readings["humidity"], env.get_environment_variable("humidity"))
+        self.assertLessEqual(abs(readings["temperature"] - shared), 0.1)
+
+    def test_fusion_site_batched(self):
+        '''
+        Test if a site tick fault-checks and fuses each variable of all zones in one call and only expects actuated zones
+        '''
+        environments = [Environment(25.0, 70, 650), Environment(35.0, 70, 650), Environment(22.0, 70, 650)]
+        sensors = [initialize_sensors(env, 3) for env in environments]
+        actuators = [initialize_actuators(env) for env in environments]
+        faults = initialize_fault_detectors(9)
+        sensors[2]["temperature"][1].get_measured_data = lambda value: 500.0
+
+        with mock.patch('controller.fuse', wraps=fuse) as fused:
+            results = control_site(environments, sensors, actuators, faults=faults, source="environment")
+
+        self.assertEqual(fused.call_count, 3)
+        self.assertEqual([readings["temperature"] for readings, _ in results], [25.0, 35.0, 22.0])
+        self.assertEqual([warnings["temperature"] for _, warnings in results], ["good", "high", "good"])
+        self.assertEqual(environments[1].get_environment_variable("temperature"), 27.0)
+
+        # the ramp of zone 1 is expected, a jump in zone 0 without an actuation is not
+        environments[0].set_environment("temperature", 31.0)
+        results = control_site(environments, sensors, actuators, faults=faults, source="environment")
+        self.assertEqual([warnings["temperature"] for _, warnings in results], ["fault", "good", "good"])
+
+class TestCommandQueue(unittest.TestCase):
+    '''
+    Class containing tests for the CommandQueue of command_queue
+    '''
+    def setUp(self) -> None:
+        self.env = Environment(25.0, 70, 650)
+        self.now = 0.0
+        self.queue = CommandQueue(Heater(self.env), max_rate=0.5, clock=lambda: self.now)
+
+    def test_command_queue_coalesces_to_latest_target(self):
+        '''
+        Test if pending commands are merged and only the latest target is executed
+        '''
+        self.queue.submit(22.0)
+        self.queue.submit(23.0)
+        self.queue.submit(24.0)
+
+        self.assertEqual(self.queue.get_metrics()["depth"], 1)
+        self.assertEqual(self.queue.pump(), 24.0)
+        self.assertEqual(self.env.get_environment_variable("temperature"), 24.0)
+
+        metrics = self.queue.get_metrics()
+        self.assertEqual((metrics["depth"], metrics["coalesced"], metrics["executed"]), (0, 2, 1))
+
+    def test_command_queue_drops_no_op(self):
+        '''
+        Test if a target equal to the current value, also after boundaries are applied, is dropped
+        '''
+        self.assertFalse(self.queue.submit(25.0))
+        self.env.set_environment("temperature", 40.0)
+        self.assertFalse(self.queue.submit(50.0))
+
+        self.assertIsNone(self.queue.pump())
+        self.assertEqual(self.queue.get_metrics()["dropped"], 2)
+
+    def test_command_queue_rate_limit(self):
+        '''
+        Test if commands are not executed more often than the maximum rate allows
+        '''
+        self.queue.submit(24.0)
+        self.assertEqual(self.queue.pump(), 24.0)
+
+        self.now = 1.0
+        self.queue.submit(26.0)
+        self.assertIsNone(self.queue.pump())
+
+        self.now = 2.0
+        self.assertEqual(self.queue.pump(), 26.0)
+        self.assertEqual(self.queue.get_metrics()["rate_limited"], 1)
+
+    def test_command_queue_invalid_actuator(self):
+        '''
+        Test if exception is raised when invalid actuator is passed in
+        '''
+        with self.assertRaises(TypeError):
+            CommandQueue(self.env)
+
+    def test_command_queue_control_tick(self):
+        '''
+        Test if the control logic executes actuator commands through the queues
+        '''
+        self.env.set_environment("temperature", 30.0)
+        actuators = initialize_actuators(self.env)
+        queues = initialize_command_queues(actuators)
+
+        control_tick(self.env, initialize_sensors(self.env), actuators, queues=queues)
+
+        self.assertEqual(self.env.get_environment_variable("temperature"), 27.0)
+        self.assertEqual(queues["heater"].get_metrics()["executed"], 1)
+
+class TestGreenhouseModel(unittest.TestCase):
+    '''
+    Class containing tests for the GreenhouseModel of simulator
+    '''
+    def setUp(self) -> None:
+        self.model = GreenhouseModel(3, 20.0, 70.0, dt=10.0)
+
+    def test_model_heating_lowers_humidity(self):
+        '''
+        Test if heating a zone raises its temperature and lowers its relative humidity
+        '''
+        self.model.step(600, heating=[5000.0, 0.0, 0.0])
+        humidity = self.model.get_humidity()
+
+        self.assertGreater(self.model.temperature[0], self.model.temperature[1])
+        self.assertLess(humidity[0], humidity[1])
+
+    def test_model_lamps_add_heat(self):
+        '''
+        Test if lamps light and heat a zone
+        '''
+        self.model.step(600, lamps=[0.0, 650.0, 0.0])
+
+        self.assertEqual(self.model.get_light()[1], 650.0)
+        self.assertGreater(self.model.temperature[1], self.model.temperature[0])
+
+    def test_model_reaches_outside_equilibrium(self):
+        '''
+        Test if zones without actuators settle at the outside temperature
+        '''
+        self.model.transpiration = 0.0
+        self.model.set_weather(10.0, 80.0)
+        self.model.step(48 * 3600)
+
+        for temperature in self.model.temperature:
+            self.assertAlmostEqual(temperature, 10.0, places=2)
+        for humidity in self.model.get_humidity():
+            self.assertAlmostEqual(humidity, 80.0, places=0)
+
+    def test_model_sync_environment(self):
+        '''
+        Test if the state of a zone is written to the environment within its boundaries
+        '''
+        env = Environment(25.0, 70, 650)
+        self.model.step(60, lamps=1000.0)
+        self.model.sync_environment(env, 2)
+
+        self.assertEqual(env.get_environment_variable("light"), 850)
+        self.assertAlmostEqual(env.get_environment_variable("temperature"), self.model.temperature[2], places=2)
+
+    def test_model_invalid_input(self):
+        '''
+        Test if exception is raised when input vector does not match number of zones
+        '''
+        with self.assertRaises(ValueError):
+            self.model.step(60, heating=[1000.0])
+
+class TestSchedule(unittest.TestCase):
+    '''
+    Class containing tests for the Schedule of schedules
+    '''
+    def setUp(self) -> None:
+        self.day = {"temp_upper": 27.0, "temp_lower": 21.0, "humidity_upper": 85, "humidity_lower": 75,
+                    "light_upper": 700, "light_lower": 600}
+        self.night = {"temp_upper": 25.0, "temp_lower": 19.0, "humidity_upper": 75, "humidity_lower": 65,
+                      "light_upper": 300, "light_lower": 200}
+        self.schedule = photoperiod_schedule("06:00", 14, self.day, self.night, ramp=60)
+
+    def at(self, hours: int, minutes: int):
+        return time.mktime((2026, 6, 1, hours, minutes, 0, 0, 0, -1))
+
+    def test_schedule_day_and_night(self):
+        '''
+        Test if day and night conditions are returned outside of the ramps
+        '''
+        self.assertEqual(self.schedule.lookup(self.at(12, 0)), self.day)
+        self.assertEqual(self.schedule.lookup(self.at(23, 30)), self.night)
+        self.assertEqual(self.schedule.lookup(self.at(3, 0)), self.night)
+
+    def test_schedule_ramp(self):
+        '''
+        Test if conditions change linearly during the ramp into the next phase
+        '''
+        conditions = self.schedule.lookup(self.at(6, 30))
+
+        self.assertEqual(conditions["temp_lower"], 20.0)
+        self.assertEqual(conditions["humidity_lower"], 70)
+        self.assertEqual(conditions["light_upper"], 500)
+
+    def test_schedule_environment_ideal_conditions(self):
+        '''
+        Test if environment with a schedule returns the ideal conditions of the given time
+        '''
+        env = Environment(25.0, 70, 650)
+        env.set_schedule(self.schedule)
+
+        self.assertEqual(env.get_ideal_conditions(self.at(23, 0)), self.night)
+        env.set_schedule(None)
+        self.assertEqual(env.get_ideal_conditions()["humidity_upper"], 80)
+
+    def test_schedule_control_tick_time(self):
+        '''
+        Test if a control tick checks readings against the ideal conditions of the given time
+        '''
+        env = Environment(25.0, 70, 650)
+        env.set_schedule(self.schedule)
+        sensors = initialize_sensors(env)
+        actuators = initialize_actuators(env)
+
+        self.assertEqual(control_tick(env, sensors, actuators, source="environment", now=self.at(12, 0))[1]["light"],
+                         "good")
+        self.assertEqual(control_tick(env, sensors, actuators, source="environment", now=self.at(23, 0))[1]["light"],
+                         "high")
+
+    def test_schedule_current_conditions_of_zones(self):
+        '''
+        Test if conditions of every zone are looked up for the same time
+        '''
+        other = Schedule([("00:00", self.night)])
+        self.assertEqual(current_conditions([self.schedule, other], self.at(12, 0)), [self.day, self.night])
+
+    def test_schedule_invalid_input(self):
+        '''
+        Test if exception is raised when invalid phase start or conditions are passed in
+        '''
+        with self.assertRaises(ValueError):
+            Schedule([("25:00", self.day)])
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", {"temp_upper": 27.0})])
+        with self.assertRaises(ValueError):
+            Schedule([])
+
+    def test_schedule_invalid_condition_types(self):
+        '''
+        Test if exception is raised when integer conditions are not integers or temperatures are not numbers
+        '''
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", dict(self.day, humidity_upper=75.0))])
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", dict(self.day, light_lower="600"))])
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", dict(self.day, temp_upper="27"))])
+
+    def test_schedule_duplicate_start(self):
+        '''
+        Test if exception is raised when two phases start at the same minute, whatever their conditions
+        '''
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", self.day), (360, self.night)])
+        with self.assertRaises(ValueError):
+            Schedule([("06:00", self.day), ("06:00", dict(self.day))])
+
+class TestGuiUpdateQueue(unittest.TestCase):
+    '''
+    Class containing tests for the GuiUpdateQueue and render_latest of gui
+    '''
+    def setUp(self) -> None:
+        self.updates = GuiUpdateQueue(maxsize=2)
+        self.good = {"temperature": "good", "humidity": "good", "light": "good"}
+
+    def test_update_queue_drops_oldest_when_full(self):
+        '''
+        Test if the oldest frame is dropped when the queue is full
+        '''
+        for temperature in (21.0, 22.0, 23.0):
+            self.updates.put({"temperature": temperature}, self.good)
+
+        self.assertEqual(self.updates.get_metrics(), {"depth": 2, "put": 3, "dropped": 1})
+
+    def test_update_queue_latest_frame(self):
+        '''
+        Test if only the latest frame is returned and stale frames are dropped
+        '''
+        self.updates.put({"temperature": 21.0}, self.good)
+        self.updates.put({"temperature": 22.0}, self.good)
+
+        self.assertEqual(self.updates.get_latest()[0], {"temperature": 22.0})
+        self.assertIsNone(self.updates.get_latest())
+        self.assertEqual(self.updates.get_metrics()["dropped"], 1)
+
+    def test_render_latest(self):
+        '''
+        Test if the latest frame is rendered to the GUI labels
+        '''
+        gui = {name: mock.MagicMock() for name in ("temp_label", "humidity_label", "light_label", 
+               "warning_label_temperature", "warning_label_humidity", "warning_label_light", "status_label")}
+        self.updates.put({"temperature": 25.0, "humidity": 70, "light": 650}, 
+                         {"temperature": "high", "humidity": "good", "light": "good"})
+
+        self.assertTrue(render_latest(gui, self.updates))
+        gui["temp_label"].config.assert_called_with(text="Temperature: 25.0 °C")
+        gui["warning_label_temperature"].config.assert_called_with(text="Warning: the temperature is too high\n")
+        self.assertFalse(render_latest(gui, self.updates))
+
+    def test_render_latest_appends_every_tick_to_charts(self):
+        '''
+        Test if readings of stale frames are appended to the charts with the time of their tick
+        '''
+        charts = {"temperature": mock.MagicMock(), "light": mock.MagicMock()}
+        gui = {name: mock.MagicMock() for name in ("temp_label", "humidity_label", "light_label",
+               "warning_label_temperature", "warning_label_humidity", "warning_label_light", "status_label")}
+        gui["charts"] = charts
+        for tick, temperature in enumerate((21.0, 22.0, 23.0)):
+            self.updates.put({"temperature": temperature, "humidity": 70, "light": None}, self.good, 1000.0 + tick)
+
+        self.assertTrue(render_latest(gui, self.updates))
+        self.assertEqual(charts["temperature"].append.call_args_list,
+                         [mock.call(1000.0, 21.0), mock.call(1001.0, 22.0), mock.call(1002.0, 23.0)])
+        charts["light"].append.assert_not_called()
+        charts["temperature"].redraw.assert_called_once()
+        gui["temp_label"].config.assert_called_with(text="Temperature: 23.0 °C")
+        self.assertEqual(self.updates.get_metrics()["dropped"], 2)
+
+        self.assertFalse(render_latest(gui, self.updates))
+        self.assertEqual(charts["temperature"].append.call_count, 3)
+
+    def test_update_queue_samples_bounded(self):
+        '''
+        Test if stamped readings kept for the charts are bounded while the GUI does not take them
+        '''
+        updates = GuiUpdateQueue(history_size=3)
+        for tick in range(5):
+            updates.put({"temperature": 20.0 + tick}, self.good, float(tick))
+
+        self.assertEqual(updates.get_samples(), [(float(tick), {"temperature": 20.0 + tick}) for tick in (2, 3, 4)])
+        self.assertEqual(updates.samples_dropped, 2)
+        self.assertEqual(updates.get_samples(), [])
+
+    def test_manage_environment_worker_thread(self):
+        '''
+        Test if the control loop runs in a worker thread, passes frames to the queue and ends when stopped
+        '''
+        env = Environment(25.0, 70, 650)
+        stop = threading.Event()
+        worker = threading.Thread(target=manage_environment, 
+                                  args=(env, initialize_sensors(env), initialize_actuators(env), None),
+                                  kwargs={"updates": self.updates, "stop": stop, "interval": 0.01})
+        worker.start()
+
+        while self.updates.get_metrics()["put"] < 3:
+            time.sleep(0.01)
+        stop.set()
+        worker.join(5)
+
+        self.assertFalse(worker.is_alive())
+        self.assertEqual(set(self.updates.get_latest()[0]), {"temperature", "humidity", "light"})
+
+class TestTraceReplay(unittest.TestCase):
+    '''
+    Class containing tests for the trace replay of replay
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.records = [
+            {"timestamp": 0.0, "zone": 0, "temperature": 30.0, "humidity": 70.0, "light": 650.0},
+            {"timestamp": 2.0, "zone": 1, "temperature": 22.0, "humidity": 70.0, "light": 650.0},
+            {"timestamp": 4.0, "zone": 0, "temperature": None, "humidity": 50.0, "light": 650.0}
+        ]
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def path(self, name: str):
+        return os.path.join(self.directory.name, name)
+
+    def test_trace_csv_and_binary_round_trip(self):
+        '''
+        Test if records written to CSV and binary traces are read back unchanged, missing readings included
+        '''
+        write_trace(self.path("trace.csv"), self.records)
+        write_trace(self.path("trace.bin"), self.records, binary=True)
+
+        self.assertEqual(list(read_trace(self.path("trace.csv"))), self.records)
+        self.assertEqual(list(read_trace(self.path("trace.bin"))), self.records)
+
+    def test_trace_replay_speed(self):
+        '''
+        Test if records are paced by their timestamps divided by the replay speed
+        '''
+        write_trace(self.path("trace.csv"), self.records)
+        sleeps = []
+        replay = TraceReplay(self.path("trace.csv"), speed=2.0, clock=lambda: 0.0, sleep=sleeps.append)
+
+        while replay.advance():
+            pass
+
+        self.assertEqual(sleeps, [1.0, 2.0])
+        self.assertEqual(replay.replayed, 3)
+
+    def test_trace_replay_zone(self):
+        '''
+        Test if only records of the selected zone are replayed
+        '''
+        write_trace(self.path("trace.bin"), self.records, binary=True)
+        replay = TraceReplay(self.path("trace.bin"), speed=None, zone=1)
+
+        self.assertTrue(replay.advance())
+        self.assertEqual(replay.get_trace_variable("temperature"), 22.0)
+        self.assertFalse(replay.advance())
+
+    def test_trace_replay_control_loop(self):
+        '''
+        Test if the control loop reads sensors from the trace and ends with it
+        '''
+        write_trace(self.path("trace.csv"), self.records)
+        env = Environment(25.0, 70, 650)
+        updates = GuiUpdateQueue(maxsize=5)
+
+        manage_environment(env, initialize_sensors(env), initialize_actuators(env), None, updates=updates,
+                           trace=TraceReplay(self.path("trace.csv"), speed=None, zone=0))
+
+        self.assertEqual(updates.get_metrics()["put"], 2)
+        readings, warnings = updates.get_latest()
+        self.assertEqual(warnings, {"temperature": "fault", "humidity": "low", "light": "good"})
+
+    def test_trace_replay_record_time(self):
+        '''
+        Test if replayed ticks are checked against the scheduled conditions and recorded at the time of their record
+        '''
+        day = {"temp_upper": 40.0, "temp_lower": 15.0, "humidity_upper": 100, "humidity_lower": 40,
+               "light_upper": 700, "light_lower": 600}
+        noon = time.mktime((2026, 6, 1, 12, 0, 0, 0, 0, -1))
+        records = [{"timestamp": noon, "zone": 0, "temperature": 25.0, "humidity": 70.0, "light": 650.0},
+                   {"timestamp": noon + 11 * 3600, "zone": 0, "temperature": 25.0, "humidity": 70.0, "light": 650.0}]
+        write_trace(self.path("trace.csv"), records)
+        env = Environment(25.0, 70, 650)
+        env.set_schedule(photoperiod_schedule("06:00", 14, day, dict(day, light_upper=200, light_lower=150)))
+        updates = GuiUpdateQueue(maxsize=5)
+        history = mock.MagicMock()
+
+        manage_environment(env, initialize_sensors(env), initialize_actuators(env), None, history=history,
+                           updates=updates, trace=TraceReplay(self.path("trace.csv"), speed=None, zone=0))
+
+        self.assertEqual([record_call.kwargs["timestamp"] for record_call in history.record_readings.call_args_list],
+                         [noon, noon + 11 * 3600])
+        self.assertEqual([sample[0] for sample in updates.get_samples()], [noon, noon + 11 * 3600])
+        self.assertEqual(updates.get_latest()[1]["light"], "high")
+        history.record_action.assert_called_with("lights", 200, timestamp=noon + 11 * 3600)
+
+    def test_trace_replay_invalid_speed(self):
+        '''
+        Test if exception is raised when invalid replay speed is passed in
+        '''
+        with self.assertRaises(ValueError):
+            TraceReplay(self.path("trace.csv"), speed=0)
+
+class TestDevices(unittest.TestCase):
+    '''
+    Class containing tests for the device driver backend and fake device server of devices
+    '''
+    def setUp(self) -> None:
+        self.server = FakeDeviceServer(10)
+        self.server.start()
+        self.backend = DeviceBackend(self.server.host, self.server.port, size=2, timeout=1.0, backoff=0.01)
+        self.backend.start()
+
+    def tearDown(self) -> None:
+        self.backend.stop()
+        self.server.stop()
+
+    def test_devices_get_and_set(self):
+        '''
+        Test if values are read from and written to the selected device
+        '''
+        self.backend.set(3, "temperature", 22.5)
+
+        self.assertEqual(self.backend.get(3, "temperature"), 22.5)
+        self.assertEqual(self.backend.get(4, "temperature"), 25.0)
+
+    def test_devices_pipelined_read_all(self):
+        '''
+        Test if concurrent requests over the pool get the responses of their own devices
+        '''
+        for device in range(10):
+            self.server.devices[device]["light"] = 600 + device
+
+        values = self.backend.read_all(list(range(10)))
+        self.assertEqual([v["light"] for v in values], [600.0 + device for device in range(10)])
+
+    def test_devices_error_response(self):
+        '''
+        Test if an invalid request raises DeviceError without retries
+        '''
+        with self.assertRaises(DeviceError):
+            self.backend.get(99, "temperature")
+        self.assertEqual(self.backend.pool.get_metrics()["failures"], 0)
+
+    def test_devices_reconnect_after_dropped_connections(self):
+        '''
+        Test if requests succeed again after the gateway drops all connections
+        '''
+        self.backend.get(0, "humidity")
+        self.backend.get(0, "humidity")
+        self.server.drop_connections()
+        time.sleep(0.1)
+
+        self.assertEqual(self.backend.get(0, "humidity"), 67.0)
+        self.assertEqual(self.backend.get(0, "humidity"), 67.0)
+        self.assertGreaterEqual(self.backend.pool.get_metrics()["reconnects"], 1)
+
+    def test_devices_sensors_and_actuators(self):
+        '''
+        Test if existing sensors read and actuators change a device through DeviceEnvironment
+        '''
+        env = DeviceEnvironment(self.backend, 1)
+        self.server.devices[1]["temperature"] = 30.0
+
+        self.assertEqual(TemperatureSensor(env).get_environment_data(env), 30.0)
+
+        readings, warnings = control_tick(env, initialize_sensors(env), initialize_actuators(env), 
+                                          source="environment")
+        self.assertEqual(warnings["temperature"], "high")
+        self.assertEqual(self.server.devices[1]["temperature"], 27.0)
+
+    def test_devices_server_stopped_during_ramp(self):
+        '''
+        Test if a device lost in the middle of an actuator ramp fails the actuation without stopping the control loop
+        '''
+        # an error response is an I/O error of the environment as well
+        with self.assertRaises(OSError):
+            DeviceEnvironment(self.backend, 99).set_environment("temperature", 25.0)
+
+        backend = DeviceBackend(self.server.host, self.server.port, size=1, timeout=0.2, retries=1, backoff=0.01)
+        backend.start()
+        env = DeviceEnvironment(backend, 1)
+        self.server.devices[1]["temperature"] = 30.0
+        history = mock.MagicMock()
+
+        steps = []
+        set_device = backend.set
+        def set_then_stop(device, variable, value):
+            set_device(device, variable, value)
+            steps.append(value)
+            if len(steps) == 2:
+                self.server.stop()
+        backend.set = set_then_stop
+
+        try:
+            manage_environment(env, initialize_sensors(env), initialize_actuators(env), None, 2, interval=0,
+                               history=history, source="environment")
+        finally:
+            backend.stop()
+
+        self.assertEqual(len(steps), 2)
+        self.assertLess(self.server.devices[1]["temperature"], 30.0)
+        self.assertGreater(self.server.devices[1]["temperature"], 27.0)
+        history.record_action.assert_not_called()
+        self.assertEqual(history.record_readings.call_args_list[-1].args[0],
+                         {"temperature": None, "humidity": None, "light": None})
+
+class TestEffortAccounts(unittest.TestCase):
+    '''
+    Class containing tests for the EffortAccounts of accounting
+    '''
+    def setUp(self) -> None:
+        self.accounts = EffortAccounts(2, heater={"energy": 1.0, "step_time": 10.0})
+
+    def test_accounts_record_heater_ramp(self):
+        '''
+        Test if the heater records steps, change, on-time and energy of its ramp
+        '''
+        env = Environment(25.0, 70, 650)
+        heater = Heater(env, self.accounts, 1)
+
+        with mock.patch('random.uniform', side_effect=[25.3, 25.6, 25.9, 26.2]):
+            heater.change_temp(26.0)
+
+        counters = self.accounts.get_zone(1)["heater"]
+        self.assertEqual((counters["actuations"], counters["steps"]), (1, 4))
+        self.assertAlmostEqual(counters["change"], 1.0)
+        self.assertAlmostEqual(counters["on_time"], 40.0)
+        self.assertAlmostEqual(counters["energy"], 1.0)
+        self.assertEqual(self.accounts.get_zone(0)["heater"]["steps"], 0)
+
+    def test_accounts_no_op_not_recorded(self):
+        '''
+        Test if an actuation without any change is not recorded
+        '''
+        env = Environment(25.0, 70, 650)
+        Lights(env, self.accounts).change_light(650)
+
+        self.assertEqual(self.accounts.get_totals()["lights"]["actuations"], 0)
+
+    def test_accounts_totals_and_top_zones(self):
+        '''
+        Test if totals are summed over zones and zones are ranked by energy
+        '''
+        self.accounts.record("heater", 0, 2, 0.5)
+        self.accounts.record("heater", 1, 4, 1.5)
+        self.accounts.record("lights", 0, 10, 100.0)
+
+        totals = self.accounts.get_totals()
+        self.assertEqual(totals["heater"]["steps"], 6)
+        self.assertAlmostEqual(totals["heater"]["energy"], 2.0)
+        self.assertAlmostEqual(self.accounts.get_total_energy(), 3.0)
+        self.assertEqual(self.accounts.get_top_zones(1, "heater"), [(1, 1.5)])
+
+        self.accounts.reset()
+        self.assertEqual(self.accounts.get_total_energy(), 0)
+
+    def test_accounts_invalid_input(self):
+        '''
+        Test if exception is raised when invalid actuator estimate or number of zones is passed in
+        '''
+        with self.assertRaises(ValueError):
+            EffortAccounts(1, fan={"energy": 1.0})
+        with self.assertRaises(ValueError):
+            EffortAccounts(0)
+
+class TestTrendHistory(unittest.TestCase):
+    '''
+    Class containing tests for the lttb function and TrendHistory of gui
+    '''
+    def test_lttb_keeps_ends_and_peaks(self):
+        '''
+        Test if decimation keeps the first and last point and a spike of the line
+        '''
+        points = [(x, 0.0) for x in range(1000)]
+        points[500] = (500, 100.0)
+        sampled = lttb(points, 50)
+
+        self.assertEqual(len(sampled), 50)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertIn((500, 100.0), sampled)
+
+    def test_lttb_short_input(self):
+        '''
+        Test if points are returned unchanged when there are not more of them than the threshold
+        '''
+        points = [(0, 1.0), (1, 2.0)]
+        self.assertEqual(lttb(points, 10), points)
+
+    def test_history_bounded_buckets(self):
+        '''
+        Test if number of buckets stays bounded and extremes survive merging
+        '''
+        history = TrendHistory(capacity=64)
+        for x in range(100000):
+            history.append(float(x), 100.0 if x == 777 else 1.0)
+
+        self.assertLessEqual(len(history.buckets), 64)
+        self.assertEqual(sum(bucket[0] for bucket in history.buckets), 100000)
+        self.assertIn((777.0, 100.0), history.get_points())
+        self.assertLessEqual(len(history.decimate(32)), 32)
+
+    def test_history_window(self):
+        '''
+        Test if readings older than the window are dropped
+        '''
+        history = TrendHistory(capacity=1000, window=10.0)
+        for x in range(100):
+            history.append(float(x), float(x))
+
+        self.assertEqual(history.get_points()[0], (89.0, 89.0))
+
+class TestConfigWatcher(unittest.TestCase):
+    '''
+    Class containing tests for the ConfigWatcher and apply_config of config
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "greenhouse.json")
+        self.now = [0.0]
+        self.environments = [Environment(25.0, 70, 650), Environment(22.0, 60, 500)]
+        self.actuators = [initialize_actuators(env) for env in self.environments]
+        self.watcher = ConfigWatcher(self.path, self.environments, self.actuators, interval=5.0,
+                                     clock=lambda: self.now[0])
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_config(self, config, mtime):
+        with open(self.path, "w") as file:
+            json.dump(config, file)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_config_applied_to_all_zones(self):
+        '''
+        Test if a changed file is applied to ideal conditions and actuator limits of every zone
+        '''
+        self.write_config({"ideal_condition": {"temp_upper": 30.0, "temp_lower": 24.0},
+                           "actuators": {"heater": {"max": 35.0, "change": 0.5}}}, 1000)
+
+        self.assertTrue(self.watcher.poll())
+        for env, actuators in zip(self.environments, self.actuators):
+            self.assertEqual(env.ideal_condition["temp_upper"], 30.0)
+            self.assertEqual(env.ideal_condition["humidity_upper"], 80)
+            self.assertEqual((actuators["heater"].min, actuators["heater"].max), (15.0, 35.0))
+            self.assertEqual(actuators["heater"].change, 0.5)
+
+    def test_config_polling_throttled(self):
+        '''
+        Test if the file is checked at most once per interval and only parsed when changed
+        '''
+        self.write_config({"ideal_condition": {"light_upper": 800}}, 1000)
+        self.assertTrue(self.watcher.poll())
+
+        self.write_config({"ideal_condition": {"light_upper": 750}}, 2000)
+        self.now[0] = 4.0
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual(self.environments[0].ideal_condition["light_upper"], 800)
+
+        self.now[0] = 5.0
+        self.assertTrue(self.watcher.poll())
+        self.now[0] = 10.0
+        self.assertFalse(self.watcher.poll())
+        self.assertEqual((self.watcher.applied, self.environments[1].ideal_condition["light_upper"]), (2, 750))
+
+    def test_config_invalid_keeps_previous(self):
+        '''
+        Test if an invalid file is rejected without changing any zone
+        '''
+        self.write_config({"ideal_condition": {"humidity_lower": 65}}, 1000)
+        self.assertTrue(self.watcher.poll())
+
+        invalid = [{"ideal_condition": {"temp_lower": 28.0}},
+                   {"ideal_condition": {"humidity_upper": 80.5}},
+                   {"ideal_condition": {"light_upper": 900}},
+                   {"actuators": {"lights": {"min": 800, "max": 700}}},
+                   {"actuators": {"heater": {"change": 0}}},
+                   {"actuators": {"fan": {"max": 1}}},
+                   ["temp_upper", 30.0]]
+        for mtime, config in enumerate(invalid, 2000):
+            self.now[0] += 5.0
+            self.write_config(config, mtime)
+            self.assertFalse(self.watcher.poll())
+            self.assertIsNotNone(self.watcher.error)
+
+        with open(self.path, "w") as file:
+            file.write("{\"ideal_condition\": ")
+        self.now[0] += 5.0
+        self.assertFalse(self.watcher.poll())
+
+        self.assertEqual(self.watcher.rejected, len(invalid) + 1)
+        for env, actuators in zip(self.environments, self.actuators):
+            self.assertEqual(env.ideal_condition["humidity_lower"], 65)
+            self.assertEqual(env.ideal_condition["temp_lower"], 21.0)
+            self.assertEqual((actuators["lights"].min, actuators["lights"].max), (150, 850))
+            self.assertEqual(actuators["heater"].change, 0.3)
+
+    def test_config_invalid_for_one_zone(self):
+        '''
+        Test if a configuration invalid for a single zone is applied to none of them
+        '''
+        self.environments[1].ideal_condition["temp_upper"] = 23.0
+
+        with self.assertRaises(ValueError):
+            apply_config({"ideal_condition": {"temp_lower": 24.0}}, self.environments, self.actuators)
+        self.assertEqual(self.environments[0].ideal_condition["temp_lower"], 21.0)
+
+    def test_config_scheduled_zones(self):
+        '''
+        Test if ideal conditions are rejected for scheduled zones and a schedule part replaces or removes schedules
+        '''
+        self.environments[1].set_schedule(default_schedule())
+
+        with self.assertRaises(ValueError):
+            apply_config({"ideal_condition": {"temp_lower": 22.0}}, self.environments, self.actuators)
+        self.assertEqual(self.environments[0].ideal_condition["temp_lower"], 21.0)
+
+        night = dict(self.environments[0].ideal_condition, temp_lower=18.0)
+        apply_config({"schedule": {"phases": [["06:00", night], ["20:00", night]], "ramp": 0}},
+                     self.environments, self.actuators)
+        for env in self.environments:
+            self.assertEqual(env.get_ideal_conditions()["temp_lower"], 18.0)
+
+        for schedule in ({"phases": [["06:00", dict(night, humidity_upper=80.5)]]},
+                         {"phases": [["25:00", night]]}, {"phases": [["06:00", night]], "ramp": 1.5},
+                         {"phases": [night]}, ["06:00", night]):
+            with self.assertRaises(ValueError):
+                apply_config({"schedule": schedule}, self.environments, self.actuators)
+
+        apply_config({"schedule": None, "ideal_condition": {"temp_lower": 22.0}}, self.environments, self.actuators)
+        for env in self.environments:
+            self.assertIsNone(env.schedule)
+            self.assertEqual(env.get_ideal_conditions()["temp_lower"], 22.0)
+
+    def test_config_reloaded_by_control_loop(self):
+        '''
+        Test if manage_environment applies the configuration before its tick
+        '''
+        env = self.environments[0]
+        sensors = initialize_sensors(env)
+        self.write_config({"ideal_condition": {"temp_upper": 24.0}}, 1000)
+
+        with mock.patch('controller.control_tick', return_value=({}, {})) as tick:
+            manage_environment(env, sensors, self.actuators[0], None, 1, interval=0, config=self.watcher)
+
+        self.assertEqual(env.ideal_condition["temp_upper"], 24.0)
+        tick.assert_called_once()
+
+class TestAlertEngine(unittest.TestCase):
+    '''
+    Class containing tests for the AlertEngine and sinks of alerts
+    '''
+    def setUp(self) -> None:
+        self.now = [0.0]
+        self.sink = GuiSink(size=100)
+        self.engine = AlertEngine([self.sink], suppress=60.0, escalate=300.0, clock=lambda: self.now[0])
+
+    def states(self, alerts):
+        return [(alert["zone"], alert["variable"], alert["state"]) for alert in alerts]
+
+    def test_alerts_deduplicated_and_cleared(self):
+        '''
+        Test if a repeated condition raises a single alert and returning to good clears it
+        '''
+        first = self.engine.update({"temperature": "high", "humidity": "good"}, 2, {"temperature": 30.0})
+        self.assertEqual(self.states(first), [(2, "temperature", "raised")])
+        self.assertEqual(first[0]["value"], 30.0)
+
+        for _ in range(10):
+            self.now[0] += 2.0
+            self.assertEqual(self.engine.update({"temperature": "high", "humidity": "good"}, 2), [])
+
+        self.now[0] = 60.0
+        changed = self.engine.update({"temperature": "low", "humidity": "good"}, 2)
+        self.assertEqual((changed[0]["condition"], changed[0]["state"]), ("low", "raised"))
+        self.now[0] = 120.0
+        cleared = self.engine.update({"temperature": "good", "humidity": "good"}, 2)
+        self.assertEqual(self.states(cleared), [(2, "temperature", "cleared")])
+        self.assertEqual(self.engine.get_active(), {})
+        self.assertEqual(self.engine.get_metrics()["suppressed"], 10)
+
+    def test_alerts_flapping_suppressed(self):
+        '''
+        Test if a flapping condition raises and clears at most once per suppression window
+        '''
+        sent = []
+        for tick in range(30):
+            self.now[0] = tick * 2.0
+            sent.extend(self.engine.update({"temperature": ("high", "good", "low")[tick % 3]}))
+
+        self.assertEqual(self.states(sent), [(0, "temperature", "raised")])
+        self.assertEqual(self.engine.get_metrics()["suppressed"], 29)
+
+        # the condition in effect after the window is sent with the number of suppressed changes
+        self.now[0] = 60.0
+        cleared = self.engine.update({"temperature": "good"})
+        self.assertEqual(self.states(cleared), [(0, "temperature", "cleared")])
+        self.assertEqual((cleared[0]["condition"], cleared[0]["suppressed"]), ("high", 29))
+        self.now[0] = 62.0
+        self.assertEqual(self.engine.update({"temperature": "high"}), [])
+        self.assertEqual(self.engine.get_active(), {(0, "temperature"): "high"})
+
+    def test_alerts_suppression_and_escalation(self):
+        '''
+        Test if reminders are sent after the suppression window and the condition escalates once
+        '''
+        sent = []
+        for tick in range(0, 400, 10):
+            self.now[0] = float(tick)
+            sent.extend(self.engine.update({"light": "fault"}))
+
+        self.assertEqual([alert["state"] for alert in sent],
+                         ["raised", "repeated", "repeated", "repeated", "repeated", "escalated", "repeated"])
+        self.assertEqual(sent[1]["suppressed"], 5)
+        self.assertEqual(sent[5]["severity"], "critical")
+        self.assertEqual(sent[6]["severity"], "critical")
+
+    def test_alerts_storm_from_many_zones(self):
+        '''
+        Test if an alert storm is delivered in batches and a slow sink drops the oldest alerts
+        '''
+        class SlowSink(GuiSink):
+            def send(self, alerts):
+                time.sleep(0.05)
+                super().send(alerts)
+
+        fast = GuiSink(size=10000)
+        slow = SlowSink(size=10000)
+        engine = AlertEngine([fast, slow], queue_size=500)
+        engine.start()
+
+        start = time.perf_counter()
+        for condition in ("high", "low", "good", "high"):
+            engine.update_zones([{"temperature": condition, "humidity": condition}] * 300)
+        elapsed = time.perf_counter() - start
+        engine.stop()
+
+        metrics = engine.get_metrics()
+        self.assertLess(elapsed, 0.05)
+        self.assertEqual((metrics["raised"], metrics["suppressed"]), (600, 1800))
+        self.assertEqual(metrics["active"], 600)
+        self.assertGreater(metrics["dropped"], 0)
+        self.assertEqual(len(fast.get_messages()) + len(slow.get_messages()) + metrics["dropped"], 1200)
+
+    def test_alerts_log_and_socket_sinks(self):
+        '''
+        Test if alerts are appended to the log file and sent as JSON lines to a socket
+        '''
+        with tempfile.TemporaryDirectory() as directory, socket.create_server(("127.0.0.1", 0)) as server:
+            path = os.path.join(directory, "alerts.log")
+            engine = AlertEngine([LogSink(path), SocketSink(port=server.getsockname()[1])])
+            engine.start()
+            engine.update({"humidity": "low"}, 1, {"humidity": 50})
+            connection, _ = server.accept()
+            engine.stop()
+
+            with connection, connection.makefile() as received:
+                alert = json.loads(received.readline())
+            with open(path) as file:
+                lines = file.readlines()
+
+        self.assertEqual((alert["zone"], alert["condition"], alert["value"]), (1, "low", 50))
+        self.assertEqual(len(lines), 1)
+        self.assertIn("[warning] zone 1: humidity low raised (50)", lines[0])
+
+    def test_alerts_failing_sink(self):
+        '''
+        Test if a failing sink is counted without stopping delivery to other sinks
+        '''
+        engine = AlertEngine([SocketSink(port=1), self.sink])
+        engine.start()
+        engine.update({"temperature": "high"})
+        engine.stop()
+
+        self.assertEqual(engine.get_metrics()["failed"], 1)
+        self.assertEqual(len(self.sink.get_messages()), 1)
+
+    def test_alerts_from_control_loop(self):
+        '''
+        Test if manage_environment feeds the warnings of every tick to the alert engine
+        '''
+        env = Environment(35.0, 70, 650)
+        # every tick is a suppression window after the previous one
+        ticks = iter(range(0, 600, 60))
+        engine = AlertEngine([self.sink], suppress=60.0, escalate=300.0, clock=lambda: next(ticks))
+        engine.start()
+        manage_environment(env, initialize_sensors(env), initialize_actuators(env), None, 3, interval=0,
+                           alerts=engine, source="environment")
+        engine.stop()
+
+        self.assertEqual(self.sink.get_messages(), ["[warning] zone 0: temperature high raised (35.0)",
+                                                    "[info] zone 0: temperature high cleared (27.0)"])
+
+class TestPowerAllocator(unittest.TestCase):
+    '''
+    Class containing tests for the PowerAllocator of power
+    '''
+    def setUp(self) -> None:
+        self.environments = [Environment(20.0, 70, 500) for _ in range(3)]
+        self.actuators = [initialize_actuators(env) for env in self.environments]
+
+    def test_allocation_within_cap(self):
+        '''
+        Test if the most urgent requests are granted in full and the next one partially within the cap
+        '''
+        site = PowerAllocator(5.0, heater=1.0)
+        site.request(0, "heater", self.actuators[0]["heater"], 20.0, 21.0)
+        site.request(1, "heater", self.actuators[1]["heater"], 18.0, 21.0)
+        site.request(2, "heater", self.actuators[2]["heater"], 19.0, 21.0)
+
+        self.assertEqual(site.allocate(), [0.0, 1.0, 1.0])
+        self.assertEqual(site.pending_power(), [1.0, 3.0, 2.0])
+        self.assertEqual(site.get_metrics(), {"pending": 3, "requested": 6.0, "granted": 5.0, "throttled": 1})
+
+        site.cap = 4.0
+        self.assertEqual(site.allocate(), [0.0, 1.0, 0.5])
+
+    def test_allocation_priorities(self):
+        '''
+        Test if zone priorities outweigh the size of the rise
+        '''
+        site = PowerAllocator(1.0, priorities=[10.0], heater=1.0)
+        site.request(0, "heater", self.actuators[0]["heater"], 20.0, 21.0)
+        site.request(1, "heater", self.actuators[1]["heater"], 17.0, 21.0)
+
+        self.assertEqual(site.allocate(), [1.0, 0.0])
+
+    def test_dispatch_partial_targets(self):
+        '''
+        Test if actuators are activated with granted targets, lights rounded down to an integer
+        '''
+        site = PowerAllocator(4.0 + 0.01 * 50.5, heater=1.0, lights=0.01)
+        site.request(0, "heater", self.actuators[0]["heater"], 20.0, 24.0)
+        site.request(1, "lights", self.actuators[1]["lights"], 500, 600)
+
+        with mock.patch('random.uniform', side_effect=lambda low, high: high):
+            executed = site.dispatch()
+
+        self.assertEqual(executed, [(0, "heater", 24.0), (1, "lights", 550)])
+        self.assertEqual(self.environments[0].get_environment_variable("temperature"), 24.0)
+        self.assertEqual(self.environments[1].get_environment_variable("light"), 550)
+        self.assertEqual(site.get_metrics()["pending"], 0)
+
+    def test_dispatch_after_zone_ticks(self):
+        '''
+        Test if control_tick hands rises to the site and lowering is not limited
+        '''
+        site = PowerAllocator(0.0)
+        self.environments[2].set_environment("temperature", 35.0)
+        for zone, (env, actuators) in enumerate(zip(self.environments, self.actuators)):
+            readings, warnings = control_tick(env, initialize_sensors(env), actuators, source="environment",
+                                              site=site, zone=zone)
+
+        self.assertEqual(site.get_metrics()["pending"], 5)
+        self.assertEqual(site.dispatch(), [])
+        self.assertEqual(self.environments[0].get_environment_variable("temperature"), 20.0)
+        self.assertEqual(self.environments[2].get_environment_variable("temperature"), 27.0)
+
+    def test_dispatch_through_queues_with_faults(self):
+        '''
+        Test if granted rises are submitted to the command queues and the rise is not flagged as a rate fault
+        '''
+        site = PowerAllocator(100.0)
+        env = Environment(15.0, 70, 650)
+        actuators = initialize_actuators(env)
+        queues = initialize_command_queues(actuators, max_rate=1000.0)
+        faults = initialize_fault_detectors()
+        sensors = initialize_sensors(env)
+
+        ticks = []
+        for _ in range(3):
+            ticks.append(control_tick(env, sensors, actuators, faults=faults, queues=queues, source="environment",
+                                      site=site)[1]["temperature"])
+            site.dispatch()
+
+        self.assertEqual(ticks, ["low", "low", "good"])
+        self.assertEqual(env.get_environment_variable("temperature"), 21.0)
+        self.assertEqual(queues["heater"].get_metrics()["executed"], 1)
+
+    def test_allocation_thousands_of_zones(self):
+        '''
+        Test if thousands of requests never exceed the cap
+        '''
+        site = PowerAllocator(500.0, priorities=[1.0 + zone % 3 for zone in range(5000)])
+        heater = self.actuators[0]["heater"]
+        for zone in range(5000):
+            site.request(zone, "heater", heater, 15.0 + zone % 60 / 10, 21.0)
+
+        fractions = site.allocate()
+        self.assertAlmostEqual(sum(power * fraction for power, fraction in zip(site.pending_power(), fractions)), 500.0)
+        self.assertEqual(site.granted, 500.0)
+
+    def test_allocation_invalid_input(self):
+        '''
+        Test if exception is raised for a negative cap, an unknown actuator or a request without rise
+        '''
+        with self.assertRaises(ValueError):
+            PowerAllocator(-1.0)
+        with self.assertRaises(ValueError):
+            PowerAllocator(1.0, humidifier=1.0)
+        with self.assertRaises(ValueError):
+            PowerAllocator(1.0).request(0, "heater", self.actuators[0]["heater"], 21.0, 21.0)
+
+class TestModelPlant(unittest.TestCase):
+    '''
+    Class containing tests for the ModelEnvironment and ModelPlant of plant
+    '''
+    def setUp(self) -> None:
+        self.model = GreenhouseModel(2, temperature=20.0, humidity=70.0, dt=10.0)
+        self.model.set_weather(5.0, 80.0)
+        self.plant = ModelPlant(self.model)
+
+    def test_sensors_read_model(self):
+        '''
+        Test if sensors of a model environment read the state of its zone
+        '''
+        env = self.plant.environments[1]
+        self.model.temperature[1] = 23.456
+
+        sensors = initialize_sensors(env)
+        self.assertEqual(sensors["temperature"].get_environment_data(env), 23.46)
+        self.assertEqual(sensors["humidity"].get_environment_data(env), round(self.model.get_humidity()[1]))
+        self.assertLess(sensors["humidity"].get_environment_data(env), 70)
+        self.assertEqual(sensors["light"].get_environment_data(env), 150)
+
+    def test_actuators_set_setpoints(self):
+        '''
+        Test if an actuator ramp sets the setpoint of the zone without changing the model
+        '''
+        env = self.plant.environments[0]
+        Heater(env).change_temp(24.0)
+
+        self.assertEqual(env.setpoints, {"temperature": 24.0})
+        self.assertEqual(self.model.temperature, [20.0, 20.0])
+
+    def test_plant_drives_model(self):
+        '''
+        Test if stepping the plant brings a zone to its setpoints and leaves the other zone undriven
+        '''
+        env = self.plant.environments[0]
+        Heater(env).change_temp(24.0)
+        Humidifier(env).change_humidity(75)
+        Lights(env).change_light(650)
+
+        for _ in range(60):
+            self.plant.step(60)
+
+        state = self.model.get_zone(0)
+        self.assertAlmostEqual(state["temperature"], 24.0, places=1)
+        self.assertAlmostEqual(state["humidity"], 75.0, delta=1.0)
+        self.assertEqual(state["light"], 650.0)
+        self.assertLess(self.model.temperature[1], 15.0)
+
+    def test_control_loop_with_model(self):
+        '''
+        Test if the control loop corrects a cold zone of the model through the plant
+        '''
+        env = self.plant.environments[0]
+        sensors = initialize_sensors(env)
+        actuators = initialize_actuators(env)
+
+        for _ in range(60):
+            readings, warnings = control_tick(env, sensors, actuators, source="environment")
+            self.plant.step(60)
+
+        self.assertEqual(warnings, {"temperature": "good", "humidity": "good", "light": "good"})
+
+class TestMonteCarloStudy(unittest.TestCase):
+    '''
+    Class containing tests for the seeded simulations and MonteCarloStudy of montecarlo
+    '''
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "study.jsonl")
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_simulation_seeded(self):
+        '''
+        Test if a run is repeatable by its seed and reports time-in-band of every variable
+        '''
+        summary = run_simulation(7, 200)
+
+        self.assertEqual(run_simulation(7, 200), summary)
+        self.assertNotEqual(run_simulation(8, 200)["in_band"], summary["in_band"])
+        self.assertEqual(set(summary["in_band"]), {"temperature", "humidity", "light"})
+        self.assertTrue(all(0 <= fraction <= 1 for fraction in summary["in_band"].values()))
+
+    def test_simulation_config(self):
+        '''
+        Test if the configuration of ideal conditions is applied to the run
+        '''
+        summary = run_simulation(1, 100, {"ideal_condition": {"temp_upper": 40.0, "temp_lower": 15.0}}, model=False)
+
+        self.assertEqual(summary["in_band"]["temperature"], 1.0)
+
+    def test_simulation_in_band_from_state(self):
+        '''
+        Test if time in band is judged from the state of the zone when noisy readings leave the band
+        '''
+        # the zone stays between 25.0 and 25.1 °C while readings with noise of 0.2 °C leave the band
+        config = {"ideal_condition": {"temp_upper": 25.1, "temp_lower": 24.0}}
+        summary = run_simulation(1, 30, config, interval=1.0)
+
+        self.assertEqual(summary["in_band"], {"temperature": 1.0, "humidity": 1.0, "light": 1.0})
+        self.assertEqual(summary["faults"], {"temperature": 0, "humidity": 0, "light": 0})
+
+    def test_simulation_schedule_simulated_time(self):
+        '''
+        Test if a scheduled configuration is looked up at the simulated time, not the wall clock
+        '''
+        day = {"temp_upper": 40.0, "temp_lower": 15.0, "humidity_upper": 100, "humidity_lower": 40,
+               "light_upper": 850, "light_lower": 150}
+        night = dict(day, light_upper=200)
+        config = {"schedule": {"phases": [["06:00", day], ["18:00", night]], "ramp": 0}}
+
+        with mock.patch("time.time", return_value=time.mktime((2026, 6, 1, 12, 0, 0, 0, 0, -1))):
+            noon = run_simulation(1, 1440, config, model=False)
+        with mock.patch("time.time", return_value=time.mktime((2026, 6, 1, 23, 0, 0, 0, 0, -1))):
+            night_run = run_simulation(1, 1440, config, model=False)
+
+        self.assertEqual(noon, night_run)
+        self.assertLess(noon["in_band"]["light"], 1.0)
+
+    def test_simulation_model(self):
+        '''
+        Test if runs with the model are driven by the actuators and differ from the random steps
+        '''
+        summary = run_simulation(3, 300)
+
+        self.assertNotEqual(summary, run_simulation(3, 300, model=False))
+        self.assertGreater(summary["in_band"]["humidity"], 0.5)
+        self.assertEqual(summary["faults"], {"temperature": 0, "humidity": 0, "light": 0})
+
+    def test_summarize_confidence_interval(self):
+        '''
+        Test if mean and confidence interval of time-in-band are computed over runs
+        '''
+        summaries = [{"in_band": {"temperature": value, "humidity": 1.0, "light": 0.5}} for value in (0.8, 0.9, 1.0)]
+        result = summarize(summaries)
+
+        self.assertAlmostEqual(result["temperature"]["mean"], 0.9)
+        self.assertAlmostEqual(result["temperature"]["std"], 0.1)
+        self.assertAlmostEqual(result["temperature"]["high"] - 0.9, 1.959964 * 0.1 / 3 ** 0.5, places=5)
+        self.assertEqual((result["humidity"]["low"], result["humidity"]["high"]), (1.0, 1.0))
+        with self.assertRaises(ValueError):
+            summarize(summaries, 1.0)
+
+    def test_study_streams_and_resumes(self):
+        '''
+        Test if a study streams summaries, checkpoints them and resumes with the remaining seeds
+        '''
+        streamed = []
+        first = MonteCarloStudy(self.path, 6, ticks=50, processes=2).run(streamed.append)
+        self.assertEqual(sorted(summary["seed"] for summary in streamed), list(range(6)))
+
+        # interrupted study, the last line was cut short and two runs were lost
+        with open(self.path) as file:
+            lines = file.readlines()
+        with open(self.path, "w") as file:
+            file.writelines(lines[:-2])
+            file.write(lines[-1][:10])
+        with open(self.path) as file:
+            interrupted = file.read()
+
+        streamed.clear()
+        study = MonteCarloStudy(self.path, 8, ticks=50, processes=2)
+        result = study.run(streamed.append)
+
+        self.assertEqual(len(streamed), 4)
+        self.assertEqual(sorted(summary["seed"] for summary in study.summaries), list(range(8)))
+        self.assertNotEqual(result, first)
+        # the checkpoint is only appended to, new summaries start on a line after the one cut short
+        with open(self.path) as file:
+            checkpoint = file.read()
+        self.assertTrue(checkpoint.startswith(interrupted + "\n"))
+        self.assertEqual(len(checkpoint.splitlines()), 10)
+
+    def test_study_different_checkpoint(self):
+        '''
+        Test if exception is raised when the checkpoint belongs to another study or input is invalid
+        '''
+        MonteCarloStudy(self.path, 1, ticks=10, processes=1).run()
+
+        with self.assertRaises(ValueError):
+            MonteCarloStudy(self.path, 1, ticks=20, processes=1).run()
+        with self.assertRaises(ValueError):
+            MonteCarloStudy(self.path, 0)
+        with self.assertRaises(TypeError):
+            MonteCarloStudy(self.path, 1.5)
+
+class TestStressHarness(unittest.TestCase):
+    '''
+    Class containing tests for the StressHarness and saturation search of stress
+    '''
+    def test_stress_invariants_hold(self):
+        '''
+        Test if generated extreme scenarios keep every invariant of the control path
+        '''
+        for seed in range(3):
+            harness = StressHarness(200, seed)
+            latencies = harness.run(20)
+
+            self.assertEqual(harness.violations, [])
+            self.assertEqual(len(latencies), 20)
+
+    def test_stress_ramp_not_terminating(self):
+        '''
+        Test if a ramp longer than the allowed number of steps is reported as violation
+        '''
+        harness = StressHarness(50, 1, max_steps=3)
+        harness.run(5)
+
+        self.assertTrue(any("did not terminate" in violation for violation in harness.violations))
+
+    def test_simulator_at_bounds(self):
+        '''
+        Test if simulated readings at the environment boundaries stay within them
+        '''
+        env = Environment(40.0, 100, 850)
+        for _ in range(200):
+            for variable, (low, high) in (("temperature", (15.0, 40.0)), ("humidity", (40, 100)),
+                                           ("light", (150, 850))):
+                self.assertTrue(low <= simulator.get_simulator_data(variable, env) <= high)
+
+    def test_deadline_misses(self):
+        '''
+        Test if an overrunning tick delays the following ticks past their deadlines
+        '''
+        self.assertEqual(deadline_misses([0.05] * 10, 10.0), 0.0)
+        self.assertEqual(deadline_misses([0.05] * 10, 25.0), 1.0)
+        self.assertEqual(deadline_misses([0.18, 0.05, 0.05, 0.05], 10.0), 0.5)
+
+    def test_find_saturation(self):
+        '''
+        Test if the saturation rate is bisected between the last met and the first missed budget
+        '''
+        harness = mock.MagicMock()
+        harness.run.side_effect = lambda ticks: [0.01] * ticks
+
+        rate, misses = find_saturation(harness, start_rate=1.0, steps=10)
+        self.assertAlmostEqual(rate, 100.0, delta=0.2)
+        self.assertGreater(misses[rate], 0.01)
+
+        self.assertEqual(find_saturation(harness, start_rate=1.0, max_rate=50.0)[0], None)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file